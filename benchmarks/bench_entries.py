@@ -0,0 +1,65 @@
+"""Measure what lazy content conversion saves in the feed path run_cycle uses
+
+Run from the repository root:
+    python -m benchmarks.bench_entries --entries 5000 --consume 0.1
+
+Serves a synthetic feed from the fake server and runs process_feeds, as
+run_cycle does, then reads the content of a fraction of the entries, like
+run_cycle classifying only the entries left after de-duplication and the
+entry store. --consume is that fraction; "all converted" reads every entry,
+which is what extraction cost before contents were converted lazily.
+
+process_feed still builds the full list of entries (with their raw HTML) and
+feedparser parses the whole document up front, so the saving is the HTML
+conversion of entries that are never read, not the time to the first entry.
+Peak memory is the tracemalloc peak of Python allocations, parsing included.
+"""
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from benchmarks.fake_servers import FakeServer
+from benchmarks.fixtures import make_arxiv_feed
+from utils.rss_helper import RSSFeedHelper
+
+
+def measure(label, url, consume):
+    helper = RSSFeedHelper()
+    step = max(1, round(1 / consume)) if consume > 0 else None
+    tracemalloc.start()
+    started = time.perf_counter()
+    entries = helper.process_feeds([url])['entries']
+    fetched = time.perf_counter() - started
+    converted = 0
+    for index, entry in enumerate(entries):
+        if step and index % step == 0:
+            len(entry['content'])
+            converted += 1
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} fetch+parse {fetched * 1000:9.2f} ms   conversion {(total - fetched) * 1000:9.2f} ms   "
+          f"peak {peak / 1024 / 1024:7.2f} MiB   contents converted {converted}/{len(entries)}")
+
+
+def main():
+    parser = ArgumentParser(description="Feed entry extraction benchmark")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--consume", type=float, default=0.1, help="Fraction of entries whose content is read")
+    args = parser.parse_args()
+
+    server = FakeServer().start()
+    try:
+        server.feeds["arxiv"] = make_arxiv_feed(args.entries, base_url=server.url)
+        url = server.feed_url("arxiv")
+        # Warm up imports and the connection pool so neither run pays for them
+        RSSFeedHelper().process_feeds([url])
+        print(f"{args.entries} entries through process_feeds, reading content of {args.consume:.0%} of them")
+        measure("all converted", url, 1.0)
+        measure("lazy", url, args.consume)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""End-to-end pipeline benchmark against local fake feed, OpenAI and Telegram servers
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline                      # every scenario
+    python -m benchmarks.bench_pipeline --scenario medium --scenario flaky
+    python -m benchmarks.bench_pipeline --scenario large --batch --json results.json
+    python -m benchmarks.bench_pipeline --scenario medium --batch-api
+    python -m benchmarks.bench_pipeline --scenario large --embeddings
+    python -m benchmarks.bench_pipeline --scenario slow_summaries --output file --stream
+
+Each scenario serves a synthetic arXiv feed, or one read from --feed-file (a
+recorded feed, or the checked-in synthetic benchmarks/data/arxiv_sample.xml)
+with its arxiv.org links pointed at the fake server. It points RSS, API_BASE_URL
+and TELEGRAM_API_URL at the fake server and calls main.main() in a fresh
+process, so peak memory is per scenario. It reports entries/sec, p50/p95 latency per pipeline stage, peak
+RSS and the requests the fake server saw, including injected 429s and 5xx.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from functools import wraps
+
+import yaml
+
+from benchmarks.fake_servers import FakeServer, ServiceFaults
+from benchmarks.fixtures import load_feed, make_arxiv_feed
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIOS = {
+    "small": {"entries": 50},
+    "medium": {"entries": 500, "openai_latency": 0.02, "telegram_latency": 0.01},
+    "large": {"entries": 5000, "openai_latency": 0.02, "telegram_latency": 0.01},
+    "flaky": {"entries": 500, "openai_latency": 0.02, "telegram_latency": 0.01, "error_rate": 0.05, "rate_limit_rate": 0.05},
+    # Reasoning-model summaries taking seconds each, where streaming shortens time to first content
+    "slow_summaries": {"entries": 50, "openai_latency": 0.02, "telegram_latency": 0.01, "summary_seconds": 3.0},
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class StageTimer:
+    """Records the wall time of every call to the wrapped functions, grouped by stage"""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def wrap(self, owner, name, stage):
+        original = getattr(owner, name)
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.samples.setdefault(stage, []).append(time.perf_counter() - started)
+
+        setattr(owner, name, timed)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "total_s": sum(values)
+            }
+            for stage, values in sorted(self.samples.items())
+        }
+
+
+def scenario_config(workdir, server, feed_name, batch=False, output="telegram", batch_api=False, embeddings=False, profiles=0, pipeline=None, stream=False):
+    config = {
+        "LOG_LEVEL": "WARNING",
+        "API_KEY": "sk-bench",
+        "API_BASE_URL": f"{server.url}/v1",
+        "SELECTOR_MODEL": "bench-selector",
+        "SUMMARIZER_MODEL": "bench-summarizer",
+        "RSS": [{"feed_url": server.feed_url(feed_name), "name": feed_name, "timeout": 60}],
+        "INTERESTS": ["LLM Inference"],
+        "EXCLUSIONS": ["Robots"],
+        "CONCURRENCY": {"max_workers": 8, "requests_per_minute": 100000, "tokens_per_minute": 100000000},
+        "OPENAI_CLIENT": {"max_retries": 2},
+        "HTTP": {"pool_maxsize": 16},
+        "STORE": {"path": os.path.join(workdir, "store.db")},
+        "DAEMON": {"lock_path": os.path.join(workdir, "run.lock")},
+    }
+    if pipeline:
+        config["PIPELINE"] = pipeline
+    if stream:
+        config["STREAMING"] = {"enabled": True, "edit_interval": 1.0}
+    if batch:
+        config["SELECTOR_BATCH"] = {"enabled": True}
+    if batch_api:
+        config["BATCH_API"] = {"state_path": os.path.join(workdir, "batches.db"), "poll_seconds": 0.25, "max_poll_seconds": 1}
+    if embeddings:
+        # Thresholds suited to the fake server's hashed bag-of-words embeddings
+        config["EMBEDDINGS"] = {"model": "bench-embedding", "high": 0.15, "low": 0.0, "cache_path": os.path.join(workdir, "cache.db")}
+    if profiles:
+        # Identical subscribers, each with its own chat or file, so every relevant entry fans out to all of them
+        config["PROFILES"] = [
+            {"name": f"subscriber{n}", "interests": config["INTERESTS"], "exclusions": config["EXCLUSIONS"],
+             "telegram_chat_id": str(n), "output_file": os.path.join(workdir, f"out{n}.md")}
+            for n in range(1, profiles + 1)
+        ]
+        if output != "telegram":
+            for profile in config["PROFILES"]:
+                del profile["telegram_chat_id"]
+    if output == "telegram":
+        config.update({"TELEGRAM_BOT_TOKEN": "123:bench", "TELEGRAM_CHAT_ID": "1", "TELEGRAM_API_URL": server.url})
+        config["DELIVERY"] = {
+            "outbox_path": os.path.join(workdir, "outbox.db"),
+            "global_per_second": 1000, "chat_per_second": 1000,
+            "base_backoff": 0.1, "drain_timeout": 120
+        }
+    else:
+        config["OUTPUT_FILE"] = os.path.join(workdir, "out.md")
+    return config
+
+
+def run_scenario(config_path, verbose, results):
+    """Child process: instrument the pipeline stages, run main.main() once and report timings"""
+    if not verbose:
+        logging.disable(logging.CRITICAL)
+    import main
+    from utils.batch_helper import BatchClassifier
+    from utils.embedding_helper import EmbeddingScorer
+    from utils.openai_helper import OpenAIHelper
+    from utils.rss_helper import RSSFeedHelper
+    from utils.streaming_helper import FirstContentClock
+    from utils.telegram_bot_helper import TelegramBotHelper
+    from utils.yaml_helper import YAMLHelper
+
+    timer = StageTimer()
+    timer.wrap(RSSFeedHelper, "process_feed", "feed")
+    timer.wrap(OpenAIHelper, "_analyze_subject_from_abstract", "classify")
+    timer.wrap(OpenAIHelper, "classify_abstract_batch", "classify_batch")
+    timer.wrap(OpenAIHelper, "_match_profiles", "classify_profiles")
+    timer.wrap(BatchClassifier, "classify", "classify_batch_api")
+    timer.wrap(EmbeddingScorer, "decide", "embedding_score")
+    timer.wrap(main, "generate_paper_summary", "summarize")
+    timer.wrap(TelegramBotHelper, "send_message", "deliver")
+    timer.wrap(TelegramBotHelper, "edit_message_text", "deliver_edit")
+
+    # Time from an entry reaching the summarize stage to the first content a reader sees
+    mark = FirstContentClock.mark
+
+    def timed_mark(clock):
+        if not clock.seen:
+            timer.record("first_content", time.perf_counter() - clock.started)
+        mark(clock)
+
+    FirstContentClock.mark = timed_mark
+
+    config = YAMLHelper(config_path)
+    started = time.perf_counter()
+    main.main(config)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    peak_mib = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    results.put({"elapsed": elapsed, "peak_rss_mib": peak_mib, "stages": timer.summary()})
+
+
+def benchmark(name, params, feed_file=None, batch=False, output="telegram", verbose=False, batch_api=False, embeddings=False, profiles=0, pipeline=None, stream=False):
+    openai = ServiceFaults(params.get("openai_latency", 0), params.get("error_rate", 0), params.get("rate_limit_rate", 0), retry_after=0.2)
+    telegram = ServiceFaults(params.get("telegram_latency", 0), params.get("error_rate", 0), params.get("rate_limit_rate", 0), retry_after=1)
+    server = FakeServer(openai=openai, telegram=telegram, summary_seconds=params.get("summary_seconds", 0)).start()
+    try:
+        if feed_file:
+            server.feeds["arxiv"] = load_feed(feed_file, base_url=server.url)
+        else:
+            server.feeds["arxiv"] = make_arxiv_feed(params["entries"], base_url=server.url)
+        entries = server.feeds["arxiv"].count(b"<item>") or server.feeds["arxiv"].count(b"<entry>")
+
+        with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+            config_path = os.path.join(workdir, "config.yaml")
+            with open(config_path, "w") as f:
+                yaml.safe_dump(scenario_config(workdir, server, "arxiv", batch, output, batch_api, embeddings, profiles, pipeline, stream), f)
+
+            context = multiprocessing.get_context("spawn")
+            results = context.Queue()
+            process = context.Process(target=run_scenario, args=(config_path, verbose, results))
+            process.start()
+            while True:
+                try:
+                    result = results.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Scenario {name} failed (exit code {process.exitcode}); rerun with --verbose")
+            process.join()
+    finally:
+        server.stop()
+
+    result.update({
+        "scenario": name,
+        "entries": entries,
+        "entries_per_second": entries / result["elapsed"] if result["elapsed"] else 0.0,
+        "requests": server.stats(),
+        "params": params,
+        "batch": batch,
+        "batch_api": batch_api,
+        "embeddings": embeddings,
+        "profiles": profiles,
+        "pipeline": pipeline,
+        "stream": stream,
+        "output": output
+    })
+    return result
+
+
+def report(result):
+    modes = (", batched selection" if result['batch'] else "") + (", Batch API selection" if result['batch_api'] else "") + (", embedding scores" if result['embeddings'] else "") + (f", {result['profiles']} profiles" if result['profiles'] else "") + (f", pipeline {result['pipeline']}" if result['pipeline'] else "") + (", streamed" if result['stream'] else "")
+    print(f"\n== {result['scenario']}: {result['entries']} entries, {result['output']} output{modes}")
+    print(f"   {result['elapsed']:.2f} s total, {result['entries_per_second']:.1f} entries/s, peak RSS {result['peak_rss_mib']:.1f} MiB")
+    for stage, stats in result["stages"].items():
+        print(f"   {stage:<15} {stats['count']:6d} calls   p50 {stats['p50_ms']:8.1f} ms   p95 {stats['p95_ms']:8.1f} ms   total {stats['total_s']:7.2f} s")
+    for endpoint, count in result["requests"].items():
+        print(f"   {endpoint:<40} {count:6d}")
+
+
+def main():
+    parser = ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable, default all)")
+    parser.add_argument("--entries", type=int, help="Override the scenario's entry count")
+    parser.add_argument("--feed-file", help="Replay an RSS feed file instead of generating one")
+    parser.add_argument("--latency-ms", type=float, help="Override OpenAI and Telegram latency")
+    parser.add_argument("--error-rate", type=float, help="Override the injected 5xx rate")
+    parser.add_argument("--rate-limit-rate", type=float, help="Override the injected 429 rate")
+    parser.add_argument("--batch", action="store_true", help="Enable SELECTOR_BATCH")
+    parser.add_argument("--batch-api", action="store_true", help="Classify through the fake Batch API (BATCH_API mode)")
+    parser.add_argument("--embeddings", action="store_true", help="Score entries with the fake embeddings endpoint first (EMBEDDINGS)")
+    parser.add_argument("--profiles", type=int, default=0, help="Deliver to this many subscriber PROFILES instead of one chat or file")
+    parser.add_argument("--summarize-workers", type=int, help="PIPELINE summarize_workers (default 1)")
+    parser.add_argument("--unordered", action="store_true", help="Deliver in completion order instead of feed order")
+    parser.add_argument("--stream", action="store_true", help="Stream summaries into placeholder messages or file sections (STREAMING)")
+    parser.add_argument("--output", choices=["telegram", "file"], default="telegram")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's log output")
+    args = parser.parse_args()
+
+    pipeline = {}
+    if args.summarize_workers:
+        pipeline["summarize_workers"] = args.summarize_workers
+    if args.unordered:
+        pipeline["ordered"] = False
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        params = dict(SCENARIOS[name])
+        if args.entries:
+            params["entries"] = args.entries
+        if args.latency_ms is not None:
+            params["openai_latency"] = params["telegram_latency"] = args.latency_ms / 1000
+        if args.error_rate is not None:
+            params["error_rate"] = args.error_rate
+        if args.rate_limit_rate is not None:
+            params["rate_limit_rate"] = args.rate_limit_rate
+        result = benchmark(name, params, args.feed_file, args.batch, args.output, args.verbose, args.batch_api, args.embeddings, args.profiles, pipeline or None, args.stream)
+        report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Check that every prompt's static prefix stays byte-identical across entries
+
+Run from the repository root:
+    python -m benchmarks.bench_prompt_cache
+
+Renders the classifier, batch classifier, profile matcher and both summary
+requests for a set of synthetic abstracts (nothing is sent) and fails if any
+request does not start with its kind's static prefix, or if the prefix or
+prompt_cache_key differs between entries. Also reports each prefix's size
+against the provider's minimum cacheable prompt length. Exits with status 1
+on failure, so it can gate CI; tests/test_prompt_cache.py runs the same check.
+
+The built-in instructions are far below that minimum, so prompt_cache_key
+only saves tokens once INTERESTS/PROFILES are long enough to push a selector
+prefix past it (roughly a hundred short topics). Summary prefixes hold no
+topics and never reach it.
+"""
+import json
+import logging
+import os
+import random
+import sys
+from argparse import ArgumentParser
+
+if __package__ in (None, ""):
+    # Run as a script: make the repository root importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import FILLER, TOPICS
+from utils.openai_helper import (
+    OpenAIHelper, estimate_tokens, classifier_prefix, batch_classifier_prefix, profile_match_prefix, SUMMARY_PROMPTS, SUMMARY_USER_PROMPT
+)
+
+# Prompts shorter than this are never served from the provider's prompt cache
+MIN_CACHEABLE_TOKENS = 1024
+
+TARGETS = ["LLM Inference"]
+EXCLUSIONS = ["Robots"]
+PROFILES = [
+    {"name": "inference", "interests": ["LLM Inference"], "exclusions": ["Robots"]},
+    {"name": "vision", "interests": ["Computer Vision", "Video Generation"], "exclusions": []},
+]
+STATIC_PREFIXES = {
+    "classify": classifier_prefix(TARGETS, EXCLUSIONS),
+    "classify_batch": batch_classifier_prefix(TARGETS, EXCLUSIONS),
+    "classify_profiles": profile_match_prefix(PROFILES),
+    "summarize_message": f"{SUMMARY_PROMPTS['message']}\n{SUMMARY_USER_PROMPT}",
+    "summarize_markdown": f"{SUMMARY_PROMPTS['markdown']}\n{SUMMARY_USER_PROMPT}",
+}
+
+
+class RecordingClient:
+    """Stands in for the OpenAI client and keeps every request instead of sending it"""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = self
+
+    def create(self, **request):
+        self.requests.append(request)
+        return type("Response", (), {"output_text": json.dumps({"results": [], "matches": []}), "usage": None})()
+
+
+def rendered_text(request):
+    """Everything the model reads before generating, in order"""
+    parts = []
+    for message in request["input"]:
+        content = message["content"]
+        if isinstance(content, str):
+            parts.append(content)
+            continue
+        for part in content:
+            parts.append(part.get("text") or part.get("file_url") or part.get("file_id") or "")
+    return "\n".join(parts)
+
+
+def render(kind, abstracts):
+    """Build one request of the given kind per abstract (two abstracts per batch request)"""
+    client = RecordingClient()
+    helper = OpenAIHelper("sk-bench", client=client, model="bench", role="summarizer" if kind.startswith("summarize") else "selector")
+    for i, abstract in enumerate(abstracts):
+        if kind == "classify":
+            client.create(**helper.classifier_request(abstract, TARGETS, EXCLUSIONS))
+        elif kind == "classify_batch":
+            helper.classify_abstract_batch({"a": abstract, "b": abstracts[i - 1]}, TARGETS, EXCLUSIONS)
+        elif kind == "classify_profiles":
+            helper.match_profiles(abstract, PROFILES)
+        else:
+            template = kind.split("_", 1)[1]
+            client.create(**helper.summary_request(template, {"type": "input_text", "text": f"<paper>\n{abstract}\n</paper>"}))
+    # Batches whose verdicts go missing are retried one by one; keep only the batch requests
+    return [request for request in client.requests if kind != "classify_batch" or "json_schema" in json.dumps(request.get("text"))]
+
+
+def common_prefix(texts):
+    prefix = texts[0]
+    for text in texts[1:]:
+        while not text.startswith(prefix):
+            prefix = prefix[:-1]
+    return prefix
+
+
+def check_prefixes(entries=50, seed=0):
+    """Render every kind of request for synthetic abstracts
+
+    Returns {kind: (requests rendered, prefix tokens, prompt_cache_keys seen, stable)}.
+    """
+    # Batches get no verdicts back here, so their retry warnings are expected
+    logging.disable(logging.WARNING)
+    rng = random.Random(seed)
+    abstracts = [f"We study {rng.choice(TOPICS)}. {FILLER * rng.randint(1, 4)}" for _ in range(entries)]
+    results = {}
+    for kind, static_prefix in STATIC_PREFIXES.items():
+        requests = render(kind, abstracts)
+        texts = [rendered_text(request) for request in requests]
+        keys = {request.get("prompt_cache_key") for request in requests}
+        # Every request must open with the static prefix, and nothing that varies may come before its end
+        stable = len(keys) == 1 and None not in keys and all(text.startswith(static_prefix) for text in texts) and len(common_prefix(texts)) >= len(static_prefix)
+        results[kind] = (len(requests), estimate_tokens(static_prefix), keys, stable)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="Static prompt prefix stability check")
+    parser.add_argument("--entries", type=int, default=50)
+    args = parser.parse_args()
+
+    failed = False
+    for kind, (count, tokens, keys, stable) in check_prefixes(args.entries).items():
+        note = "" if tokens >= MIN_CACHEABLE_TOKENS else f" (below the {MIN_CACHEABLE_TOKENS}-token cache minimum)"
+        print(f"{kind:<19} {count:4d} requests   static prefix ~{tokens:5d} tokens   key {next(iter(keys)) if len(keys) == 1 else keys}{note}")
+        if not stable:
+            print(f"   prefix or prompt_cache_key of {kind} varies between entries")
+            failed = True
+
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
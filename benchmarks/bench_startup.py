@@ -0,0 +1,66 @@
+"""Check CLI start-up against the import-time budget in benchmarks/import_budget.json
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+
+Imports the module under `python -X importtime` in fresh interpreters and
+compares the median cumulative import time with budget_ms. It also fails if
+any of the forbidden (heavy, lazily loaded) packages is imported at start-up.
+Exits with status 1 when the budget is exceeded, so it can gate CI.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(ROOT, "benchmarks", "import_budget.json")
+
+
+def import_times(module):
+    """Import module in a fresh interpreter; returns {module name: cumulative microseconds}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            times[name] = int(cumulative)
+    return times
+
+
+def main():
+    parser = ArgumentParser(description="Start-up import-time budget check")
+    parser.add_argument("--budget-file", default=BUDGET_FILE)
+    args = parser.parse_args()
+
+    with open(args.budget_file) as f:
+        budget = json.load(f)
+    module = budget["module"]
+
+    samples = []
+    loaded = set()
+    for _ in range(budget.get("runs", 5)):
+        times = import_times(module)
+        samples.append(times[module] / 1000)
+        loaded.update(name.split(".")[0] for name in times)
+
+    median = statistics.median(samples)
+    forbidden = sorted(set(budget.get("forbidden", [])) & loaded)
+    print(f"import {module}: median {median:.1f} ms over {len(samples)} runs (budget {budget['budget_ms']} ms)")
+    if forbidden:
+        print(f"Imported at start-up but should be lazy: {', '.join(forbidden)}")
+    if median > budget["budget_ms"] or forbidden:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
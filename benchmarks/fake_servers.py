@@ -0,0 +1,378 @@
+"""Local stand-ins for the arXiv feed, the OpenAI Responses, Embeddings, Files and Batch APIs and the Telegram Bot API
+
+One threaded HTTP server answers all of them so a benchmark can point
+RSS feed_url, API_BASE_URL and TELEGRAM_API_URL at it. Latency, a 5xx error
+rate and a 429 rate are configurable per service, and every request is
+counted by endpoint and status. Batches complete batch_delay seconds after
+they are created; the OpenAI error rate also fails individual batch requests.
+Embeddings come from the deterministic HashingEmbeddingProvider. Summaries
+take summary_seconds to generate and are streamed word by word as
+server-sent events when the request asks for stream. Feeds carry an ETag
+and answer a matching If-None-Match with 304. Uploaded files are kept under
+their own IDs, and file_inputs counts the summary requests citing each one.
+"""
+import base64
+import email
+import hashlib
+import itertools
+import json
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from utils.embedding_helper import HashingEmbeddingProvider
+from utils.openai_helper import convert_summary
+
+# Abstracts mentioning these (and not "robot") are classified as relevant
+RELEVANT_KEYWORDS = ("llm", "language model")
+
+SUMMARY = (
+    "❓ Problems:\n  Existing methods are slow.\n\n"
+    "🛠️ Core Method:\n  A faster method.\n\n"
+    "📈 Main Results/Impact:\n  2x faster on standard benchmarks.\n\n"
+    "⚠️ Limitation:\n  Evaluated on one model family."
+)
+# What the summarizer returns when asked for Markdown (file output)
+SUMMARY_MARKDOWN = convert_summary(SUMMARY, "markdown")
+
+
+def is_relevant(abstract: str) -> bool:
+    text = abstract.lower()
+    return any(keyword in text for keyword in RELEVANT_KEYWORDS) and "robot" not in text
+
+
+def response_body(text: str, input_tokens: int = 100, output_tokens: int = 20) -> Dict:
+    """Minimal Responses API object carrying text as its output"""
+    return {
+        "id": "resp_bench", "object": "response", "created_at": int(time.time()), "model": "bench",
+        "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "output": [{
+            "type": "message", "id": "msg_bench", "role": "assistant", "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        }],
+        "usage": {
+            "input_tokens": input_tokens, "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens, "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens
+        }
+    }
+
+
+class ServiceFaults:
+    """Latency and failure injection for one service"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+
+
+class FakeServer:
+    """Serves feeds, PDFs, the OpenAI Responses/Files API and the Telegram Bot API from one port"""
+
+    def __init__(
+        self,
+        feeds: Optional[Dict[str, bytes]] = None,
+        openai: Optional[ServiceFaults] = None,
+        telegram: Optional[ServiceFaults] = None,
+        pdf_size: int = 200 * 1000,
+        batch_delay: float = 1.0,
+        summary_seconds: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.feeds = feeds or {}
+        self.faults = {"openai": openai or ServiceFaults(), "telegram": telegram or ServiceFaults(), "feed": ServiceFaults(), "pdf": ServiceFaults()}
+        self.pdf = b"%PDF-1.4\n" + b"0" * max(0, pdf_size - 9)
+        self.batch_delay = batch_delay
+        self.summary_seconds = summary_seconds
+        self.embedder = HashingEmbeddingProvider()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.ids = itertools.count(1)
+        self.files: Dict[str, bytes] = {}
+        # How many summary requests referenced each uploaded file ID
+        self.file_inputs = Counter()
+        self.batches: Dict[str, Dict] = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed_url(self, name: str) -> str:
+        return f"{self.url}/feeds/{name}.xml"
+
+    def start(self) -> "FakeServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        """Request counts keyed by 'service endpoint status'"""
+        with self.lock:
+            return dict(sorted(self.requests.items()))
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.file_inputs.clear()
+
+    def _inject(self, service: str) -> Optional[str]:
+        """Sleep for the service latency, then decide whether to fail: returns 'error', 'rate_limit' or None"""
+        faults = self.faults[service]
+        if faults.latency:
+            time.sleep(faults.latency)
+        with self.lock:
+            roll = self.random.random()
+        if roll < faults.rate_limit_rate:
+            return "rate_limit"
+        if roll < faults.rate_limit_rate + faults.error_rate:
+            return "error"
+        return None
+
+    def _store_file(self, content: bytes) -> str:
+        with self.lock:
+            file_id = f"file-{next(self.ids)}"
+            self.files[file_id] = content
+        return file_id
+
+    def _batch_state(self, batch_id: str) -> Optional[Dict]:
+        """The batch object, completing it (and writing its output files) once batch_delay has passed"""
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= self.batch_delay:
+            outputs, errors = [], []
+            for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                with self.lock:
+                    failed = self.random.random() < self.faults["openai"].error_rate
+                prompt = request["body"]["input"][0]["content"]
+                if failed:
+                    errors.append({"id": f"batch_req_{next(self.ids)}", "custom_id": request["custom_id"],
+                                   "response": {"status_code": 500, "body": {"error": {"message": "Injected server error"}}}, "error": None})
+                else:
+                    verdict = "yes" if is_relevant(prompt.split("Abstract:")[-1]) else "no"
+                    outputs.append({"id": f"batch_req_{next(self.ids)}", "custom_id": request["custom_id"],
+                                    "response": {"status_code": 200, "body": response_body(verdict, output_tokens=1)}, "error": None})
+            batch["output_file_id"] = self._store_file("".join(json.dumps(line) + "\n" for line in outputs).encode("utf-8")) if outputs else None
+            batch["error_file_id"] = self._store_file("".join(json.dumps(line) + "\n" for line in errors).encode("utf-8")) if errors else None
+            batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+        return batch
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, service: str, endpoint: str, status: int, body, content_type: str = "application/json", headers: Optional[Dict] = None):
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                with server.lock:
+                    server.requests[f"{service} {endpoint} {status}"] += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                match = re.match(r"^/feeds/(.+)\.xml$", path)
+                if match and match.group(1) in server.feeds:
+                    feed = server.feeds[match.group(1)]
+                    etag = f'"{hashlib.sha256(feed).hexdigest()[:16]}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send("feed", match.group(1), 304, b"", "application/rss+xml", headers={"ETag": etag})
+                    return self._send("feed", match.group(1), 200, feed, "application/rss+xml", headers={"ETag": etag})
+                if path.startswith("/abs/"):
+                    return self._send("pdf", self.command, 200, server.pdf, "application/pdf")
+                match = re.match(r"^.*/batches/([\w-]+)$", path)
+                if match:
+                    batch = server._batch_state(match.group(1))
+                    if batch is None:
+                        return self._send("openai", "batches.retrieve", 404, {"error": {"message": "No such batch"}})
+                    return self._openai("batches.retrieve", batch)
+                match = re.match(r"^.*/files/([\w-]+)/content$", path)
+                if match and match.group(1) in server.files:
+                    return self._send("openai", "files.content", 200, server.files[match.group(1)], "application/octet-stream")
+                match = re.match(r"^/bot[^/]+/(\w+)$", path)
+                if match:
+                    return self._telegram(match.group(1), {})
+                self._send("unknown", path, 404, {"error": "not found"})
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                body = self._read_body()
+                if path.endswith("/responses"):
+                    return self._responses(json.loads(body or b"{}"))
+                if path.endswith("/embeddings"):
+                    return self._embeddings(json.loads(body or b"{}"))
+                if path.endswith("/files"):
+                    purpose, filename, content = self._multipart_file(body)
+                    file_id = server._store_file(content)
+                    return self._openai("files", {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": filename, "purpose": purpose})
+                if path.endswith("/batches"):
+                    request = json.loads(body or b"{}")
+                    with server.lock:
+                        batch_id = f"batch_{next(server.ids)}"
+                        server.batches[batch_id] = {
+                            "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"), "input_file_id": request.get("input_file_id"),
+                            "completion_window": request.get("completion_window"), "status": "in_progress", "created_at": int(time.time()),
+                            "metadata": request.get("metadata"), "request_counts": {"total": 0, "completed": 0, "failed": 0}
+                        }
+                    return self._openai("batches.create", server.batches[batch_id])
+                match = re.match(r"^/bot[^/]+/(\w+)$", path)
+                if match:
+                    return self._telegram(match.group(1), json.loads(body or b"{}"))
+                self._send("unknown", path, 404, {"error": "not found"})
+
+            def _multipart_file(self, body: bytes):
+                """(purpose, filename, content) of a multipart/form-data Files API upload"""
+                message = email.message_from_bytes(f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + body)
+                purpose, filename, content = "user_data", "upload", b""
+                for part in message.get_payload() if message.is_multipart() else []:
+                    if part.get_param("name", header="content-disposition") == "purpose":
+                        purpose = part.get_payload(decode=True).decode("utf-8")
+                    elif part.get_filename():
+                        filename, content = part.get_filename(), part.get_payload(decode=True)
+                return purpose, filename, content
+
+            def _openai_fault(self, endpoint: str) -> bool:
+                """Inject latency and answer with an injected failure, returns whether one was sent"""
+                fault = server._inject("openai")
+                if fault == "rate_limit":
+                    retry_after = server.faults["openai"].retry_after
+                    self._send("openai", endpoint, 429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                               headers={"retry-after-ms": str(int(retry_after * 1000))})
+                elif fault == "error":
+                    self._send("openai", endpoint, 500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                return fault is not None
+
+            def _openai(self, endpoint: str, payload: Dict):
+                if not self._openai_fault(endpoint):
+                    self._send("openai", endpoint, 200, payload)
+
+            def _openai_stream(self, endpoint: str, payload: Dict):
+                """Stream a response's text as Responses API events, one word at a time over summary_seconds"""
+                if self._openai_fault(endpoint):
+                    return
+                with server.lock:
+                    server.requests[f"openai {endpoint} 200"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                words = re.findall(r"\s*\S+", payload["output"][0]["content"][0]["text"])
+                events = [{"type": "response.created", "response": {**payload, "status": "in_progress", "output": [], "usage": None}}]
+                events += [{"type": "response.output_text.delta", "item_id": "msg_bench", "output_index": 0, "content_index": 0, "delta": word, "logprobs": []} for word in words]
+                events.append({"type": "response.completed", "response": payload})
+                try:
+                    for number, event in enumerate(events):
+                        if event["type"] == "response.output_text.delta" and server.summary_seconds:
+                            time.sleep(server.summary_seconds / len(words))
+                        self.wfile.write(f"event: {event['type']}\ndata: {json.dumps({**event, 'sequence_number': number})}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client went away mid-stream, e.g. a run that crashed
+                    pass
+
+            def _responses(self, request: Dict):
+                prompt = json.dumps(request.get("input"))
+                text_format = (request.get("text") or {}).get("format") or {}
+                if text_format.get("name") == "profile_match":
+                    # Profile matching: a relevant abstract matches every profile
+                    names = text_format["schema"]["properties"]["matches"]["items"]["enum"]
+                    matches = names if is_relevant(request["input"][0]["content"].split("Abstract:")[-1]) else []
+                    return self._openai("responses.classify_profiles", response_body(json.dumps({"matches": matches}), output_tokens=5 * len(names)))
+                if text_format.get("type") == "json_schema":
+                    # Batch classification: one verdict per positional [ID n] tag
+                    parts = re.split(r"\[ID (\d+)\]", request["input"][0]["content"])
+                    results = [{"id": tag, "relevant": is_relevant(abstract)} for tag, abstract in zip(parts[1::2], parts[2::2])]
+                    return self._openai("responses.batch", response_body(json.dumps({"results": results}), output_tokens=10 * len(results)))
+                if "binary classifier" in prompt:
+                    return self._openai("responses.classify", response_body("yes" if is_relevant(prompt.split("Abstract:")[-1]) else "no", output_tokens=1))
+                summary = SUMMARY_MARKDOWN if "Markdown format" in prompt else SUMMARY
+                with server.lock:
+                    for message in request.get("input") or []:
+                        for part in message["content"] if isinstance(message["content"], list) else []:
+                            if part.get("type") == "input_file" and part.get("file_id"):
+                                server.file_inputs[part["file_id"]] += 1
+                if request.get("stream"):
+                    return self._openai_stream("responses.summarize_stream", response_body(summary, input_tokens=8000, output_tokens=120))
+                time.sleep(server.summary_seconds)
+                self._openai("responses.summarize", response_body(summary, input_tokens=8000, output_tokens=120))
+
+            def _embeddings(self, request: Dict):
+                texts = request.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                data = []
+                for index, vector in enumerate(server.embedder.embed(texts)):
+                    if request.get("encoding_format") == "base64":
+                        # The SDK asks for little-endian float32 in base64 by default
+                        vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+                    data.append({"object": "embedding", "index": index, "embedding": vector})
+                tokens = sum(len(text.split()) for text in texts)
+                self._openai("embeddings", {"object": "list", "data": data, "model": request.get("model"), "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+            def _telegram(self, method: str, payload: Dict):
+                fault = server._inject("telegram")
+                if fault == "rate_limit":
+                    retry_after = server.faults["telegram"].retry_after
+                    return self._send("telegram", method, 429, {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after:g}", "parameters": {"retry_after": retry_after}})
+                if fault == "error":
+                    return self._send("telegram", method, 500, {"ok": False, "error_code": 500, "description": "Injected server error"})
+                if method == "getMe":
+                    return self._send("telegram", method, 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}})
+                result = {"message_id": payload.get("message_id") or next(server.ids), "date": int(time.time()), "chat": {"id": payload.get("chat_id")}, "text": payload.get("text", "")}
+                self._send("telegram", method, 200, {"ok": True, "result": result})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # Serve a small feed until interrupted, for manual runs against a config
+    from benchmarks.fixtures import make_arxiv_feed
+    fake = FakeServer()
+    fake.feeds["arxiv"] = make_arxiv_feed(50, base_url=fake.url)
+    fake.start()
+    print(f"Feed: {fake.feed_url('arxiv')}\nAPI_BASE_URL: {fake.url}/v1\nTELEGRAM_API_URL: {fake.url}")
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,69 @@
+import os
+import random
+from html import escape
+from typing import Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# Synthetic, not recorded from arXiv: make_arxiv_feed(50) with seed 0 and one item per line,
+# checked in so results can be compared across changes
+SAMPLE_FEED = os.path.join(DATA_DIR, "arxiv_sample.xml")
+# What bench_pipeline --scenario small --feed-file SAMPLE_FEED produced for the reference commit
+SAMPLE_REFERENCE = os.path.join(DATA_DIR, "arxiv_sample_reference.json")
+
+TOPICS = [
+    "LLM inference acceleration with speculative decoding",
+    "KV cache compression for long-context language models",
+    "robot grasping from language instructions",
+    "semantic segmentation of aerial images",
+    "diffusion models for video generation",
+    "graph neural networks for molecule property prediction",
+    "reinforcement learning from human feedback",
+    "vision-language pretraining at scale",
+]
+
+FILLER = (
+    "We propose a simple and effective method that improves over strong baselines. "
+    "Extensive experiments on standard benchmarks demonstrate consistent gains, "
+    "and ablations show that each component contributes to the final performance. "
+)
+
+
+def make_arxiv_feed(entries: int, seed: int = 0, base_url: str = "https://arxiv.org", replace_ratio: float = 0.1) -> bytes:
+    """Build a deterministic arXiv-style RSS 2.0 feed with the given number of entries"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(entries):
+        arxiv_id = f"2510.{10000 + i:05d}"
+        version = 2 if rng.random() < replace_ratio else 1
+        announce_type = "replace" if version > 1 else rng.choice(["new", "new", "new", "cross"])
+        topic = rng.choice(TOPICS)
+        abstract = f"<p>We study {topic}. {FILLER * rng.randint(2, 5)}</p>"
+        description = f"arXiv:{arxiv_id}v{version} Announce Type: {announce_type} \nAbstract: {abstract}"
+        items.append(
+            "<item>"
+            f"<title>{escape(topic.capitalize())} ({i})</title>"
+            f"<link>{base_url}/abs/{arxiv_id}</link>"
+            f"<description>{escape(description)}</description>"
+            f'<guid isPermaLink="false">oai:arXiv.org:{arxiv_id}v{version}</guid>'
+            "<category>cs.AI</category><category>cs.CL</category>"
+            f"<arxiv:announce_type>{announce_type}</arxiv:announce_type>"
+            "<dc:creator>A. Author, B. Author</dc:creator>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss xmlns:arxiv="http://arxiv.org/schemas/atom" xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0">'
+        "<channel><title>cs.AI updates on arXiv.org</title>"
+        f"<link>{base_url}/list/cs.AI/new</link><description>Synthetic benchmark feed</description>"
+        + "".join(items) +
+        "</channel></rss>"
+    ).encode("utf-8")
+
+
+def load_feed(path: str, base_url: Optional[str] = None) -> bytes:
+    """Read a feed file (recorded, or the synthetic SAMPLE_FEED), pointing its arxiv.org links at base_url (e.g. the fake server) when given"""
+    with open(path, "rb") as f:
+        feed = f.read()
+    if base_url:
+        feed = feed.replace(b"https://arxiv.org/", base_url.encode("utf-8") + b"/")
+    return feed
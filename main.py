@@ -1,124 +1,1272 @@
 from utils.yaml_helper import YAMLHelper
-from utils.rss_helper import RSSFeedHelper
-from utils.openai_helper import OpenAIHelper
-from utils.telegram_bot_helper import TelegramBotHelper
+from utils.rss_helper import RSSFeedHelper, FeedEntry, entry_key
+from utils.openai_helper import OpenAIHelper, estimate_tokens, pack_abstract_batches, convert_summary, SUMMARY_TEMPLATES, CLASSIFIER_PROMPT_TOKENS, BATCH_CLASSIFIER_PROMPT_TOKENS, PROFILE_PROMPT_TOKENS, PROFILE_ITEM_TOKENS
+from utils.store_helper import EntryStoreHelper
+from utils.journal_helper import RunJournal
+from utils.concurrency_helper import RateLimiter, run_concurrently
+from utils.prefilter_helper import PrefilterHelper
+from utils.cache_helper import SQLiteCache, TieredCache
+from utils.scheduler_helper import FeedScheduler, RunLock
+from utils.batch_helper import BatchClassifier
+from utils.pipeline_helper import Pipeline, Stage
+from utils.metrics_helper import Metrics, NULL_METRICS
 from argparse import ArgumentParser
 from utils.logger import MyLogger
 from logging import INFO, DEBUG, WARNING, ERROR, CRITICAL
-import requests
 import os
 import html
+import importlib.util
+import signal
+import sys
+import threading
+import time
 
+logger = MyLogger("RSS-Auto-Reader")
 
-def summarize_selected_paper(config, entry, file_mode=False):
-    summarizer = OpenAIHelper(api_key=config.data.get("API_KEY", ""), model=config.data.get("SUMMARIZER_MODEL", "gpt-5-mini"), api_base_url=config.data.get("API_BASE_URL", None), reasoning=config.data.get("SUMMARIZER_MODEL_REASONING", None))
+# Outbox dedupe keys of PROFILES deliveries are "<entry key>|profile:<name>"
+PROFILE_KEY_SEPARATOR = "|profile:"
+
+
+def get_feed_configs(config):
+    """Normalize RSS config (a single feed dict, a list of feeds or bare URLs) into a list of feed dicts"""
+    rss = config.data.get("RSS") or {}
+    feeds = rss if isinstance(rss, list) else [rss]
+    feeds = [{'feed_url': feed} if isinstance(feed, str) else feed for feed in feeds]
+    return [feed for feed in feeds if feed.get('feed_url')]
+
+
+def get_profiles(config):
+    """Subscriber profiles as dicts with name, interests, exclusions, telegram_chat_id and output_file
+
+    Without PROFILES, the top-level INTERESTS, EXCLUSIONS and output settings
+    form a single unnamed profile (name None) that delivers to Telegram when
+    both TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID are set, else to OUTPUT_FILE.
+    """
+    telegram = bool(config.data.get("TELEGRAM_BOT_TOKEN"))
+    if not config.data.get("PROFILES"):
+        chat_id = config.data.get("TELEGRAM_CHAT_ID") if telegram else None
+        return [{
+            'name': None,
+            'interests': config.data.get("INTERESTS", []),
+            'exclusions': config.data.get("EXCLUSIONS", []),
+            'telegram_chat_id': chat_id or None,
+            'output_file': None if chat_id else config.data.get("OUTPUT_FILE")
+        }]
+    if any(not profile.get('name') for profile in config.data["PROFILES"]):
+        raise ValueError("Every PROFILES entry needs a name.")
+    return [{
+        'name': str(profile['name']),
+        'interests': profile.get('interests') or [],
+        'exclusions': profile.get('exclusions') or [],
+        'telegram_chat_id': profile.get('telegram_chat_id') if telegram else None,
+        'output_file': profile.get('output_file')
+    } for profile in config.data["PROFILES"]]
+
+
+def delivery_key(key, profile):
+    return key if profile['name'] is None else f"{key}{PROFILE_KEY_SEPARATOR}{profile['name']}"
+
+
+def mark_delivered(store, dedupe_key):
+    """Record an outbox delivery in the store, per profile for PROFILES deliveries"""
+    key, _, profile = dedupe_key.partition(PROFILE_KEY_SEPARATOR)
+    store.mark_delivered(key, profile or None)
+
+
+def summary_cache_key(config, entry, template):
+    model = config.data.get("SUMMARIZER_MODEL", "gpt-5-mini")
+    reasoning = config.data.get("SUMMARIZER_MODEL_REASONING", None) or ""
+    return f"{entry_key(entry)}|{model}|{reasoning}|{template}"
+
+
+def summarize_selected_paper(config, entry, summarizer, file_mode=False, summary_cache=None, http=None, pdf_helper=None, stream=None):
+    template = "markdown" if file_mode else "message"
+    if summary_cache is not None:
+        summary = summary_cache.get(summary_cache_key(config, entry, template))
+        if summary:
+            logger.info(f"Using cached summary for: {entry['title']}")
+            return summary
+        for other_template in SUMMARY_TEMPLATES:
+            other = summary_cache.get(summary_cache_key(config, entry, other_template)) if other_template != template else None
+            if other:
+                logger.info(f"Re-rendering cached {other_template} summary for: {entry['title']}")
+                summary = convert_summary(other, template)
+                summary_cache.set(summary_cache_key(config, entry, template), summary)
+                return summary
+
+    summary = generate_paper_summary(config, entry, summarizer, file_mode, http=http, pdf_helper=pdf_helper, stream=stream)
+    if summary and summary_cache is not None:
+        summary_cache.set(summary_cache_key(config, entry, template), summary)
+    return summary
+
+
+def extract_paper_text(config, entry, link, pdf_helper):
+    """Return the paper's extracted text within the SUMMARY_INPUT token budget, or None to send the PDF instead"""
+    input_config = config.data.get("SUMMARY_INPUT") or {}
+    try:
+        extracted = pdf_helper.prepare_text(link, input_config.get("token_budget", 12000), drop_back_matter=input_config.get("drop_sections", True))
+    except Exception as e:
+        logger.warning(f"Could not extract text from {link}, sending the PDF instead: {e}")
+        return None
+    if not extracted.text.strip():
+        logger.warning(f"No text extracted from {link}, sending the PDF instead.")
+        return None
+    saved = 1 - extracted.sent_tokens / extracted.full_tokens
+    logger.info(f"Paper text for {entry['title']}: ~{extracted.full_tokens} tokens in {extracted.pages} pages, sending ~{extracted.sent_tokens} ({saved:.0%} saved)")
+    return extracted.text
+
+
+def generate_paper_summary(config, entry, summarizer, file_mode=False, http=None, pdf_helper=None, stream=None):
+    """Summarize the entry's PDF, as extracted text in SUMMARY_INPUT text mode or as a file
+
+    PDFs over 10 M are uploaded through the Files API when LARGE_PDF is
+    enabled and skipped otherwise. A SummaryStream is opened when the request
+    starts and receives the summary as it is generated.
+    """
     link = entry.get("link", "")
     if not link:
         logger.warning("No link found for entry.")
         return
 
     link = link.replace("https://arxiv.org/abs/", "https://arxiv.org/pdf/") + ".pdf"
-    file_size = int(requests.head(link, allow_redirects=True).headers.get("Content-Length", 0))
-    if file_size / (1000 * 1000) > 10:
-        # TODO: use file upload method to get rid of the limitation
-        logger.warning(f"File size is {file_size / (1000 * 1000):.2f} M, no summary will be generated.")
-        return
+    file_size = int(http.head(link, allow_redirects=True).headers.get("Content-Length", 0))
+    text = None
+    if pdf_helper and (config.data.get("SUMMARY_INPUT") or {}).get("mode") == "text":
+        if pdf_helper.max_bytes and file_size > pdf_helper.max_bytes:
+            logger.warning(f"File size is {file_size / (1000 * 1000):.2f} M, above the download limit, no summary will be generated.")
+            return
+        text = extract_paper_text(config, entry, link, pdf_helper)
+
+    file_id = None
+    if text is None and file_size / (1000 * 1000) > 10:
+        if not pdf_helper or not large_pdf_uploads_enabled(config):
+            logger.warning(f"File size is {file_size / (1000 * 1000):.2f} M, no summary will be generated.")
+            return
+        if pdf_helper.max_bytes and file_size > pdf_helper.max_bytes:
+            logger.warning(f"File size is {file_size / (1000 * 1000):.2f} M, above the upload limit, no summary will be generated.")
+            return
+        try:
+            file_id = pdf_helper.upload(link, summarizer.upload_file)
+        except Exception as e:
+            logger.error(f"Could not upload large PDF for {entry['title']}: {e}")
+            return
     logger.info(f"Summarizing paper: {entry['title']} from {link}")
+    on_text = None
+    if stream is not None:
+        stream.open()
+        on_text = stream.update
     if file_mode:
-        summary = summarizer.summarize_paper_markdown(link)
+        summary = summarizer.summarize_paper_markdown(link, file_id=file_id, text=text, on_text=on_text)
     else:
-        summary = summarizer.summarize_paper_message(link)
+        summary = summarizer.summarize_paper_message(link, file_id=file_id, text=text, on_text=on_text)
     logger.debug(f"Summary for {entry['title']}: {summary}")
 
     return summary
 
-def send_message_to_telegram(config, text):
-    telegram_bot_token = config.data.get("TELEGRAM_BOT_TOKEN", "")
-    telegram_chat_id = config.data.get("TELEGRAM_CHAT_ID", "")
-    if not telegram_bot_token or not telegram_chat_id:
+def send_message_to_telegram(config, text, telegram_helper, chat_id=None):
+    telegram_chat_id = chat_id or config.data.get("TELEGRAM_CHAT_ID", "")
+    if not telegram_helper or not telegram_chat_id:
         logger.warning("Telegram bot token or chat ID is not set.")
         return
-    telegram_helper = TelegramBotHelper(telegram_bot_token)
     try:
         response = telegram_helper.send_message(chat_id=telegram_chat_id, text=text, parse_mode="html", disable_web_page_preview=True)
         logger.info("Message sent to Telegram.")
         logger.debug(f"Telegram response: {response}")
+        return True
     except Exception as e:
         logger.error(f"Error sending message to Telegram: {e}")
         logger.debug(f"Failed message content: {text}")
+        return False
 
 
-def main(config):
+# HTTP, Telegram, PDF and OpenAI client helpers pull in requests or the OpenAI SDK,
+# so they are imported where they are first opened rather than at start-up
+
+def open_http_helper(config):
+    from utils.http_helper import HTTPHelper
+    http_config = config.data.get("HTTP") or {}
+    return HTTPHelper(
+        pool_connections=http_config.get("pool_connections", 10),
+        pool_maxsize=http_config.get("pool_maxsize", 10),
+        timeout=http_config.get("timeout", 10),
+        retries=http_config.get("retries", 3),
+        backoff_factor=http_config.get("backoff_factor", 0.5)
+    )
+
+
+def open_client_registry(config, metrics=None):
+    from utils.openai_client_helper import OpenAIClientRegistry
+    client_config = config.data.get("OPENAI_CLIENT") or {}
+    return OpenAIClientRegistry(
+        max_connections=client_config.get("max_connections", 20),
+        max_keepalive_connections=client_config.get("max_keepalive_connections", 10),
+        keepalive_expiry=client_config.get("keepalive_expiry", 30),
+        timeout=client_config.get("timeout", 600),
+        max_retries=client_config.get("max_retries", 2),
+        http2=client_config.get("http2", False),
+        metrics=metrics
+    )
+
+
+def open_model_helpers(config, clients, verdict_cache=None, metrics=None):
+    """Build the selector and summarizer helpers on shared, long-lived clients"""
+    api_key = config.data.get("API_KEY", "") or os.getenv("OPENAI_API_KEY")
+    api_base_url = config.data.get("API_BASE_URL", None)
+    subject_analyzer = OpenAIHelper(
+        api_key=api_key, model=config.data.get("SELECTOR_MODEL", "gpt-5-nano"), api_base_url=api_base_url,
+        reasoning=config.data.get("SELECTOR_MODEL_REASONING", None), verdict_cache=verdict_cache,
+        client=clients.get_client(api_key, api_base_url, role="selector") if api_key else None,
+        role="selector", metrics=metrics, prompt_cache_keys=config.data.get("PROMPT_CACHE_KEY", True)
+    )
+    summarizer = OpenAIHelper(
+        api_key=api_key, model=config.data.get("SUMMARIZER_MODEL", "gpt-5-mini"), api_base_url=api_base_url,
+        reasoning=config.data.get("SUMMARIZER_MODEL_REASONING", None),
+        client=clients.get_client(api_key, api_base_url, role="summarizer") if api_key else None,
+        role="summarizer", metrics=metrics, prompt_cache_keys=config.data.get("PROMPT_CACHE_KEY", True)
+    )
+    return subject_analyzer, summarizer
+
+
+def open_telegram_helper(config, http):
+    if not config.data.get("TELEGRAM_BOT_TOKEN"):
+        return None
+    from utils.telegram_bot_helper import TelegramBotHelper
+    return TelegramBotHelper(config.data.get("TELEGRAM_BOT_TOKEN"), http=http, api_url=config.data.get("TELEGRAM_API_URL") or "https://api.telegram.org")
+
+
+def open_delivery_queue(config, telegram_helper, store=None, metrics=None):
+    delivery_config = config.data.get("DELIVERY")
+    if not delivery_config or not telegram_helper:
+        return None
+    from utils.delivery_helper import DeliveryQueue, TelegramRateLimiter
+    rate_limiter = TelegramRateLimiter(
+        global_per_second=delivery_config.get("global_per_second", 30),
+        chat_per_second=delivery_config.get("chat_per_second", 1),
+        group_per_minute=delivery_config.get("group_per_minute", 20)
+    )
+    delivery = DeliveryQueue(
+        telegram_helper, delivery_config.get("outbox_path", "data/outbox.db"),
+        rate_limiter=rate_limiter,
+        max_attempts=delivery_config.get("max_attempts", 5),
+        base_backoff=delivery_config.get("base_backoff", 2.0),
+        on_delivered=(lambda dedupe_key: mark_delivered(store, dedupe_key)) if store else None,
+        metrics=metrics
+    )
+    delivery.prune()
+    delivery.start()
+    return delivery
+
+
+def large_pdf_uploads_enabled(config):
+    large_pdf_config = config.data.get("LARGE_PDF")
+    return bool(large_pdf_config and large_pdf_config.get("upload", True))
+
+
+def open_pdf_helper(config, http, metrics=None):
+    """Return a PDFHelper when PDFs over 10 M are uploaded or papers are sent as extracted text"""
+    large_pdf_config = config.data.get("LARGE_PDF") or {}
+    input_config = config.data.get("SUMMARY_INPUT") or {}
+    uploads = large_pdf_uploads_enabled(config)
+    if not uploads and input_config.get("mode") != "text":
+        return None
+    from utils.pdf_helper import PDFHelper
+    max_bytes = int(large_pdf_config.get("max_mb", 100) * 1000 * 1000)
+    upload_cache = None
+    if uploads:
+        cache_config = config.data.get("CACHE")
+        ttl = large_pdf_config.get("upload_ttl_days", 30) * 24 * 60 * 60
+        persistent = SQLiteCache(cache_config.get("path", "data/cache.db"), "upload", ttl=ttl) if cache_config else None
+        upload_cache = TieredCache("upload", memory_entries=1000, ttl=ttl, persistent=persistent)
+    return PDFHelper(
+        http, chunk_size=large_pdf_config.get("chunk_kb", 1024) * 1024, max_bytes=max_bytes,
+        upload_cache=upload_cache, workers=input_config.get("workers", 2), metrics=metrics
+    )
+
+
+def open_metrics(config, http):
+    """Return a Metrics recorder when METRICS is enabled, otherwise the no-op NULL_METRICS"""
+    metrics_config = config.data.get("METRICS")
+    if not metrics_config or not metrics_config.get("enabled", True):
+        return NULL_METRICS
+    return Metrics(pricing=metrics_config.get("pricing"), http_stats=http.connection_stats)
+
+
+def open_batch_classifier(config, metrics=None):
+    """Return a BatchClassifier when BATCH_API mode is enabled (--batch); the selector is attached later"""
+    batch_config = config.data.get("BATCH_API")
+    if not batch_config or not batch_config.get("enabled", True):
+        return None
+    if config.data.get("PROFILES"):
+        logger.warning("BATCH_API is ignored with PROFILES; each entry is matched against all profiles in one live request.")
+        return None
+    return BatchClassifier(
+        batch_config.get("state_path", "data/batches.db"),
+        poll_interval=batch_config.get("poll_seconds", 30),
+        max_poll_interval=batch_config.get("max_poll_seconds", 600),
+        max_wait=batch_config.get("max_wait_hours", 24) * 60 * 60,
+        metrics=metrics
+    )
+
+
+def open_embedding_scorer(config, clients, metrics=None):
+    """Return an EmbeddingScorer when EMBEDDINGS is enabled, deciding clear-cut entries without the selector model"""
+    embedding_config = config.data.get("EMBEDDINGS")
+    if not embedding_config or not embedding_config.get("enabled", True):
+        return None
+    if config.data.get("PROFILES"):
+        logger.warning("EMBEDDINGS is ignored with PROFILES; each entry is matched against all profiles in one request.")
+        return None
+    from utils.embedding_helper import EmbeddingScorer, HashingEmbeddingProvider, OpenAIEmbeddingProvider
+    if embedding_config.get("provider", "openai") == "hashing":
+        provider = HashingEmbeddingProvider(embedding_config.get("dimensions") or 512)
+    else:
+        api_key = config.data.get("API_KEY", "") or os.getenv("OPENAI_API_KEY")
+        provider = OpenAIEmbeddingProvider(
+            clients.get_client(api_key, config.data.get("API_BASE_URL", None), role="embedding"),
+            model=embedding_config.get("model", "text-embedding-3-small"),
+            dimensions=embedding_config.get("dimensions"),
+            metrics=metrics
+        )
+    cache_config = config.data.get("CACHE") or {}
+    persistent = SQLiteCache(
+        embedding_config.get("cache_path") or cache_config.get("path", "data/cache.db"), "embedding",
+        ttl=embedding_config.get("ttl_days", 30) * 24 * 60 * 60,
+        max_entries=embedding_config.get("max_entries", 100000)
+    )
+    return EmbeddingScorer(
+        provider, config.data.get("INTERESTS", []), config.data.get("EXCLUSIONS", []),
+        cache=TieredCache("embedding", memory_entries=embedding_config.get("memory_entries", 10000), persistent=persistent),
+        batch_size=embedding_config.get("batch_size", 256),
+        high=embedding_config.get("high", 0.5),
+        low=embedding_config.get("low", 0.25),
+        exclusion_weight=embedding_config.get("exclusion_weight", 1.0),
+        metrics=metrics
+    )
+
+
+def open_entry_store(config):
+    store_config = config.data.get("STORE")
+    if not store_config:
+        return None
+    store = EntryStoreHelper(store_config.get("path", "data/rss-auto-reader.db"), retention_days=store_config.get("retention_days", 30))
+    store.prune()
+    logger.info(f"Using entry store: {store.path} ({store.count()} entries)")
+    return store
+
+
+def open_run_journal(config):
+    journal_config = config.data.get("JOURNAL")
+    if not journal_config or not journal_config.get("enabled", True):
+        return None
+    journal = RunJournal(
+        journal_config.get("path", "data/journal.jsonl"),
+        sync=journal_config.get("sync", False),
+        max_age_days=journal_config.get("max_age_days", 7)
+    )
+    unfinished = sum(1 for state in journal.progress().values() if not state['done'])
+    if unfinished:
+        logger.info(f"Run journal {journal.path} holds {unfinished} unfinished entries from an interrupted run.")
+    return journal
+
+
+def open_verdict_cache(config):
+    cache_config = config.data.get("CACHE")
+    if not cache_config:
+        return None
+    ttl = cache_config.get("verdict_ttl_days", 30) * 24 * 60 * 60
+    persistent = SQLiteCache(cache_config.get("path", "data/cache.db"), "verdict", ttl=ttl, max_entries=cache_config.get("verdict_max_entries", 100000))
+    return TieredCache("verdict", memory_entries=cache_config.get("memory_entries", 10000), ttl=ttl, persistent=persistent)
+
+
+def open_summary_cache(config):
+    cache_config = config.data.get("CACHE")
+    if not cache_config:
+        return None
+    ttl = cache_config.get("summary_ttl_days")
+    ttl = ttl * 24 * 60 * 60 if ttl else None
+    persistent = SQLiteCache(
+        cache_config.get("path", "data/cache.db"), "summary", ttl=ttl,
+        max_entries=cache_config.get("summary_max_entries", 5000),
+        max_bytes=int(cache_config.get("summary_max_mb", 50) * 1000 * 1000)
+    )
+    return TieredCache("summary", memory_entries=cache_config.get("summary_memory_entries", 200), ttl=ttl, persistent=persistent)
+
+
+def classify_entries(config, subject_analyzer, entries, batch_classifier=None, embedding_scorer=None):
+    """Classify entries concurrently (or in Batch API jobs), returns verdicts in feed order (None where classification failed)
+
+    With an embedding scorer, only entries it finds ambiguous reach the selector model.
+    """
+    concurrency = config.data.get("CONCURRENCY") or {}
+    rate_limiter = RateLimiter(concurrency.get("requests_per_minute"), concurrency.get("tokens_per_minute"))
+    interests = config.data.get("INTERESTS", [])
+    exclusions = config.data.get("EXCLUSIONS", [])
+
+    if embedding_scorer is not None and entries:
+        try:
+            decisions = embedding_scorer.decide([entry['content'] for entry in entries])
+        except Exception as e:
+            logger.warning(f"Embedding scoring failed, classifying every entry with the selector model: {e}")
+        else:
+            ambiguous = [entry for entry, decision in zip(entries, decisions) if decision is None]
+            logger.info(
+                f"Embedding scores decided {len(entries) - len(ambiguous)} of {len(entries)} entries locally "
+                f"({sum(1 for decision in decisions if decision)} relevant), {len(ambiguous)} go to the selector model."
+            )
+            classified = iter(classify_entries(config, subject_analyzer, ambiguous, batch_classifier))
+            return [next(classified) if decision is None else decision for decision in decisions]
+
+    if batch_classifier is not None:
+        if not entries:
+            return []
+        keys = [entry_key(entry) for entry in entries]
+        logger.info(f"Classifying {len(entries)} entries through the Batch API.")
+        try:
+            batch_verdicts = batch_classifier.classify(
+                {key: entry['content'] for key, entry in zip(keys, entries)}, interests, exclusions,
+                payloads={key: entry.to_record() for key, entry in zip(keys, entries)}
+            )
+        except Exception as e:
+            logger.error(f"Failed to classify {len(entries)} entries through the Batch API: {e}")
+            return [None] * len(entries)
+        return [batch_verdicts.get(key) for key in keys]
+
+    batch_config = config.data.get("SELECTOR_BATCH")
+    if batch_config:
+        abstracts = {str(i): entry['content'] for i, entry in enumerate(entries)}
+        batches = pack_abstract_batches(abstracts, batch_config.get("token_budget", 8000), batch_config.get("max_items", 20))
+        logger.info(f"Classifying {len(entries)} entries in {len(batches)} batched requests.")
+
+        results = run_concurrently(
+            lambda batch: subject_analyzer.classify_abstract_batch(batch, interests, exclusions), batches,
+            max_workers=concurrency.get("max_workers", 1),
+            rate_limiter=rate_limiter,
+            cost=lambda batch: sum(estimate_tokens(abstract) for abstract in batch.values()) + BATCH_CLASSIFIER_PROMPT_TOKENS
+        )
+
+        batch_verdicts = {}
+        for batch, result in zip(batches, results):
+            if result.error:
+                logger.error(f"Failed to classify a batch of {len(batch)} entries: {result.error}")
+                continue
+            batch_verdicts.update(result.value)
+        return [batch_verdicts.get(str(i)) for i in range(len(entries))]
+
+    results = run_concurrently(
+        lambda entry: classify_entry(config, subject_analyzer, entry, rate_limiter=rate_limiter), entries,
+        max_workers=concurrency.get("max_workers", 1)
+    )
+    return [result.value for result in results]
+
+
+def classify_profiles(config, subject_analyzer, entries, profiles):
+    """Match entries against every profile with one multi-label request each
+
+    Returns the matching profile names per entry in feed order (None where classification failed).
+    """
+    concurrency = config.data.get("CONCURRENCY") or {}
+    rate_limiter = RateLimiter(concurrency.get("requests_per_minute"), concurrency.get("tokens_per_minute"))
+    results = run_concurrently(
+        lambda entry: classify_entry(config, subject_analyzer, entry, profiles, rate_limiter), entries,
+        max_workers=concurrency.get("max_workers", 1)
+    )
+    return [result.value for result in results]
+
+
+def classify_entry(config, subject_analyzer, entry, profiles=None, rate_limiter=None):
+    """Classify one entry with the selector model
+
+    Returns the verdict, or given PROFILES the names of the matching profiles;
+    None if classification failed.
+    """
+    prompt_tokens = PROFILE_PROMPT_TOKENS + PROFILE_ITEM_TOKENS * len(profiles) if profiles else CLASSIFIER_PROMPT_TOKENS
+    try:
+        if rate_limiter:
+            rate_limiter.acquire(estimate_tokens(entry['content']) + prompt_tokens)
+        if profiles:
+            logger.info(f"Matching entry against {len(profiles)} profiles: {entry['title']}")
+            return subject_analyzer.match_profiles(entry['content'], profiles)
+        logger.info(f"Classifying entry: {entry['title']}")
+        return subject_analyzer.analyze_subject_from_abstract(entry['content'], config.data.get("INTERESTS", []), config.data.get("EXCLUSIONS", []))
+    except Exception as e:
+        logger.error(f"Failed to classify entry {entry['title']}: {e}")
+        return None
+
+
+def open_prefilter(config, profiles=None):
+    """Return a PrefilterHelper when PREFILTER is enabled; given PROFILES it keeps entries close to any profile's interests"""
+    prefilter_config = config.data.get("PREFILTER")
+    if not prefilter_config or not prefilter_config.get("enabled", True):
+        return None
+    if profiles:
+        # Only exclusions every profile shares may push an entry down
+        interests = list(dict.fromkeys(interest for profile in profiles for interest in profile['interests']))
+        exclusions = [exclusion for exclusion in profiles[0]['exclusions'] if all(exclusion in profile['exclusions'] for profile in profiles)]
+    else:
+        interests, exclusions = config.data.get("INTERESTS", []), config.data.get("EXCLUSIONS", [])
+    return PrefilterHelper(
+        interests, exclusions,
+        threshold=prefilter_config.get("threshold"),
+        top_k=prefilter_config.get("top_k"),
+        exclusion_weight=prefilter_config.get("exclusion_weight", 1.0)
+    )
+
+
+def prefilter_entries(config, entries, profiles=None):
+    """Indices of the entries the optional lexical pre-filter drops"""
+    prefilter = open_prefilter(config, profiles)
+    if prefilter is None or not entries:
+        return set()
+    keep = prefilter.select(prefilter.score_entries(entries))
+    dropped = {index for index, kept in enumerate(keep) if not kept}
+    logger.info(f"Pre-filter kept {len(entries) - len(dropped)} of {len(entries)} entries for classification.")
+    return dropped
+
+
+def prefilter_and_classify(config, subject_analyzer, entries, batch_classifier=None, embedding_scorer=None, profiles=None):
+    """Run the optional lexical pre-filter, then classify the surviving entries
+
+    Returns (verdicts, dropped) where verdicts is aligned with entries and dropped
+    lists the indices the pre-filter removed before classification. Given
+    PROFILES, verdicts are lists of matching profile names instead of booleans,
+    and the pre-filter keeps entries close to any profile's interests.
+    """
+    def classify(selected):
+        if profiles:
+            return classify_profiles(config, subject_analyzer, selected, profiles)
+        return classify_entries(config, subject_analyzer, selected, batch_classifier, embedding_scorer)
+
+    prefilter = open_prefilter(config, profiles)
+    if prefilter is None or not entries:
+        return classify(entries), set()
+
+    scores = prefilter.score_entries(entries)
+    keep = prefilter.select(scores)
+
+    if config.data["PREFILTER"].get("report"):
+        # Classify everything so the report can show which dropped entries the classifier wanted
+        verdicts = classify(entries)
+        logger.info(prefilter.recall_report(entries, scores, keep, verdicts))
+        return verdicts, set()
+
+    dropped = {index for index, kept in enumerate(keep) if not kept}
+    logger.info(f"Pre-filter kept {len(entries) - len(dropped)} of {len(entries)} entries for classification.")
+    kept_verdicts = iter(classify([entry for index, entry in enumerate(entries) if index not in dropped]))
+    verdicts = [None if index in dropped else next(kept_verdicts) for index in range(len(entries))]
+    return verdicts, dropped
+
+
+class ReaderContext:
+    """Helpers that outlive a single run: transports, model clients, caches, store and outbox
+
+    A one-shot run opens and closes it once; the daemon keeps it open so
+    connections, clients and caches stay warm between polling cycles.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        cache_config = config.data.get("CACHE")
+        self.feed_cache = SQLiteCache(cache_config.get("path", "data/cache.db"), "feed") if cache_config and cache_config.get("conditional_get", True) else None
+        self.http = open_http_helper(config)
+        self.metrics = open_metrics(config, self.http)
+        self.rss_helper = RSSFeedHelper(cache=self.feed_cache, http=self.http, metrics=self.metrics)
+        self.store = open_entry_store(config)
+        self.journal = open_run_journal(config)
+        self.telegram_helper = open_telegram_helper(config, self.http)
+        self.delivery = open_delivery_queue(config, self.telegram_helper, self.store, self.metrics)
+        self.pdf_helper = open_pdf_helper(config, self.http, self.metrics)
+        self.verdict_cache = open_verdict_cache(config)
+        self.summary_cache = open_summary_cache(config)
+        self.batch_classifier = open_batch_classifier(config, self.metrics)
+        # Model clients are built on first use, so runs that end early never load the OpenAI SDK
+        self.clients = None
+        self.models = None
+        self.embedding_scorer = None
+        # Token totals at the previous log_stats(), so each run reports its own prompt cache hits
+        self.logged_tokens = {}
+        self.output_locks = {}
+        self.lock = threading.Lock()
+
+    def model_helpers(self):
+        """Return (subject_analyzer, summarizer), creating the shared clients on the first call"""
+        with self.lock:
+            if self.models is None:
+                self.clients = open_client_registry(self.config, self.metrics)
+                self.models = open_model_helpers(self.config, self.clients, self.verdict_cache, self.metrics)
+                self.embedding_scorer = open_embedding_scorer(self.config, self.clients, self.metrics)
+                if self.batch_classifier:
+                    self.batch_classifier.selector = self.models[0]
+            return self.models
+
+    def output_lock(self, path):
+        """Lock serializing writes to one output file, so concurrently delivered entries never interleave"""
+        with self.lock:
+            return self.output_locks.setdefault(path, threading.Lock())
+
+    def prune(self):
+        """Drop expired store entries, old outbox messages and collected batches"""
+        if self.store:
+            self.store.prune()
+        if self.batch_classifier:
+            self.batch_classifier.prune()
+        if self.delivery:
+            self.delivery.prune()
 
-    if config.data.get("OUTPUT_FILE") and not (config.data.get("TELEGRAM_BOT_TOKEN") and config.data.get("TELEGRAM_CHAT_ID")):
-        output_file = config.data.get("OUTPUT_FILE")
+    def log_stats(self):
+        if self.pdf_helper:
+            text_stats = self.pdf_helper.text_stats()
+            if text_stats['papers']:
+                saved = 1 - text_stats['sent_tokens'] / text_stats['full_tokens']
+                logger.info(f"Sent ~{text_stats['sent_tokens']} of ~{text_stats['full_tokens']} tokens of paper text for {text_stats['papers']} papers ({saved:.0%} saved)")
+        if self.verdict_cache:
+            logger.info(f"Verdict cache: {self.verdict_cache.stats()}")
+        if self.summary_cache:
+            logger.info(f"Summary cache: {self.summary_cache.stats()}")
+        tokens = self.metrics.token_totals()
+        for role, totals in tokens.items():
+            previous = self.logged_tokens.get(role, {'input': 0, 'cached': 0})
+            input_tokens, cached = totals['input'] - previous['input'], totals['cached'] - previous['cached']
+            if input_tokens:
+                logger.info(f"Prompt cache ({role}): {cached} of {input_tokens} input tokens cached this run ({cached / input_tokens:.0%})")
+        self.logged_tokens = tokens
+        for host, stats in self.http.connection_stats().items():
+            logger.info(f"HTTP {host}: {stats['requests']} requests over {stats['connections']} connections ({stats['reuse_rate']:.0%} reused, {stats['retries']} retries)")
+        self.metrics.log_summary()
+
+    def export_metrics(self):
+        metrics_config = self.config.data.get("METRICS") or {}
+        self.metrics.export(metrics_config.get("jsonl_path", "data/metrics.jsonl"), metrics_config.get("prometheus_path"))
+
+    def close(self):
+        """Drain the outbox, then close everything in reverse order of opening"""
+        if self.delivery:
+            self.delivery.close(drain_timeout=(self.config.data.get("DELIVERY") or {}).get("drain_timeout", 300))
+        self.log_stats()
+        self.export_metrics()
+        if self.pdf_helper:
+            self.pdf_helper.close()
+        if self.verdict_cache:
+            self.verdict_cache.close()
+        if self.summary_cache:
+            self.summary_cache.close()
+        if self.store:
+            self.store.close()
+        if self.journal:
+            self.journal.close()
+        if self.batch_classifier:
+            self.batch_classifier.close()
+        if self.embedding_scorer:
+            self.embedding_scorer.close()
+        if self.clients:
+            self.clients.close()
+        if self.feed_cache:
+            self.feed_cache.close()
+        self.http.close()
+
+
+def prepare_output_file(config):
+    for output_file in dict.fromkeys(profile['output_file'] for profile in get_profiles(config) if profile['output_file']):
         logger.info(f"Using output file: {output_file}")
         save_path = os.path.dirname(output_file)
-        if not os.path.exists(save_path):
+        if save_path and not os.path.exists(save_path):
             os.makedirs(save_path)
             logger.info(f"Created output directory: {save_path}")
 
-    rss_helper = RSSFeedHelper()
-    rss_url = config.data.get("RSS", {}).get("feed_url", "")
-    logger.info(f"Using RSS feed URL: {rss_url}")
 
-    # Process RSS feed
-    try:
-        result = rss_helper.process_feed(rss_url)
-        logger.info(f"Successfully fetched RSS feed: {result['feed_info']['title']}")
-    except Exception as e:
-        logger.error(f"Error fetching RSS feed: {e}")
+def open_run_lock(config):
+    """Take the lock shared by one-shot and daemon runs; returns None if another run holds it"""
+    run_lock = RunLock((config.data.get("DAEMON") or {}).get("lock_path", "data/rss-auto-reader.lock"))
+    if not run_lock.acquire():
+        logger.warning(f"Another run holds {run_lock.path}, exiting.")
+        return None
+    return run_lock
+
+
+def known_profiles(record, profiles):
+    """Profiles a stored verdict matched, or None when the entry still has to be classified"""
+    if not record or record['is_relevant'] is None:
+        return None
+    if not record['is_relevant']:
+        return []
+    if profiles[0]['name'] is None:
+        return profiles
+    if record['profiles'] is None:
+        # Classified before PROFILES was configured
+        return None
+    return [profile for profile in profiles if profile['name'] in record['profiles']]
+
+
+def matched_profiles(verdict, profiles):
+    """Turn a verdict (a boolean, or the names of matching profiles) into the matching profiles"""
+    if verdict is None:
+        return None
+    if isinstance(verdict, bool):
+        return profiles if verdict else []
+    return [profile for profile in profiles if profile['name'] in verdict]
+
+
+def journaled_record(record, state):
+    """Overlay an entry's journaled progress on its store record, which may be missing or lag behind"""
+    if not state:
+        return record
+    record = dict(record) if record else {'title': state['title'], 'is_relevant': None, 'summary': None, 'delivered': False, 'profiles': None, 'delivered_profiles': []}
+    if state['is_relevant'] is not None:
+        record['is_relevant'], record['profiles'] = state['is_relevant'], state['profiles']
+    record['summary'] = state['summary'] or record['summary']
+    record['delivered_targets'] = state['delivered']
+    record['in_flight_targets'] = state['in_flight']
+    record['message_ids'] = state.get('messages') or {}
+    return record
+
+
+def file_contains(path, text):
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        return text in f.read()
+
+
+def undelivered_profiles(entry, record, profiles):
+    """The matching profiles still missing the entry; raises ValueError if one has no output configured"""
+    delivered = set(record['delivered_profiles']) if record else set()
+    profiles = [profile for profile in profiles if profile['name'] is None or profile['name'] not in delivered]
+    if any(not profile['telegram_chat_id'] and not profile['output_file'] for profile in profiles):
+        logger.error(f"No output method configured for entry: {entry['title']}")
+        raise ValueError("No output method configured. Please set TELEGRAM_BOT_TOKEN or OUTPUT_FILE in the config.")
+    return profiles
+
+
+def summarize_entry(context, entry, key, record, profiles, summarizer, stream=None):
+    """Summarize a relevant entry once, in the layout of its first output (Telegram if any profile has a chat)"""
+    if record and record['summary']:
+        return record['summary']
+    summary = summarize_selected_paper(
+        context.config, entry, summarizer, file_mode=not any(profile['telegram_chat_id'] for profile in profiles),
+        summary_cache=context.summary_cache, http=context.http, pdf_helper=context.pdf_helper, stream=stream
+    )
+    if summary and context.store:
+        context.store.record_summary(key, summary)
+    if summary and context.journal:
+        context.journal.record_summary(key, summary)
+    return summary
+
+
+def entry_abstract(entry):
+    abstract = entry.get("content", "")
+    return abstract.split('Abstract:')[1] if 'Abstract:' in abstract else abstract
+
+
+def telegram_entry_message(entry, summary):
+    """The HTML Telegram message for an entry: its summary, or its abstract if there is none"""
+    body = html.escape(summary) if summary else f"This is the abstract:\n\n{html.escape(entry_abstract(entry))}"
+    return f"📄 <b>{entry['title']}</b>\n\n{body}\n\n🔗 <a href=\"{entry['link']}\">Read more</a>"
+
+
+def file_entry_text(entry, summary):
+    """The Markdown output file entry for an entry: its summary, or its abstract if there is none"""
+    body = summary if summary else f"## Abstract:\n\n{entry_abstract(entry)}"
+    return f"# {entry['title']}\n\n{body}\n\n[Read more]({entry['link']})"
+
+
+def open_summary_stream(context, entry, key, record, profiles, clock=None):
+    """A SummaryStream to the entry's chats and output files not reached yet, or None without STREAMING
+
+    Output files are only streamed when no chat needs the message layout; the
+    Markdown for files is otherwise converted once the summary is complete.
+    """
+    streaming_config = context.config.data.get("STREAMING")
+    if not streaming_config or not streaming_config.get("enabled", True):
+        return None
+    from utils.streaming_helper import FileSectionStream, SummaryStream, TelegramMessageStream
+    reached = set(record.get('delivered_targets', [])) | set(record.get('in_flight_targets', [])) if record else set()
+    stream = SummaryStream(key, context.journal, clock)
+    chats = [profile['telegram_chat_id'] for profile in profiles if profile['telegram_chat_id']]
+    for chat_id in dict.fromkeys(chats) if context.telegram_helper else ():
+        target = f"telegram:{chat_id}"
+        if target in reached:
+            continue
+        stream.add_telegram(target, TelegramMessageStream(
+            context.telegram_helper, chat_id, render=lambda summary: telegram_entry_message(entry, f"{summary} ▍"),
+            edit_interval=streaming_config.get("edit_interval", 3.0),
+            rate_limiter=context.delivery.rate_limiter if context.delivery else None
+        ), telegram_entry_message(entry, "⏳ Summarizing…"))
+    for output_file in () if chats else dict.fromkeys(profile['output_file'] for profile in profiles if profile['output_file']):
+        target = f"file:{output_file}"
+        if target not in reached:
+            stream.add_file(target, FileSectionStream(output_file, context.output_lock(output_file), f"# {entry['title']}\n\n"))
+    return stream if stream.telegram or stream.files else None
+
+
+def finish_summary_stream(stream, entry, summary):
+    """Write the final message or file entry to every streamed target, returns whether each one has it"""
+    texts = {target: telegram_entry_message(entry, summary) for target in stream.telegram}
+    texts.update({target: file_entry_text(entry, summary) + "\n\n" for target in stream.files})
+    return stream.finish(texts)
+
+
+def deliver_entry(context, entry, key, record, profiles, summary, streamed=None, clock=None):
+    """Send a summarized entry to every given profile's chat and output file
+
+    The summary is re-rendered for outputs using the other layout. Returns True
+    once every target (a chat or an output file) has the entry. Targets are
+    journaled before sends that cannot be deduplicated, so a run that crashed
+    mid-send never sends to them twice; a streamed message it left unfinished
+    is edited to its final text. streamed holds the targets a SummaryStream
+    already tried, with whether each has the entry.
+    """
+    config, store, journal, metrics = context.config, context.store, context.journal, context.metrics
+    streamed = streamed or {}
+    delivered_targets = set(record.get('delivered_targets', [])) if record else set()
+    delivered_targets |= {target for target, delivered in streamed.items() if delivered}
+    in_flight = set(record.get('in_flight_targets', [])) if record else set()
+    message_ids = record.get('message_ids', {}) if record else {}
+    chats = [profile for profile in profiles if profile['telegram_chat_id']]
+    files = [profile for profile in profiles if profile['output_file']]
+    if not chats and not files:
+        return True
+
+    complete = True
+    if chats:
+        message = telegram_entry_message(entry, summary)
+        if summary:
+            logger.info(f"Summary generated for entry: {entry['title']}")
+        else:
+            logger.info(f"No summary available for entry: {entry['title']}")
+        for profile in chats:
+            target = f"telegram:{profile['telegram_chat_id']}"
+            if target in streamed and not streamed[target]:
+                # Left in flight for the next run, which finishes the streamed message
+                complete = False
+                continue
+            if target in delivered_targets:
+                # Sent by an interrupted run, or to another profile sharing the chat
+                if store:
+                    store.mark_delivered(key, profile['name'])
+                continue
+            if context.delivery:
+                # The outbox deduplicates by key, so queuing again after a crash is safe
+                context.delivery.enqueue(profile['telegram_chat_id'], message, dedupe_key=delivery_key(key, profile), parse_mode="html", disable_web_page_preview=True)
+                sent = True
+            elif target in in_flight and message_ids.get(target) and context.telegram_helper:
+                from utils.streaming_helper import TelegramMessageStream
+                logger.info(f"Finishing the message an interrupted run streamed for {entry['title']} to chat {profile['telegram_chat_id']}.")
+                with metrics.stage("deliver"):
+                    try:
+                        sent = TelegramMessageStream(context.telegram_helper, profile['telegram_chat_id'], message_id=message_ids[target]).finish(message)
+                    except Exception as e:
+                        logger.error(f"Error finishing message to Telegram: {e}")
+                        sent = False
+            elif target in in_flight:
+                logger.warning(f"Not resending {entry['title']} to chat {profile['telegram_chat_id']}: an interrupted run may already have sent it.")
+                sent = True
+            else:
+                if journal:
+                    journal.begin_delivery(key, target)
+                with metrics.stage("deliver"):
+                    sent = send_message_to_telegram(config, message, context.telegram_helper, profile['telegram_chat_id'])
+                if not sent and journal:
+                    journal.abort_delivery(key, target)
+                if sent and clock:
+                    clock.mark()
+            if sent and store and not context.delivery:
+                store.mark_delivered(key, profile['name'])
+            if sent:
+                delivered_targets.add(target)
+                if journal:
+                    journal.mark_delivered(key, target)
+            else:
+                complete = False
+
+    if files:
+        text = file_entry_text(entry, convert_summary(summary, 'markdown') if summary and chats else summary)
+        for output_file in dict.fromkeys(profile['output_file'] for profile in files):
+            target = f"file:{output_file}"
+            if target in delivered_targets:
+                continue
+            if target in in_flight and file_contains(output_file, f"[Read more]({entry['link']})"):
+                logger.info(f"{entry['title']} was already written to {output_file} by an interrupted run.")
+            else:
+                if journal:
+                    journal.begin_delivery(key, target)
+                with metrics.stage("deliver"), context.output_lock(output_file), open(output_file, "a") as f:
+                    f.write(text + "\n\n")
+                if clock:
+                    clock.mark()
+            delivered_targets.add(target)
+            if journal:
+                journal.mark_delivered(key, target)
+        if store:
+            for profile in files:
+                store.mark_delivered(key, profile['name'])
+    return complete
+
+
+def classification_streams(config, batch_classifier=None, embedding_scorer=None):
+    """Whether entries can be classified one at a time as they flow through the pipeline
+
+    Batched selection, the Batch API, embedding scores and the pre-filter
+    report need every entry at once, so they classify before the pipeline starts.
+    """
+    prefilter_config = config.data.get("PREFILTER") or {}
+    return not (batch_classifier or embedding_scorer or config.data.get("SELECTOR_BATCH") or prefilter_config.get("report"))
+
+
+def run_entry_pipeline(context, pending, profiles, verdicts, prefiltered, streamed, subject_analyzer, summarizer):
+    """Run pending entries through the classify, summarize and deliver stages, returns the number that failed
+
+    Each stage has its own workers (PIPELINE) and a bounded input queue, so
+    slow summaries never hold up classification; entries in streamed are
+    classified in the first stage, the others already have a verdict. With
+    STREAMING, summaries reach their chats and files while they are generated,
+    in the summarize stage.
+    """
+    from utils.streaming_helper import FirstContentClock
+    config, store, journal = context.config, context.store, context.journal
+    pipeline_config = config.data.get("PIPELINE") or {}
+    concurrency = config.data.get("CONCURRENCY") or {}
+    rate_limiter = RateLimiter(concurrency.get("requests_per_minute"), concurrency.get("tokens_per_minute"))
+    queue_size = pipeline_config.get("queue_size", 16)
+    named = profiles[0]['name'] is not None
+    failures = []
+
+    def classify(item):
+        index, entry, key, record = item
+        logger.info(f"Processing entry {index + 1}: {entry['title']}")
+        if key in prefiltered:
+            logger.debug(f"Dropped by pre-filter: {entry['title']}")
+            # Recorded like a negative verdict, so later polls do not score the entry again
+            if store:
+                store.record_verdict(key, entry['title'], False, [] if named else None)
+            if journal:
+                journal.mark_done(key)
+            return None
+        matched = known_profiles(record, profiles)
+        if matched is None:
+            verdict = classify_entry(config, subject_analyzer, entry, profiles if named else None, rate_limiter) if key in streamed else verdicts.get(key)
+            matched = matched_profiles(verdict, profiles)
+            if matched is None:
+                return None
+            names = [profile['name'] for profile in matched] if named else None
+            if store:
+                store.record_verdict(key, entry['title'], bool(matched), names)
+            if journal:
+                journal.record_verdict(key, bool(matched), names)
+        if not matched:
+            logger.debug(f"Ignoring entry: {entry['title']}")
+            if journal:
+                journal.mark_done(key)
+            return None
+        logger.info(f"Relevant entry found: {entry['title']}" + (f" (profiles: {', '.join(profile['name'] for profile in matched)})" if named else ""))
+        return item, matched
+
+    def summarize(item):
+        (index, entry, key, record), matched = item
+        matched = undelivered_profiles(entry, record, matched)
+        clock = FirstContentClock(context.metrics)
+        stream = open_summary_stream(context, entry, key, record, matched, clock) if matched and not (record and record['summary']) else None
+        try:
+            summary = summarize_entry(context, entry, key, record, matched, summarizer, stream) if matched else None
+        except Exception as e:
+            # Later entries still go out; this one resumes from its last completed stage next run
+            logger.error(f"Failed to summarize entry {entry['title']}: {e}")
+            if stream:
+                # Opened messages show the abstract until the next run finishes them
+                stream.abort({target: telegram_entry_message(entry, None) for target in stream.telegram})
+            failures.append(key)
+            return None
+        # Streamed targets get their final text right away, the others in the deliver stage
+        stream_results = finish_summary_stream(stream, entry, summary) if stream else {}
+        return item[0], matched, summary, stream_results, clock
+
+    def deliver(item):
+        (index, entry, key, record), matched, summary, stream_results, clock = item
+        try:
+            complete = deliver_entry(context, entry, key, record, matched, summary, stream_results, clock)
+        except Exception as e:
+            logger.error(f"Failed to deliver entry {entry['title']}: {e}")
+            failures.append(key)
+            return None
+        if complete and journal:
+            journal.mark_done(key)
+        elif not complete:
+            failures.append(key)
+        return key
+
+    pipeline = Pipeline([
+        Stage("classify", classify, workers=pipeline_config.get("classify_workers", concurrency.get("max_workers", 1)), queue_size=queue_size),
+        Stage("summarize", summarize, workers=pipeline_config.get("summarize_workers", 1), queue_size=queue_size),
+        Stage("deliver", deliver, queue_size=queue_size),
+    ], ordered=pipeline_config.get("ordered", True), metrics=context.metrics)
+    for stage in pipeline.run(pending):
+        logger.info(
+            f"Pipeline stage {stage['stage']}: {stage['items']} entries on {stage['workers']} workers, "
+            f"{stage['utilization']:.0%} busy, max queue depth {stage['max_queue_depth']}/{stage['queue_size']}"
+        )
+    return len(failures)
+
+
+def run_cycle(context, feeds):
+    """Poll feeds once, then classify, summarize and deliver their new entries"""
+    config = context.config
+    store = context.store
+    batch_classifier, journal = context.batch_classifier, context.journal
+    profiles = get_profiles(config)
+    named = profiles[0]['name'] is not None
+    # Batches left open and entries left unfinished by an interrupted run are resumed even when no feed has changed
+    resuming_batches = bool(batch_classifier and batch_classifier.open_batch_ids())
+    journaled = journal.progress() if journal else {}
+    resuming = resuming_batches or any(not state['done'] for state in journaled.values())
+    logger.info(f"Using RSS feed URLs: {', '.join(feed['feed_url'] for feed in feeds)}")
+
+    # Process RSS feeds
+    result = context.rss_helper.process_feeds(feeds, max_workers=(config.data.get("CONCURRENCY") or {}).get("feed_workers", 4))
+    for stat in result['feeds']:
+        if stat['error']:
+            logger.error(f"Error fetching RSS feed {stat['name']}: {stat['error']}")
+        elif stat['not_modified']:
+            logger.info(f"Feed {stat['name']} has not changed since the last poll, reusing its {stat['entries']} kept entries ({stat['elapsed']:.2f}s).")
+        else:
+            logger.info(f"Fetched {stat['entries']} entries from {stat['title'] or stat['name']} in {stat['elapsed']:.2f}s ({stat['new']} new, {stat['duplicates']} duplicates of other feeds).")
+    if all(stat['error'] for stat in result['feeds']) and not resuming:
+        return
+    known_entries = store.lookup(entry_key(entry) for entry in result['entries']) if store else {}
+    # Relevant entries that failed to go out last time are retried from an unchanged feed's kept entries
+    retrying = any(record['is_relevant'] and not record['delivered'] for record in known_entries.values())
+    if result['not_modified'] and not resuming and not retrying:
+        logger.info("No feed has changed since the last poll, nothing to do.")
         return
-    logger.info(f"Fetched {len(result['entries'])} entries from the feed.")
+    logger.info(f"Fetched {len(result['entries'])} unique entries from {len(feeds)} feeds.")
 
-    subject_analyzer = OpenAIHelper(api_key=config.data.get("API_KEY", ""), model=config.data.get("SELECTOR_MODEL", "gpt-5-nano"), api_base_url=config.data.get("API_BASE_URL", None), reasoning=config.data.get("SELECTOR_MODEL_REASONING", None))
+    if known_entries:
+        logger.info(f"{len(known_entries)} entries were already seen in previous runs.")
 
+    pending = []
     for index, entry in enumerate(result['entries']):
-        logger.info(f"Processing entry {index + 1}: {entry['title']}")
-        is_relevant = subject_analyzer.analyze_subject_from_abstract(
-            entry['content'], config.data.get("INTERESTS", []), config.data.get("EXCLUSIONS", [])
+        key = entry_key(entry)
+        record = known_entries.get(key)
+        if key in journaled and journaled[key]['done']:
+            logger.debug(f"Skipping entry finished before the last run was interrupted: {entry['title']}")
+            continue
+        if record and (record['delivered'] or record['is_relevant'] is False):
+            logger.debug(f"Skipping already handled entry: {entry['title']}")
+            if key in journaled:
+                journal.mark_done(key)
+            continue
+        pending.append((index, entry, key, record))
+    if journaled:
+        pending_keys = {key for _, _, key, _ in pending}
+        carried = [key for key, state in journaled.items() if key not in pending_keys and not state['done'] and state['entry']]
+        carried_records = store.lookup(carried) if store else {}
+        for key in carried:
+            record = carried_records.get(key)
+            if record and (record['delivered'] or record['is_relevant'] is False):
+                journal.mark_done(key)
+                continue
+            # Entries of an interrupted run that this poll did not return
+            pending.append((len(pending), FeedEntry.from_record(journaled[key]['entry'], context.rss_helper.convert_html), key, record))
+        pending = [(index, entry, key, journaled_record(record, journaled.get(key))) for index, entry, key, record in pending]
+        logger.info(f"Resuming {sum(1 for _, _, key, _ in pending if key in journaled)} entries from the run journal.")
+    if journal:
+        journal.record_fetched((key, entry.to_record()) for _, entry, key, _ in pending)
+    if not pending and not resuming:
+        logger.info("No new entries to process.")
+        return
+
+    subject_analyzer, summarizer = context.model_helpers()
+
+    verdicts = {}
+    waiting = set()
+    if resuming_batches:
+        pending_keys = {key for _, _, key, _ in pending}
+        resumed = batch_classifier.collect_open()
+        resumed_records = store.lookup(item.custom_id for item in resumed if item.custom_id not in pending_keys) if store else {}
+        for item in resumed:
+            verdicts[item.custom_id] = item.verdict
+            record = resumed_records.get(item.custom_id)
+            if item.custom_id in pending_keys or not item.payload or (record and record['delivered']):
+                continue
+            # Entries of an earlier run's batch that this poll did not return
+            entry = FeedEntry.from_record(item.payload, context.rss_helper.convert_html)
+            pending.append((len(pending), entry, item.custom_id, record))
+            if journal:
+                journal.record_fetched([(item.custom_id, entry.to_record())])
+        waiting = batch_classifier.open_custom_ids()
+
+    to_classify = [(key, entry) for _, entry, key, record in pending if known_profiles(record, profiles) is None and key not in verdicts and key not in waiting]
+    if classification_streams(config, batch_classifier, context.embedding_scorer):
+        # Entries are classified one by one in the pipeline's classifier stage
+        dropped = prefilter_entries(config, [entry for _, entry in to_classify], profiles if named else None)
+        prefiltered = {to_classify[index][0] for index in dropped}
+        streamed = {key for key, _ in to_classify} - prefiltered
+    else:
+        classified, dropped = prefilter_and_classify(
+            config, subject_analyzer, [entry for _, entry in to_classify], batch_classifier, context.embedding_scorer, profiles if named else None
         )
+        verdicts.update((key, verdict) for (key, _), verdict in zip(to_classify, classified))
+        prefiltered = {to_classify[index][0] for index in dropped}
+        streamed = set()
 
-        if is_relevant:
-            logger.info(f"Relevant entry found: {entry['title']}")
-            
-            if config.data.get("TELEGRAM_BOT_TOKEN") and config.data.get("TELEGRAM_CHAT_ID"):
-                summary = summarize_selected_paper(config, entry)
-                if summary:
-                    summary = html.escape(summary)
-                    message = f"📄 <b>{entry['title']}</b>\n\n{summary}\n\n🔗 <a href=\"{entry['link']}\">Read more</a>"
-                    logger.info(f"Summary generated for entry: {entry['title']}")
-                else:
-                    abstract = entry.get("content", "")
-                    abstract = abstract.split('Abstract:')[1] if 'Abstract:' in abstract else abstract
-                    abstract = html.escape(abstract)
-                    message = f"📄 <b>{entry['title']}</b>\n\nThis is the abstract:\n\n{abstract}\n\n🔗 <a href=\"{entry['link']}\">Read more</a>"
-                    logger.info(f"No summary available for entry: {entry['title']}")
-                send_message_to_telegram(config, message)
-            elif config.data.get("OUTPUT_FILE"):
-                summary = summarize_selected_paper(config, entry, file_mode=True)
-                if summary:
-                    text = f"# {entry['title']}\n\n{summary}\n\n[Read more]({entry['link']})"
-                else:
-                    abstract = entry.get("content", "")
-                    abstract = abstract.split('Abstract:')[1] if 'Abstract:' in abstract else abstract
-                    text = f"# {entry['title']}\n\n## Abstract:\n\n{abstract}\n\n[Read more]({entry['link']})"
-                with open(config.data.get("OUTPUT_FILE"), "a") as f:
-                    f.write(text + "\n\n")
-            else:
-                logger.error(f"No output method configured for entry: {entry['title']}")
-                raise ValueError("No output method configured. Please set TELEGRAM_BOT_TOKEN or OUTPUT_FILE in the config.")
+    failed = run_entry_pipeline(context, pending, profiles, verdicts, prefiltered, streamed, subject_analyzer, summarizer)
+    if failed:
+        logger.warning(f"{failed} relevant entries failed and will be retried on the next run.")
+    if journal:
+        journal.compact()
+
+
+def main(config):
+    prepare_output_file(config)
+    run_lock = open_run_lock(config)
+    if run_lock is None:
+        return
+    context = ReaderContext(config)
+    try:
+        with context.metrics.stage("cycle"):
+            run_cycle(context, get_feed_configs(config))
+    finally:
+        context.close()
+        run_lock.release()
+
+
+def check(config):
+    """Validate the config and probe every feed (and the Telegram bot) without loading the OpenAI SDK
+
+    Returns the list of problems found; an empty list means the config is usable.
+    """
+    problems = []
+    if not (config.data.get("API_KEY") or os.getenv("OPENAI_API_KEY")):
+        problems.append("No API_KEY in the config and OPENAI_API_KEY is not set.")
+    try:
+        profiles = get_profiles(config)
+    except ValueError as e:
+        problems.append(str(e))
+        profiles = []
+    names = [profile['name'] for profile in profiles]
+    if len(set(names)) < len(names):
+        problems.append("PROFILES names must be unique.")
+    for profile in profiles:
+        if profile['telegram_chat_id'] or profile['output_file']:
+            continue
+        if profile['name'] is None:
+            problems.append("No output method configured. Please set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID, or OUTPUT_FILE.")
         else:
-            logger.debug(f"Ignoring entry: {entry['title']}")
+            problems.append(f"Profile {profile['name']} has no output. Please set its telegram_chat_id (with TELEGRAM_BOT_TOKEN) or output_file.")
+    input_mode = (config.data.get("SUMMARY_INPUT") or {}).get("mode", "file")
+    if input_mode not in ("file", "text"):
+        problems.append(f"SUMMARY_INPUT mode must be 'file' or 'text', not {input_mode!r}.")
+    elif input_mode == "text" and importlib.util.find_spec("pypdf") is None:
+        problems.append("SUMMARY_INPUT mode 'text' requires the 'pypdf' package.")
+    embedding_config = config.data.get("EMBEDDINGS")
+    if embedding_config and embedding_config.get("enabled", True) and importlib.util.find_spec("numpy") is None:
+        problems.append("EMBEDDINGS requires the 'numpy' package.")
+
+    feeds = get_feed_configs(config)
+    if not feeds:
+        problems.append("No RSS feed configured.")
+    http = open_http_helper(config)
+    try:
+        rss_helper = RSSFeedHelper(http=http)
+        for feed in feeds:
+            name = feed.get('name') or feed['feed_url']
+            try:
+                parsed = rss_helper.fetch_feed(feed['feed_url'], timeout=feed.get('timeout', 10))
+            except Exception as e:
+                problems.append(f"Feed {name} is unreachable: {e}")
+                continue
+            if parsed.get('bozo') and not parsed.entries:
+                problems.append(f"Feed {name} is not a valid feed: {parsed.get('bozo_exception')}")
+            else:
+                logger.info(f"Feed {name} is reachable ({len(parsed.entries)} entries).")
+        telegram_helper = open_telegram_helper(config, http)
+        if telegram_helper:
+            if telegram_helper.test_connection():
+                logger.info("Telegram bot token is valid.")
+            else:
+                problems.append("Telegram bot token was rejected or the Bot API is unreachable.")
+    finally:
+        http.close()
+
+    for problem in problems:
+        logger.error(problem)
+    if not problems:
+        logger.info("Config check passed.")
+    return problems
+
+
+def run_daemon(config):
+    """Poll every feed on its own interval until SIGTERM/SIGINT, keeping all helpers warm
+
+    A signal lets the current cycle finish and the outbox drain before exiting.
+    """
+    daemon_config = config.data.get("DAEMON") or {}
+    prepare_output_file(config)
+    run_lock = open_run_lock(config)
+    if run_lock is None:
+        return
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, finishing the current cycle before exiting.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    scheduler = FeedScheduler(
+        get_feed_configs(config),
+        default_interval=daemon_config.get("interval_minutes", 30) * 60,
+        jitter=daemon_config.get("jitter_seconds", 60)
+    )
+    prune_interval = daemon_config.get("prune_hours", 24) * 60 * 60
+    context = ReaderContext(config)
+    metrics_port = (config.data.get("METRICS") or {}).get("port")
+    if metrics_port and context.metrics.enabled:
+        context.metrics.serve(metrics_port)
+    last_pruned = time.monotonic()
+    logger.info(f"Daemon started, polling {len(scheduler.feeds)} feeds.")
+    try:
+        while not stop_event.is_set():
+            due = scheduler.due()
+            if due:
+                started = time.monotonic()
+                try:
+                    with context.metrics.stage("cycle"):
+                        run_cycle(context, due)
+                except Exception as e:
+                    logger.error(f"Polling cycle failed: {e}")
+                scheduler.mark_polled(due, started)
+                context.log_stats()
+                context.export_metrics()
+            if time.monotonic() - last_pruned >= prune_interval:
+                context.prune()
+                last_pruned = time.monotonic()
+            stop_event.wait(scheduler.seconds_until_next())
+    finally:
+        logger.info("Daemon stopping, draining in-flight work.")
+        context.close()
+        run_lock.release()
 
 if __name__ == "__main__":
     parser = ArgumentParser(description="RSS Auto Reader")
     parser.add_argument("--config", default="config.yaml", help="Path to the config file")
+    parser.add_argument("--prefilter-report", action="store_true", help="Classify every entry and report what the pre-filter would have dropped")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll each feed on its DAEMON interval")
+    parser.add_argument("--check", action="store_true", help="Validate the config and feed reachability, then exit")
+    parser.add_argument("--batch", action="store_true", help="Classify through the OpenAI Batch API (half price, resumable) instead of live requests")
     # parser.add_argument("--debug", action="store_true", help="Enable debug mode")
 
     args = parser.parse_args()
 
     config = YAMLHelper(args.config)
+    if args.prefilter_report:
+        config.data["PREFILTER"] = {**(config.data.get("PREFILTER") or {}), "enabled": True, "report": True}
+    if args.batch:
+        config.data["BATCH_API"] = {**(config.data.get("BATCH_API") or {}), "enabled": True}
     log_level = config.data.get("LOG_LEVEL", INFO)
-    logger = MyLogger("RSS-Auto-Reader", log_level=log_level)
-    main(config)
\ No newline at end of file
+    logger.logger.setLevel(log_level)
+    if args.check:
+        sys.exit(1 if check(config) else 0)
+    elif args.daemon:
+        run_daemon(config)
+    else:
+        main(config)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""BatchClassifier resumes submitted batches after a restart and classifies missing verdicts live"""
+import json
+from types import SimpleNamespace
+
+from utils.batch_helper import BatchClassifier
+from utils.openai_helper import OpenAIHelper
+
+TARGETS = ["LLM Inference"]
+EXCLUSIONS = ["Robots"]
+ABSTRACTS = {
+    "a": "Faster LLM inference with speculative decoding.",
+    "b": "Robot grasping from language instructions.",
+    "c": "KV cache compression for LLM inference.",
+}
+
+
+def relevant(prompt):
+    abstract = prompt.split("Abstract:")[-1]
+    return "LLM" in abstract and "Robot" not in abstract
+
+
+def abstract_of(request):
+    return request["input"][-1]["content"].split("Abstract:\n")[-1].split("\n\nAnswer:")[0]
+
+
+class StubClient:
+    """Just enough of the Files, Batches and Responses APIs; complete() finishes a batch"""
+
+    def __init__(self):
+        self.files_store = {}
+        self.batches_store = {}
+        self.live_requests = []
+        self.files = SimpleNamespace(create=self._create_file, content=lambda file_id: SimpleNamespace(text=self.files_store[file_id]))
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=lambda batch_id: self.batches_store[batch_id])
+        self.responses = SimpleNamespace(create=self._respond)
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.files_store) + 1}"
+        self.files_store[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def _create_batch(self, input_file_id, **options):
+        batch_id = f"batch-{len(self.batches_store) + 1}"
+        self.batches_store[batch_id] = SimpleNamespace(
+            id=batch_id, status="in_progress", input_file_id=input_file_id,
+            output_file_id=None, error_file_id=None, request_counts=None
+        )
+        return self.batches_store[batch_id]
+
+    def _respond(self, **request):
+        self.live_requests.append(request)
+        return SimpleNamespace(output_text="yes" if relevant(request["input"][-1]["content"]) else "no", usage=None)
+
+    def complete(self, batch_id, skip=()):
+        """Answer every request of the batch except the custom IDs in skip"""
+        batch = self.batches_store[batch_id]
+        lines = []
+        for line in self.files_store[batch.input_file_id].splitlines():
+            request = json.loads(line)
+            if request["custom_id"] in skip:
+                continue
+            answer = "yes" if relevant(request["body"]["input"][-1]["content"]) else "no"
+            body = {"output": [{"type": "message", "content": [{"type": "output_text", "text": answer}]}], "usage": None}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}}))
+        batch.output_file_id = f"file-{len(self.files_store) + 1}"
+        self.files_store[batch.output_file_id] = "\n".join(lines)
+        batch.status = "completed"
+
+
+def open_classifier(path, client, **kwargs):
+    selector = OpenAIHelper("sk-test", client=client, model="selector", role="selector")
+    return BatchClassifier(str(path), selector, poll_interval=0.01, **kwargs)
+
+
+def test_submitted_batch_is_resumed_after_restart(tmp_path):
+    client = StubClient()
+    path = tmp_path / "batches.db"
+    classifier = open_classifier(path, client, max_wait=0)
+    payloads = {custom_id: {"title": custom_id} for custom_id in ABSTRACTS}
+    # The run gives up waiting, as if it was stopped while the batch was running
+    assert classifier.classify(ABSTRACTS, TARGETS, EXCLUSIONS, payloads) == {}
+    batch_ids = classifier.open_batch_ids()
+    assert len(batch_ids) == 1
+    assert classifier.open_custom_ids() == set(ABSTRACTS)
+    classifier.close()
+
+    client.complete(batch_ids[0])
+    classifier = open_classifier(path, client)
+    items = classifier.collect_open()
+    assert {item.custom_id: item.verdict for item in items} == {"a": True, "b": False, "c": True}
+    assert {item.custom_id: item.payload for item in items} == payloads
+    # Nothing was submitted again or classified live, and the batch is not resumed twice
+    assert len(client.batches_store) == 1
+    assert client.live_requests == []
+    assert classifier.open_batch_ids() == []
+    classifier.close()
+
+
+def test_missing_verdicts_are_classified_one_by_one(tmp_path):
+    client = StubClient()
+    classifier = open_classifier(tmp_path / "batches.db", client)
+    original_create = client._create_batch
+
+    def create_and_complete(input_file_id, **options):
+        batch = original_create(input_file_id, **options)
+        client.complete(batch.id, skip={"b", "c"})
+        return batch
+
+    client.batches.create = create_and_complete
+    assert classifier.classify(ABSTRACTS, TARGETS, EXCLUSIONS) == {"a": True, "b": False, "c": True}
+    assert sorted(abstract_of(request) for request in client.live_requests) == sorted([ABSTRACTS["b"], ABSTRACTS["c"]])
+    classifier.close()
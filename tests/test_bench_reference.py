@@ -0,0 +1,19 @@
+"""The checked-in sample feed still produces the reference request counts"""
+import json
+
+import pytest
+
+from benchmarks.bench_pipeline import SCENARIOS, benchmark
+from benchmarks.fixtures import SAMPLE_FEED, SAMPLE_REFERENCE
+
+
+# benchmark() runs the scenario in a spawned process
+@pytest.mark.slow
+def test_small_scenario_matches_reference():
+    with open(SAMPLE_REFERENCE) as f:
+        reference = json.load(f)[0]
+    result = benchmark(reference["scenario"], dict(SCENARIOS[reference["scenario"]]), feed_file=SAMPLE_FEED, output=reference["output"])
+    assert result["entries"] == reference["entries"]
+    # Timings vary by machine; what the pipeline asks of each service does not
+    assert result["requests"] == reference["requests"]
+    assert {stage: stats["count"] for stage, stats in result["stages"].items()} == {stage: stats["count"] for stage, stats in reference["stages"].items()}
@@ -0,0 +1,107 @@
+"""DeliveryQueue keeps messages across restarts, deduplicates them and retries within limits"""
+import time
+
+import pytest
+
+from utils.delivery_helper import DeliveryQueue, TelegramRateLimiter
+from utils.telegram_bot_helper import TelegramRateLimitError
+
+
+class FakeTelegram:
+    """Records sent messages; failures holds exceptions to raise on the next sends"""
+
+    def __init__(self, failures=()):
+        self.sent = []
+        self.attempts = []
+        self.failures = list(failures)
+
+    def send_message(self, chat_id, text, **options):
+        self.attempts.append((time.monotonic(), text))
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+        return {"ok": True, "result": {"message_id": len(self.sent)}}
+
+
+def open_queue(path, telegram, **kwargs):
+    limiter = TelegramRateLimiter(global_per_second=1000, chat_per_second=1000)
+    return DeliveryQueue(telegram, str(path), rate_limiter=limiter, base_backoff=0.01, **kwargs)
+
+
+def statuses(queue):
+    return dict(queue.conn.execute("SELECT dedupe_key, status FROM outbox").fetchall())
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "outbox.db"
+
+
+def test_undelivered_messages_survive_a_restart(path):
+    queue = open_queue(path, FakeTelegram())
+    queue.enqueue(1, "first", dedupe_key="a")
+    queue.enqueue(1, "second", dedupe_key="b")
+    # Closed before the worker ever started, as if the process died
+    queue.close()
+
+    telegram, delivered = FakeTelegram(), []
+    queue = open_queue(path, telegram, on_delivered=delivered.append)
+    queue.start()
+    assert queue.drain(5)
+    assert telegram.sent == [("1", "first"), ("1", "second")]
+    assert delivered == ["a", "b"]
+    queue.close()
+
+
+def test_dedupe_key_rejects_duplicates(path):
+    telegram = FakeTelegram()
+    queue = open_queue(path, telegram)
+    assert queue.enqueue(1, "first", dedupe_key="a")
+    assert not queue.enqueue(1, "first again", dedupe_key="a")
+    queue.start()
+    assert queue.drain(5)
+    assert not queue.enqueue(1, "after sending", dedupe_key="a")
+    queue.close()
+    assert telegram.sent == [("1", "first")]
+
+
+def test_retry_after_is_honored_without_counting_an_attempt(path):
+    telegram = FakeTelegram([TelegramRateLimitError("Too Many Requests", retry_after=0.3)])
+    queue = open_queue(path, telegram, max_attempts=1)
+    queue.enqueue(1, "hello", dedupe_key="a")
+    queue.start()
+    assert queue.drain(5)
+    queue.close()
+    (first, _), (second, _) = telegram.attempts
+    assert second - first >= 0.3
+    assert telegram.sent == [("1", "hello")]
+
+
+def test_attempts_stop_at_max_attempts(path):
+    telegram = FakeTelegram([ConnectionError("down")] * 10)
+    queue = open_queue(path, telegram, max_attempts=3)
+    queue.enqueue(1, "hello", dedupe_key="a")
+    queue.start()
+    assert queue.drain(5)
+    assert len(telegram.attempts) == 3
+    assert statuses(queue) == {"a": "failed"}
+    queue.close()
+
+
+def test_message_left_sending_becomes_unconfirmed(path):
+    queue = open_queue(path, FakeTelegram())
+    queue.enqueue(1, "hello", dedupe_key="a")
+    # The worker marked it sending, then the process died mid-request
+    queue.conn.execute("UPDATE outbox SET status = 'sending'")
+    queue.conn.commit()
+    queue.close()
+
+    telegram, delivered = FakeTelegram(), []
+    queue = open_queue(path, telegram, on_delivered=delivered.append)
+    queue.start()
+    assert queue.drain(5)
+    assert statuses(queue) == {"a": "unconfirmed"}
+    assert telegram.sent == []
+    # Acknowledged like a sent message, so the entry is not queued again
+    assert delivered == ["a"]
+    queue.close()
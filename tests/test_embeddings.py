@@ -0,0 +1,104 @@
+"""EmbeddingScorer decides clear-cut entries, caches topic vectors on disk, and leaves the rest to the selector model"""
+import math
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from utils.cache_helper import SQLiteCache, TieredCache
+from utils.embedding_helper import EmbeddingScorer
+
+INTERESTS = ["LLM inference"]
+EXCLUSIONS = ["Robots"]
+# Fixed unit vectors: the interest and exclusion are orthogonal, so each score is known exactly
+VECTORS = {
+    "LLM inference": [1.0, 0.0, 0.0],
+    "Robots": [0.0, 1.0, 0.0],
+    "Speculative decoding for LLM inference.": [1.0, 0.0, 0.0],
+    "Robot grasping from language.": [0.0, 1.0, 0.0],
+    "Sparse attention for long documents.": [0.4, 0.0, math.sqrt(1 - 0.4 ** 2)],
+}
+ABSTRACTS = list(VECTORS)[2:]
+
+
+class FakeProvider:
+    """Looks embeddings up in VECTORS and records every text it is asked to embed"""
+
+    name = "fake:3"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return [VECTORS[text] for text in texts]
+
+
+class FailingProvider:
+    name = "failing:3"
+
+    def embed(self, texts):
+        raise Exception("Failed to embed texts: connection refused")
+
+
+class StubSelector:
+    """Answers like the selector model and records which abstracts reached it"""
+
+    def __init__(self):
+        self.abstracts = []
+
+    def analyze_subject_from_abstract(self, abstract, interests, exclusions):
+        self.abstracts.append(abstract)
+        return "LLM" in abstract
+
+
+def open_cache(path):
+    return TieredCache("embedding", persistent=SQLiteCache(str(path), "embedding"))
+
+
+def classify(scorer, selector):
+    config = SimpleNamespace(data={"INTERESTS": INTERESTS, "EXCLUSIONS": EXCLUSIONS})
+    entries = [{'title': abstract, 'content': abstract} for abstract in ABSTRACTS]
+    return main.classify_entries(config, selector, entries, embedding_scorer=scorer)
+
+
+def test_scores_decide_clear_entries_and_leave_the_band_to_the_selector():
+    scorer = EmbeddingScorer(FakeProvider(), INTERESTS, EXCLUSIONS, high=0.5, low=0.25)
+    assert scorer.score(ABSTRACTS).tolist() == pytest.approx([1.0, -1.0, 0.4])
+    assert scorer.decide(ABSTRACTS) == [True, False, None]
+
+    selector = StubSelector()
+    assert classify(scorer, selector) == [True, False, False]
+    assert selector.abstracts == ["Sparse attention for long documents."]
+
+
+def test_topic_and_abstract_vectors_are_read_back_from_the_disk_cache(tmp_path):
+    first = FakeProvider()
+    scorer = EmbeddingScorer(first, INTERESTS, EXCLUSIONS, cache=open_cache(tmp_path / "cache.db"))
+    decisions = scorer.decide(ABSTRACTS)
+    scorer.close()
+    assert sorted(first.embedded) == sorted(INTERESTS + EXCLUSIONS + ABSTRACTS)
+
+    # A new process embeds nothing it has seen before
+    second = FakeProvider()
+    scorer = EmbeddingScorer(second, INTERESTS, EXCLUSIONS, cache=open_cache(tmp_path / "cache.db"))
+    assert scorer.decide(ABSTRACTS) == decisions
+    scorer.close()
+    assert second.embedded == []
+
+
+def test_a_failing_provider_leaves_every_entry_to_the_selector():
+    selector = StubSelector()
+    assert classify(EmbeddingScorer(FailingProvider(), INTERESTS, EXCLUSIONS), selector) == [True, False, False]
+    assert selector.abstracts == ABSTRACTS
+
+
+def test_missing_numpy_leaves_every_entry_to_the_selector(monkeypatch):
+    # A None entry makes `import numpy` raise ImportError
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    provider = FakeProvider()
+    selector = StubSelector()
+    assert classify(EmbeddingScorer(provider, INTERESTS, EXCLUSIONS), selector) == [True, False, False]
+    assert selector.abstracts == ABSTRACTS
+    assert provider.embedded == []
@@ -0,0 +1,61 @@
+"""A run interrupted mid-delivery resumes from the RunJournal without sending any entry twice"""
+
+import pytest
+import yaml
+
+import main
+from benchmarks.bench_pipeline import scenario_config
+from benchmarks.fake_servers import FakeServer
+from benchmarks.fixtures import make_arxiv_feed
+from utils.journal_helper import RunJournal
+from utils.yaml_helper import YAMLHelper
+
+
+class Crash(BaseException):
+    """Stands in for the process dying"""
+
+
+def journal_progress(config):
+    journal = RunJournal(config["JOURNAL"]["path"])
+    try:
+        return list(journal.progress().values())
+    finally:
+        journal.close()
+
+
+@pytest.fixture
+def server():
+    server = FakeServer().start()
+    server.feeds["arxiv"] = make_arxiv_feed(50, base_url=server.url)
+    yield server
+    server.stop()
+
+
+def test_interrupted_run_resumes_without_resending(server, tmp_path, monkeypatch):
+    config = scenario_config(str(tmp_path), server, "arxiv")
+    # Only the journal tells finished entries apart, and messages are sent inline
+    del config["STORE"], config["DELIVERY"]
+    config["JOURNAL"] = {"path": str(tmp_path / "journal.jsonl")}
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+
+    sent = []
+
+    def send(config, text, telegram_helper, chat_id=None):
+        sent.append(text)
+        if len(sent) == 5:
+            # The fifth message reached the chat, but the run died before journaling it
+            raise Crash()
+        return True
+
+    monkeypatch.setattr(main, "send_message_to_telegram", send)
+    with pytest.raises(Crash):
+        main.main(YAMLHelper(str(config_path)))
+    assert len(sent) == 5
+    assert any(not state['done'] for state in journal_progress(config))
+
+    main.main(YAMLHelper(str(config_path)))
+    # Each of the 12 relevant entries went out once; the fifth, whose send was cut short, is not repeated
+    assert len(sent) == 12
+    assert len(set(sent)) == len(sent)
+    assert all(state['done'] for state in journal_progress(config))
@@ -0,0 +1,62 @@
+"""PDFs over the 10 M limit are uploaded once through the Files API and cited by file ID"""
+import yaml
+
+import main
+from benchmarks.bench_pipeline import scenario_config
+from benchmarks.fake_servers import FakeServer
+from benchmarks.fixtures import make_arxiv_feed
+from utils.cache_helper import SQLiteCache, TieredCache
+from utils.pdf_helper import PDFHelper
+from utils.yaml_helper import YAMLHelper
+
+
+def test_large_pdfs_are_uploaded_once_and_summarized_by_file_id(tmp_path):
+    # Every paper the fake server serves has the same 11 M of content
+    server = FakeServer(pdf_size=11 * 1000 * 1000).start()
+    try:
+        server.feeds["arxiv"] = make_arxiv_feed(12, base_url=server.url)
+        config = scenario_config(str(tmp_path), server, "arxiv", output="file")
+        config["LARGE_PDF"] = {"upload": True, "max_mb": 20}
+        config["CACHE"] = {"path": str(tmp_path / "cache.db")}
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config))
+
+        main.main(YAMLHelper(str(config_path)))
+        stats = server.stats()
+        summaries = stats["openai responses.summarize 200"]
+        assert summaries > 1
+        # Each paper is downloaded, but identical content is uploaded only once
+        assert stats["pdf GET 200"] == summaries
+        assert stats["openai files 200"] == 1
+        assert list(server.file_inputs.values()) == [summaries]
+        file_id = next(iter(server.file_inputs))
+        assert server.files[file_id] == server.pdf
+
+    finally:
+        server.stop()
+
+
+def test_upload_cache_skips_known_urls_across_restarts(tmp_path):
+    server = FakeServer(pdf_size=11 * 1000 * 1000).start()
+    uploads = []
+
+    def uploader(path):
+        uploads.append(path)
+        return f"file-{len(uploads)}"
+
+    def helper():
+        persistent = SQLiteCache(str(tmp_path / "cache.db"), "upload")
+        return PDFHelper(upload_cache=TieredCache("upload", persistent=persistent), temp_dir=str(tmp_path))
+
+    try:
+        first, second = f"{server.url}/abs/2510.10000.pdf", f"{server.url}/abs/2510.10001.pdf"
+        assert helper().upload(first, uploader) == "file-1"
+        # Same content under another URL: downloaded to hash it, but not uploaded again
+        assert helper().upload(second, uploader) == "file-1"
+        # A known URL is not even downloaded, also after a restart with a fresh memory tier
+        assert helper().upload(first, uploader) == "file-1"
+        assert len(uploads) == 1
+        assert server.stats()["pdf GET 200"] == 2
+        assert list(tmp_path.glob("*.pdf")) == []
+    finally:
+        server.stop()
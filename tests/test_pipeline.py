@@ -0,0 +1,55 @@
+"""Pipeline delivers in input order when stages finish out of order, and bounded queues hold back earlier stages"""
+import threading
+import time
+
+from utils.pipeline_helper import Pipeline, Stage
+
+
+def test_ordered_pipeline_delivers_in_input_order():
+    finished = []
+    delivered = []
+    lock = threading.Lock()
+
+    def classify(n):
+        # Later items sleep less, so the four workers finish them out of order
+        time.sleep((20 - n) % 5 * 0.005)
+        with lock:
+            finished.append(n)
+        return None if n % 3 == 0 else n
+
+    stats = Pipeline([
+        Stage("classify", classify, workers=4),
+        Stage("summarize", lambda n: time.sleep(n % 2 * 0.003) or n, workers=3),
+        Stage("deliver", delivered.append),
+    ], ordered=True).run(range(20))
+
+    assert finished != sorted(finished)
+    assert delivered == [n for n in range(20) if n % 3]
+    assert [stage['items'] for stage in stats] == [20, 13, 13]
+    assert stats[0]['dropped'] == 7
+
+
+def test_bounded_queues_hold_back_earlier_stages():
+    pulled = [0]
+    ahead = []
+
+    def items():
+        for n in range(40):
+            pulled[0] += 1
+            yield n
+
+    def slow(n):
+        # How many items were taken from the input before this one was consumed
+        ahead.append(pulled[0] - n)
+        time.sleep(0.005)
+        return n
+
+    stats = Pipeline([
+        Stage("fast", lambda n: n, queue_size=2),
+        Stage("slow", slow, queue_size=2),
+    ]).run(items())
+
+    # Two queues of two, one item in each worker and one waiting to be queued
+    assert max(ahead) <= 2 + 2 + 1 + 1 + 1
+    assert all(stage['max_queue_depth'] <= 2 for stage in stats)
+    assert stats[1]['items'] == 40
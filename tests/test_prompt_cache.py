@@ -0,0 +1,25 @@
+"""Static prompt prefixes and prompt_cache_key stay identical across entries"""
+import pytest
+
+from benchmarks.bench_prompt_cache import MIN_CACHEABLE_TOKENS, STATIC_PREFIXES, check_prefixes
+from utils.openai_helper import classifier_prefix, estimate_tokens
+
+RESULTS = check_prefixes(entries=20)
+
+
+@pytest.mark.parametrize("kind", sorted(STATIC_PREFIXES))
+def test_prefix_and_cache_key_are_stable(kind):
+    count, tokens, keys, stable = RESULTS[kind]
+    assert count >= 20
+    assert len(keys) == 1 and None not in keys
+    assert stable
+
+
+def test_built_in_prefixes_are_below_the_cache_minimum():
+    # prompt_cache_key only pays off with long INTERESTS/PROFILES; a change here should revisit the docs
+    assert all(tokens < MIN_CACHEABLE_TOKENS for _, tokens, _, _ in RESULTS.values())
+
+
+def test_long_interests_reach_the_cache_minimum():
+    interests = [f"Topic number {i} in machine learning" for i in range(120)]
+    assert estimate_tokens(classifier_prefix(interests, [])) >= MIN_CACHEABLE_TOKENS
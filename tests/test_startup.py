@@ -0,0 +1,64 @@
+"""Start-up stays cheap: the OpenAI SDK is not loaded by `import main` or `--check`, and imports fit the budget"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import yaml
+
+from benchmarks.bench_startup import BUDGET_FILE, ROOT, import_times
+from benchmarks.fake_servers import FakeServer
+from benchmarks.fixtures import make_arxiv_feed
+
+with open(BUDGET_FILE) as f:
+    BUDGET = json.load(f)
+
+
+def loaded_after(code):
+    """Run code in a fresh interpreter from the repository root; returns the top-level modules it loaded"""
+    result = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint(' '.join(sorted({name.split('.')[0] for name in sys.modules})))"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return set(result.stdout.split())
+
+
+def test_import_main_does_not_load_heavy_packages():
+    loaded = loaded_after("import main")
+    assert "openai" not in loaded
+    assert not set(BUDGET["forbidden"]) & loaded
+
+
+def test_check_does_not_load_openai():
+    server = FakeServer().start()
+    try:
+        server.feeds["arxiv"] = make_arxiv_feed(5, base_url=server.url)
+        with tempfile.TemporaryDirectory() as workdir:
+            config_path = os.path.join(workdir, "config.yaml")
+            with open(config_path, "w") as f:
+                yaml.safe_dump({
+                    "API_KEY": "sk-test",
+                    "API_BASE_URL": f"{server.url}/v1",
+                    "OUTPUT_FILE": os.path.join(workdir, "output.md"),
+                    "RSS": [{"feed_url": server.feed_url("arxiv"), "name": "arxiv"}],
+                    "INTERESTS": ["LLM Inference"],
+                }, f)
+            loaded = loaded_after(
+                "import runpy, sys\n"
+                f"sys.argv = ['main.py', '--check', '--config', {config_path!r}]\n"
+                "try:\n"
+                "    runpy.run_path('main.py', run_name='__main__')\n"
+                "except SystemExit as e:\n"
+                "    assert e.code == 0, e.code\n"
+            )
+    finally:
+        server.stop()
+    assert "feedparser" in loaded
+    assert "openai" not in loaded
+
+
+def test_import_time_within_budget():
+    samples = [import_times(BUDGET["module"])[BUDGET["module"]] / 1000 for _ in range(BUDGET.get("runs", 5))]
+    assert statistics.median(samples) <= BUDGET["budget_ms"]
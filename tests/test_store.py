@@ -0,0 +1,45 @@
+"""EntryStoreHelper counts an entry as delivered once every profile it matches has it"""
+import pytest
+
+from utils.store_helper import EntryStoreHelper
+
+KEY = "arxiv:2510.10000v1"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EntryStoreHelper(str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+def delivered(store):
+    record = store.lookup([KEY])[KEY]
+    return record['delivered'], record['delivered_profiles']
+
+
+def test_delivered_once_every_matching_profile_has_it(store):
+    store.record_verdict(KEY, "Paper", True, ["llm", "vision"])
+    store.mark_delivered(KEY, "llm")
+    assert delivered(store) == (False, ["llm"])
+    store.mark_delivered(KEY, "vision")
+    assert delivered(store) == (True, ["llm", "vision"])
+
+
+def test_entry_without_profile_names_is_delivered_with_its_first_profile(store):
+    store.record_verdict(KEY, "Paper", True)
+    store.mark_delivered(KEY, "llm")
+    assert delivered(store) == (True, ["llm"])
+
+
+def test_entry_matching_no_profile_is_never_marked_delivered(store):
+    store.record_verdict(KEY, "Paper", False, [])
+    assert store.lookup([KEY])[KEY]['profiles'] == []
+    store.mark_delivered(KEY, "llm")
+    assert delivered(store) == (False, ["llm"])
+
+
+def test_delivered_without_profiles(store):
+    store.record_verdict(KEY, "Paper", True)
+    store.mark_delivered(KEY)
+    assert delivered(store) == (True, [])
@@ -0,0 +1,308 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+
+logger = MyLogger("BatchHelper")
+
+# Batch API requests are billed at half the price of synchronous ones
+BATCH_PRICE_FACTOR = 0.5
+# Batch API limit on the number of requests in one input file
+MAX_BATCH_REQUESTS = 50000
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchItem(NamedTuple):
+    custom_id: str
+    payload: Optional[Dict]
+    verdict: Optional[bool]
+
+
+def _output_text(body: Dict) -> str:
+    """Concatenate the output_text parts of a raw Responses API object"""
+    return "".join(
+        content.get("text", "")
+        for item in body.get("output") or [] if item.get("type") == "message"
+        for content in item.get("content") or [] if content.get("type") == "output_text"
+    )
+
+
+class BatchClassifier:
+    """Classifies abstracts through the OpenAI Batch API instead of one live request each
+
+    Every abstract becomes one /v1/responses line of a JSONL request file,
+    built exactly like the selector's live request. Batch IDs are stored in
+    SQLite together with the abstracts and a caller payload (the feed entry)
+    before waiting, so a restarted run resumes the open batches with
+    collect_open() rather than submitting them again. Requests the batch
+    failed are classified live as a fallback.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        selector=None,
+        poll_interval: float = 30,
+        max_poll_interval: float = 600,
+        max_wait: float = 24 * 60 * 60,
+        completion_window: str = "24h",
+        metrics=None
+    ):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created batch state directory: {directory}")
+
+        # OpenAIHelper for the selector model: its client, request format, verdict cache and live fallback.
+        # It may be attached after construction, since open batches can be listed without it.
+        self.selector = selector
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_wait = max_wait
+        self.completion_window = completion_window
+        self.metrics = metrics or NULL_METRICS
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    batch_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    targets TEXT NOT NULL,
+                    exclusions TEXT NOT NULL,
+                    request_count INTEGER NOT NULL,
+                    collected INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_items (
+                    batch_id TEXT NOT NULL,
+                    custom_id TEXT NOT NULL,
+                    abstract TEXT NOT NULL,
+                    payload TEXT,
+                    PRIMARY KEY (batch_id, custom_id)
+                )
+            """)
+
+    @property
+    def client(self):
+        return self.selector.client
+
+    def open_batch_ids(self) -> List[str]:
+        """Batches submitted but not yet collected, oldest first"""
+        with self.lock:
+            rows = self.conn.execute("SELECT batch_id FROM batches WHERE collected = 0 ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def open_custom_ids(self) -> set:
+        """IDs of the requests waiting in open batches, which must not be submitted again"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT custom_id FROM batch_items JOIN batches USING (batch_id) WHERE batches.collected = 0"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def classify(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str], payloads: Optional[Dict[str, Dict]] = None) -> Dict[str, Optional[bool]]:
+        """Classify abstracts (keyed by a unique custom ID) in Batch API jobs and wait for the verdicts
+
+        Cached verdicts are reused. IDs still running when max_wait runs out
+        are left out of the result; collect_open() returns them later.
+        """
+        verdicts = {}
+        if self.selector.verdict_cache is not None:
+            for custom_id, abstract in abstracts.items():
+                cached = self.selector.verdict_cache.get(self.selector._verdict_key(abstract, target_subject, exclude_subject))
+                if cached is not None:
+                    verdicts[custom_id] = cached
+        abstracts = {custom_id: abstract for custom_id, abstract in abstracts.items() if custom_id not in verdicts}
+        if not abstracts:
+            return verdicts
+
+        batch_ids = self.submit(abstracts, target_subject, exclude_subject, payloads)
+        deadline = time.monotonic() + self.max_wait
+        for batch_id in batch_ids:
+            verdicts.update((item.custom_id, item.verdict) for item in self.wait_and_collect(batch_id, deadline))
+        return verdicts
+
+    def collect_open(self) -> List[BatchItem]:
+        """Wait for the batches a previous run left open and return their verdicts with the stored payloads"""
+        batch_ids = self.open_batch_ids()
+        if not batch_ids:
+            return []
+        logger.info(f"Resuming {len(batch_ids)} open classification batches: {', '.join(batch_ids)}")
+        deadline = time.monotonic() + self.max_wait
+        items = []
+        for batch_id in batch_ids:
+            items.extend(self.wait_and_collect(batch_id, deadline))
+        return items
+
+    def submit(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str], payloads: Optional[Dict[str, Dict]] = None) -> List[str]:
+        """Write the requests to JSONL files, upload them and create one batch per MAX_BATCH_REQUESTS"""
+        custom_ids = list(abstracts)
+        batch_ids = []
+        for start in range(0, len(custom_ids), MAX_BATCH_REQUESTS):
+            chunk = custom_ids[start:start + MAX_BATCH_REQUESTS]
+            with self.metrics.stage("batch_submit"):
+                batch_id = self._submit_chunk({custom_id: abstracts[custom_id] for custom_id in chunk}, target_subject, exclude_subject)
+            now = time.time()
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO batches (batch_id, status, model, targets, exclusions, request_count, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch_id, "validating", self.selector.model, json.dumps(target_subject), json.dumps(exclude_subject), len(chunk), now, now)
+                )
+                self.conn.executemany(
+                    "INSERT INTO batch_items (batch_id, custom_id, abstract, payload) VALUES (?, ?, ?, ?)",
+                    [(batch_id, custom_id, abstracts[custom_id], json.dumps((payloads or {}).get(custom_id))) for custom_id in chunk]
+                )
+            logger.info(f"Submitted classification batch {batch_id} with {len(chunk)} abstracts.")
+            batch_ids.append(batch_id)
+        return batch_ids
+
+    def _submit_chunk(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str]) -> str:
+        handle, path = tempfile.mkstemp(suffix=".jsonl", prefix="batch-", dir=os.path.dirname(self.path) or None)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                for custom_id, abstract in abstracts.items():
+                    request = {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/responses",
+                        "body": self.selector.classifier_request(abstract, target_subject, exclude_subject)
+                    }
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            with open(path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/responses",
+                completion_window=self.completion_window,
+                metadata={"purpose": "rss-auto-reader classification"}
+            )
+            return batch.id
+        except Exception as e:
+            logger.error(f"Error submitting classification batch: {e}")
+            raise Exception(f"Failed to submit classification batch: {e}")
+        finally:
+            os.remove(path)
+
+    def wait(self, batch_id: str, deadline: float):
+        """Poll the batch with exponential backoff until it finishes; returns None if the deadline passes first"""
+        interval = self.poll_interval
+        while True:
+            try:
+                batch = self.client.batches.retrieve(batch_id)
+            except Exception as e:
+                logger.warning(f"Could not poll batch {batch_id}: {e}")
+            else:
+                self._set_status(batch_id, batch.status)
+                if batch.status in FINAL_STATUSES:
+                    return batch
+                counts = batch.request_counts
+                progress = f" ({counts.completed + counts.failed}/{counts.total} done)" if counts else ""
+                logger.info(f"Batch {batch_id} is {batch.status}{progress}, checking again in {interval:.0f}s.")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Batch {batch_id} is still running, it will be collected by a later run.")
+                return None
+            time.sleep(min(remaining, interval * random.uniform(0.9, 1.1)))
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def wait_and_collect(self, batch_id: str, deadline: float) -> List[BatchItem]:
+        with self.metrics.stage("batch_wait"):
+            batch = self.wait(batch_id, deadline)
+        if batch is None:
+            return []
+        return self.collect(batch_id, batch)
+
+    def collect(self, batch_id: str, batch) -> List[BatchItem]:
+        """Read a finished batch's output, classify its failed requests live and mark it collected"""
+        with self.lock:
+            row = self.conn.execute("SELECT targets, exclusions FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+            rows = self.conn.execute("SELECT custom_id, abstract, payload FROM batch_items WHERE batch_id = ?", (batch_id,)).fetchall()
+        targets, exclusions = json.loads(row[0]), json.loads(row[1])
+        outputs = self._read_output(batch)
+        if batch.status != "completed":
+            logger.warning(f"Batch {batch_id} ended as {batch.status}, {len(outputs)} of {len(rows)} results are usable.")
+
+        items = []
+        fallback = 0
+        for custom_id, abstract, payload in rows:
+            verdict = outputs.get(custom_id)
+            if verdict is None:
+                fallback += 1
+                try:
+                    verdict = self.selector.analyze_subject_from_abstract(abstract, targets, exclusions)
+                except Exception as e:
+                    logger.error(f"Error classifying {custom_id} after its batch request failed: {e}")
+            elif self.selector.verdict_cache is not None:
+                self.selector.verdict_cache.set(self.selector._verdict_key(abstract, targets, exclusions), verdict)
+            items.append(BatchItem(custom_id, json.loads(payload) if payload else None, verdict))
+        if fallback:
+            logger.warning(f"Classified {fallback} requests of batch {batch_id} live because the batch returned no result for them.")
+
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE batches SET collected = 1, status = ?, updated_at = ? WHERE batch_id = ?", (batch.status, time.time(), batch_id))
+            self.conn.execute("DELETE FROM batch_items WHERE batch_id = ?", (batch_id,))
+        logger.info(f"Collected batch {batch_id}: {sum(1 for item in items if item.verdict)} relevant of {len(items)}.")
+        return items
+
+    def _read_output(self, batch) -> Dict[str, bool]:
+        """Parse the output file into verdicts by custom ID, recording token usage at the batch price"""
+        verdicts = {}
+        if batch.error_file_id:
+            try:
+                for line in self.client.files.content(batch.error_file_id).text.splitlines():
+                    if line.strip():
+                        result = json.loads(line)
+                        logger.debug(f"Batch request {result.get('custom_id')} failed: {result.get('error') or result.get('response')}")
+            except Exception as e:
+                logger.warning(f"Could not read the error file of batch {batch.id}: {e}")
+        if not batch.output_file_id:
+            return verdicts
+        try:
+            text = self.client.files.content(batch.output_file_id).text
+        except Exception as e:
+            logger.error(f"Could not download the output of batch {batch.id}: {e}")
+            return verdicts
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping unreadable line in the output of batch {batch.id}: {e}")
+                continue
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                continue
+            body = response.get("body") or {}
+            self.metrics.record_usage(self.selector.role, self.selector.model, body.get("usage"), price_factor=BATCH_PRICE_FACTOR)
+            verdicts[result.get("custom_id")] = self.selector.parse_classifier_output(_output_text(body))
+        return verdicts
+
+    def _set_status(self, batch_id: str, status: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE batches SET status = ?, updated_at = ? WHERE batch_id = ?", (status, time.time(), batch_id))
+
+    def prune(self, max_age_days: float = 30) -> int:
+        """Forget collected batches older than max_age_days"""
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self.lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM batches WHERE collected = 1 AND updated_at < ?", (cutoff,))
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
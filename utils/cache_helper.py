@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from .logger import MyLogger
+
+logger = MyLogger("CacheHelper")
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with optional TTL"""
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            item = self.data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, created_at = item
+            if self.ttl and time.time() - created_at > self.ttl:
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, created_at: Optional[float] = None):
+        with self.lock:
+            self.data[key] = (value, created_at or time.time())
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class SQLiteCache:
+    """Persistent key/value tier with per-namespace TTL, entry-count and size-based eviction"""
+
+    def __init__(self, path: str, namespace: str, ttl: Optional[float] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created cache directory: {directory}")
+
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache(namespace, accessed_at)")
+        self.expire()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return {'value', 'created_at'} for a live key, or None"""
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                return None
+            self.conn.execute("UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key))
+        return {'value': json.loads(row[0]), 'created_at': row[1]}
+
+    def set(self, key: str, value: Any):
+        encoded = json.dumps(value)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO cache (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(namespace, key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
+            """, (self.namespace, key, encoded, len(encoded), now, now))
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used rows until the namespace fits its limits (caller holds the lock)"""
+        if self.max_entries:
+            count = self.conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute("""
+                    DELETE FROM cache WHERE namespace = ? AND key IN (
+                        SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?
+                    )
+                """, (self.namespace, self.namespace, count - self.max_entries))
+        if self.max_bytes:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.conn.execute(
+                    "SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at", (self.namespace,)
+                ).fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((self.namespace, key))
+                    total -= size
+                self.conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", stale)
+
+    def expire(self) -> int:
+        """Delete rows older than the TTL, returns the number of rows removed"""
+        if not self.ttl:
+            return 0
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at < ?", (self.namespace, time.time() - self.ttl)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional persistent SQLite tier, with hit/miss counters"""
+
+    def __init__(self, name: str, memory_entries: int = 1000, ttl: Optional[float] = None, persistent: Optional[SQLiteCache] = None):
+        self.name = name
+        self.ttl = ttl
+        self.memory = LRUCache(memory_entries, ttl)
+        self.persistent = persistent
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+        self.counter_lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self.counter_lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('memory_hits')
+            return value
+        if self.persistent:
+            item = self.persistent.get(key)
+            if item is not None:
+                self._count('disk_hits')
+                self.memory.set(key, item['value'], item['created_at'])
+                return item['value']
+        self._count('misses')
+        return default
+
+    def set(self, key: str, value: Any):
+        self._count('writes')
+        self.memory.set(key, value)
+        if self.persistent:
+            self.persistent.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.counter_lock:
+            stats = dict(self.counters)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['memory_entries'] = len(self.memory)
+        return stats
+
+    def close(self):
+        if self.persistent:
+            self.persistent.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    # Example usage
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TieredCache("example", memory_entries=2, persistent=SQLiteCache(os.path.join(tmp, "cache.db"), "example", max_entries=10))
+        cache.set("a", True)
+        cache.set("b", False)
+        cache.set("c", True)
+        print(cache.get("a"), cache.get("c"), cache.get("missing"))
+        print(cache.stats())
+        cache.close()
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+
+class TaskResult(NamedTuple):
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class RateLimiter:
+    """Token buckets enforcing per-minute request and token limits across threads"""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.available_requests = requests_per_minute or 0
+        self.available_tokens = tokens_per_minute or 0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        if self.requests_per_minute:
+            self.available_requests = min(self.requests_per_minute, self.available_requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.available_tokens = min(self.tokens_per_minute, self.available_tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request and the given number of tokens fit within the limits"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        if self.tokens_per_minute:
+            # A single request larger than the whole budget would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self.lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self.available_requests < 1:
+                    wait = max(wait, (1 - self.available_requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self.available_tokens < tokens:
+                    wait = max(wait, (tokens - self.available_tokens) * 60 / self.tokens_per_minute)
+                if wait == 0:
+                    if self.requests_per_minute:
+                        self.available_requests -= 1
+                    if self.tokens_per_minute:
+                        self.available_tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+def run_concurrently(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int = 1,
+    rate_limiter: Optional[RateLimiter] = None,
+    cost: Optional[Callable[[Any], int]] = None
+) -> List[TaskResult]:
+    """Run func over items on a bounded thread pool, returning results in input order
+
+    Exceptions are captured per item in TaskResult.error instead of being raised,
+    so one failing item does not abort the others.
+    """
+
+    def call(item):
+        try:
+            if rate_limiter:
+                rate_limiter.acquire(cost(item) if cost else 0)
+            return TaskResult(value=func(item))
+        except Exception as e:
+            return TaskResult(error=e)
+
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call, items))
@@ -0,0 +1,275 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+from .telegram_bot_helper import TelegramBadRequestError, TelegramRateLimitError
+
+logger = MyLogger("DeliveryQueue")
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class TelegramRateLimiter:
+    """Global and per-chat token buckets following Telegram's bot limits
+
+    Defaults: 30 messages/s overall, 1 message/s per private chat and
+    20 messages/minute per group (group and channel chat IDs are negative).
+    """
+
+    def __init__(self, global_per_second: float = 30, chat_per_second: float = 1, group_per_minute: float = 20):
+        self.global_bucket = TokenBucket(global_per_second)
+        self.chat_per_second = chat_per_second
+        self.group_per_minute = group_per_minute
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id: Union[str, int]) -> TokenBucket:
+        key = str(chat_id)
+        if key not in self.chat_buckets:
+            if key.startswith("-") or key.startswith("@"):
+                self.chat_buckets[key] = TokenBucket(self.group_per_minute / 60, capacity=1)
+            else:
+                self.chat_buckets[key] = TokenBucket(self.chat_per_second, capacity=1)
+        return self.chat_buckets[key]
+
+    def acquire(self, chat_id: Union[str, int], stop_event: Optional[threading.Event] = None):
+        """Block until both the global and the chat bucket allow one message"""
+        while True:
+            with self.lock:
+                chat_bucket = self._chat_bucket(chat_id)
+                wait = max(self.global_bucket.wait_time(), chat_bucket.wait_time())
+                if wait == 0:
+                    self.global_bucket.take()
+                    chat_bucket.take()
+                    return
+            if stop_event is not None and stop_event.wait(wait):
+                return
+            elif stop_event is None:
+                time.sleep(wait)
+
+
+class DeliveryQueue:
+    """Durable outbox of Telegram messages delivered by a background worker
+
+    Messages are written to SQLite before sending, so undelivered ones survive
+    a crash and are picked up by the next run. The worker honors Telegram's
+    retry_after, backs off exponentially on other errors and gives up after
+    max_attempts. dedupe_key prevents the same message from being queued twice.
+
+    A message is marked sending before the request. One still sending when
+    the worker starts was interrupted by a crash and may have arrived, so it
+    is marked unconfirmed and acknowledged instead of being sent again. A
+    request that fails after Telegram received it (e.g. a timeout) is still
+    retried, so delivery is at least once for those.
+    """
+
+    def __init__(
+        self,
+        telegram_helper,
+        path: str,
+        rate_limiter: Optional[TelegramRateLimiter] = None,
+        max_attempts: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0,
+        on_delivered: Optional[Callable[[str], None]] = None,
+        metrics=None
+    ):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created outbox directory: {directory}")
+
+        self.telegram_helper = telegram_helper
+        self.path = path
+        self.rate_limiter = rate_limiter or TelegramRateLimiter()
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_delivered = on_delivered
+        self.metrics = metrics or NULL_METRICS
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.stop_event = threading.Event()
+        self.worker = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dedupe_key TEXT UNIQUE,
+                    chat_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    acked INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_error TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+
+    def start(self):
+        """Acknowledge messages sent before a crash and start the delivery worker"""
+        self._give_up_interrupted()
+        self._acknowledge_sent()
+        pending = self.pending_count()
+        if pending:
+            logger.info(f"Resuming delivery of {pending} messages left in the outbox.")
+        self.worker = threading.Thread(target=self._run, name="telegram-delivery", daemon=True)
+        self.worker.start()
+
+    def enqueue(self, chat_id: Union[str, int], text: str, dedupe_key: Optional[str] = None, **options) -> bool:
+        """Persist a message for delivery; returns False if dedupe_key is already queued or sent"""
+        now = time.time()
+        payload = json.dumps({"text": text, **options})
+        with self.lock, self.conn:
+            cursor = self.conn.execute("""
+                INSERT INTO outbox (dedupe_key, chat_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(dedupe_key) DO UPDATE SET
+                    payload = excluded.payload,
+                    status = 'pending',
+                    attempts = 0,
+                    next_attempt_at = excluded.next_attempt_at,
+                    last_error = NULL
+                WHERE outbox.status = 'failed'
+            """, (dedupe_key, str(chat_id), payload, now, now))
+        with self.wakeup:
+            self.wakeup.notify()
+        return cursor.rowcount > 0
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    def _next_due(self):
+        with self.lock:
+            return self.conn.execute("""
+                SELECT id, dedupe_key, chat_id, payload, attempts, next_attempt_at FROM outbox
+                WHERE status = 'pending' ORDER BY next_attempt_at, id LIMIT 1
+            """).fetchone()
+
+    def _update(self, message_id: int, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE outbox SET {assignments} WHERE id = ?", (*fields.values(), message_id))
+
+    def _acknowledge(self, message_id: int, dedupe_key: Optional[str]):
+        if self.on_delivered and dedupe_key:
+            try:
+                self.on_delivered(dedupe_key)
+            except Exception as e:
+                logger.error(f"Delivery callback failed for {dedupe_key}: {e}")
+                return
+        self._update(message_id, acked=1)
+
+    def _give_up_interrupted(self):
+        with self.lock, self.conn:
+            cursor = self.conn.execute("UPDATE outbox SET status = 'unconfirmed' WHERE status = 'sending'")
+        if cursor.rowcount:
+            logger.warning(f"Not resending {cursor.rowcount} messages whose delivery was interrupted: they may already have been sent.")
+
+    def _acknowledge_sent(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, dedupe_key FROM outbox WHERE status IN ('sent', 'unconfirmed') AND acked = 0"
+            ).fetchall()
+        for message_id, dedupe_key in rows:
+            self._acknowledge(message_id, dedupe_key)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            row = self._next_due()
+            if row is None:
+                with self.wakeup:
+                    self.wakeup.wait(timeout=1.0)
+                continue
+            message_id, dedupe_key, chat_id, payload, attempts, next_attempt_at = row
+            delay = next_attempt_at - time.time()
+            if delay > 0:
+                with self.wakeup:
+                    self.wakeup.wait(timeout=min(delay, 1.0))
+                continue
+
+            self.rate_limiter.acquire(chat_id, self.stop_event)
+            if self.stop_event.is_set():
+                break
+            self._deliver(message_id, dedupe_key, chat_id, json.loads(payload), attempts)
+
+    def _deliver(self, message_id: int, dedupe_key: Optional[str], chat_id: str, payload: Dict, attempts: int):
+        self._update(message_id, status='sending')
+        try:
+            with self.metrics.stage("deliver"):
+                self.telegram_helper.send_message(chat_id=chat_id, **payload)
+        except TelegramRateLimitError as e:
+            # Telegram told us exactly how long to wait; this does not count as a failed attempt
+            self._update(message_id, status='pending', next_attempt_at=time.time() + e.retry_after, last_error=str(e))
+            return
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts or isinstance(e, TelegramBadRequestError):
+                logger.error(f"Giving up on message {dedupe_key or message_id} after {attempts} attempts: {e}")
+                self._update(message_id, status='failed', attempts=attempts, last_error=str(e))
+            else:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+                logger.warning(f"Delivery of message {dedupe_key or message_id} failed ({e}), retrying in {backoff:.0f}s")
+                self._update(message_id, status='pending', attempts=attempts, next_attempt_at=time.time() + backoff, last_error=str(e))
+            return
+
+        logger.info("Message sent to Telegram.")
+        self._update(message_id, status='sent', attempts=attempts + 1, last_error=None)
+        self._acknowledge(message_id, dedupe_key)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no messages are pending; returns False if the timeout expired first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending_count():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def prune(self, max_age_days: float = 7) -> int:
+        """Delete acknowledged and failed messages older than max_age_days"""
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM outbox WHERE created_at < ? AND ((status IN ('sent', 'unconfirmed') AND acked = 1) OR status = 'failed')", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def close(self, drain_timeout: Optional[float] = 300):
+        """Drain pending messages (up to drain_timeout), then stop the worker; leftovers stay in the outbox"""
+        if self.worker is not None:
+            if not self.drain(drain_timeout):
+                logger.warning(f"{self.pending_count()} messages still pending, they will be retried on the next run.")
+            self.stop_event.set()
+            with self.wakeup:
+                self.wakeup.notify()
+            self.worker.join()
+            self.worker = None
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import re
+from typing import TYPE_CHECKING, List, Optional
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+from .openai_helper import _as_list, normalize_abstract
+
+# NumPy is an optional dependency, imported when the first scores are computed
+if TYPE_CHECKING:
+    import numpy
+
+logger = MyLogger("EmbeddingHelper")
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Embedding relevance scoring requires the 'numpy' package (pip install numpy)")
+    return numpy
+
+
+class OpenAIEmbeddingProvider:
+    """Embeds texts with the OpenAI embeddings endpoint"""
+
+    def __init__(self, client, model: str = "text-embedding-3-small", dimensions: Optional[int] = None, metrics=None):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.metrics = metrics or NULL_METRICS
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}:{self.dimensions or 'default'}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        try:
+            with self.metrics.stage("embed"):
+                response = self.client.embeddings.create(model=self.model, input=texts, **kwargs)
+        except Exception as e:
+            logger.error(f"Error embedding {len(texts)} texts: {e}")
+            raise Exception(f"Failed to embed texts: {e}")
+        self.metrics.record_usage("embedding", self.model, {"input_tokens": getattr(response.usage, "prompt_tokens", 0)})
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HashingEmbeddingProvider:
+    """Deterministic offline embeddings from hashed word unigrams and bigrams, for tests and benchmarks"""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    @property
+    def name(self) -> str:
+        return f"hashing:{self.dimensions}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimensions
+            words = WORD_PATTERN.findall((text or "").lower())
+            for feature in set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                vector[int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0 if digest[4] & 1 else -1.0
+            vectors.append(vector)
+        return vectors
+
+
+class EmbeddingScorer:
+    """Scores abstracts against INTERESTS and EXCLUSIONS by the cosine similarity of their embeddings
+
+    Topic and abstract vectors are cached by a hash of the provider and text,
+    so each is embedded once; missing ones are requested batch_size at a time.
+    All abstracts are scored in one matrix product: the score is the best
+    interest similarity, lowered by exclusion_weight times how far the best
+    exclusion similarity exceeds it. Scores at or above high are relevant, at
+    or below low irrelevant, and the band between is left to the selector model.
+    """
+
+    def __init__(
+        self,
+        provider,
+        interests: List[str],
+        exclusions: List[str],
+        cache=None,
+        batch_size: int = 256,
+        high: float = 0.5,
+        low: float = 0.25,
+        exclusion_weight: float = 1.0,
+        metrics=None
+    ):
+        self.provider = provider
+        self.interests = _as_list(interests)
+        self.exclusions = _as_list(exclusions)
+        # Maps text hashes to base64 float32 vectors (e.g. TieredCache)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.high = high
+        self.low = low
+        self.exclusion_weight = exclusion_weight
+        self.metrics = metrics or NULL_METRICS
+        self.topic_vectors = None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.provider.name}\n{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts: List[str]) -> "numpy.ndarray":
+        """Return L2-normalized vectors for texts, one row each, embedding only uncached texts"""
+        np = _numpy()
+        vectors = [None] * len(texts)
+        missing = {}
+        for index, text in enumerate(texts):
+            key = self._key(text)
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                vectors[index] = np.frombuffer(base64.b64decode(cached), dtype=np.float32)
+            else:
+                # Identical texts are embedded once
+                missing.setdefault(key, []).append(index)
+
+        keys = list(missing)
+        for start in range(0, len(keys), self.batch_size):
+            chunk = keys[start:start + self.batch_size]
+            for key, embedding in zip(chunk, self.provider.embed([texts[missing[key][0]] for key in chunk])):
+                vector = np.asarray(embedding, dtype=np.float32)
+                if self.cache is not None:
+                    self.cache.set(key, base64.b64encode(vector.tobytes()).decode("ascii"))
+                for index in missing[key]:
+                    vectors[index] = vector
+        if missing:
+            logger.debug(f"Embedded {len(missing)} texts, {len(texts) - sum(len(indices) for indices in missing.values())} cached")
+
+        matrix = np.vstack(vectors)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def score(self, abstracts: List[str]) -> "numpy.ndarray":
+        """Relevance score per abstract, computed for all of them at once"""
+        np = _numpy()
+        if not abstracts:
+            return np.zeros(0, dtype=np.float32)
+        if self.topic_vectors is None:
+            self.topic_vectors = self.embed(self.interests + self.exclusions)
+        documents = self.embed([normalize_abstract(abstract) for abstract in abstracts])
+        with self.metrics.stage("embedding_score"):
+            similarities = documents @ self.topic_vectors.T
+            interest = similarities[:, :len(self.interests)].max(axis=1)
+            if not self.exclusions:
+                return interest
+            exclusion = similarities[:, len(self.interests):].max(axis=1)
+            return interest - self.exclusion_weight * np.maximum(0.0, exclusion - interest)
+
+    def decide(self, abstracts: List[str]) -> List[Optional[bool]]:
+        """True or False where the score is clear, None where the selector model should decide"""
+        if not self.interests:
+            return [None] * len(abstracts)
+        decisions = [True if score >= self.high else False if score <= self.low else None for score in self.score(abstracts).tolist()]
+        for outcome, decision in (("relevant", True), ("irrelevant", False), ("ambiguous", None)):
+            self.metrics.increment("embedding_decisions", sum(1 for d in decisions if d is decision), outcome=outcome)
+        return decisions
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,151 @@
+import threading
+from typing import Dict, Iterable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from .logger import MyLogger
+
+logger = MyLogger("HTTPHelper")
+
+
+class ConnectionStats:
+    """Per-host counters of requests sent, connections opened and retries"""
+
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, host: str, port: Optional[int]) -> Dict:
+        name = f"{host}:{port}" if port else host
+        return self.hosts.setdefault(name, {'requests': 0, 'connections': 0, 'retries': 0})
+
+    def record_request(self, host: str, port: Optional[int]):
+        with self.lock:
+            self._host(host, port)['requests'] += 1
+
+    def record_connection(self, host: str, port: Optional[int]):
+        with self.lock:
+            self._host(host, port)['connections'] += 1
+
+    def record_retry(self, host: str, port: Optional[int]):
+        with self.lock:
+            self._host(host, port)['retries'] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self.lock:
+            stats = {}
+            for host, counters in self.hosts.items():
+                reused = max(0, counters['requests'] - counters['connections'])
+                stats[host] = {
+                    **counters,
+                    'reused': reused,
+                    'reuse_rate': reused / counters['requests'] if counters['requests'] else 0.0
+                }
+            return stats
+
+
+def _counting_pool(base, stats: ConnectionStats):
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.record_connection(self.host, self.port)
+            return super()._new_conn()
+
+        def urlopen(self, method, url, *args, **kwargs):
+            # Retries re-enter urlopen, so every attempt is counted
+            stats.record_request(self.host, self.port)
+            return super().urlopen(method, url, *args, **kwargs)
+
+    # Keep urllib3's class name in error messages
+    CountingPool.__name__ = CountingPool.__qualname__ = base.__name__
+    return CountingPool
+
+
+def _counting_retry(stats: ConnectionStats):
+    class CountingRetry(Retry):
+        def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+            # Raises once retries are exhausted, so only retries that will happen are counted
+            new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+            redirect = response is not None and response.get_redirect_location()
+            if _pool is not None and not redirect:
+                stats.record_retry(_pool.host, _pool.port)
+            return new_retry
+
+    CountingRetry.__name__ = CountingRetry.__qualname__ = Retry.__name__
+    return CountingRetry
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report into ConnectionStats"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+
+class HTTPHelper:
+    """Shared keep-alive transport for feed, PDF and Telegram traffic
+
+    Exposes the same get/post/head calls as the requests module, adding a
+    default timeout and a retry/backoff policy. Retries on status codes only
+    apply to idempotent methods; connection failures are retried for all.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: float = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        status_forcelist: Iterable[int] = (500, 502, 503, 504)
+    ):
+        self.timeout = timeout
+        self.stats = ConnectionStats()
+        self.retry = _counting_retry(self.stats)(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(status_forcelist),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = PooledHTTPAdapter(self.stats, pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=self.retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def connection_stats(self) -> Dict[str, Dict]:
+        """Requests, new connections, reused connections and retries per host"""
+        return self.stats.snapshot()
+
+    def close(self):
+        self.session.close()
+
+
+if __name__ == "__main__":
+    # Example usage
+    http = HTTPHelper()
+    for _ in range(3):
+        http.head("https://arxiv.org/")
+    print(http.connection_stats())
+    http.close()
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from .logger import MyLogger
+
+logger = MyLogger("RunJournal")
+
+
+def _new_state() -> Dict:
+    return {
+        'entry': None,
+        'title': None,
+        'is_relevant': None,
+        'profiles': None,
+        'summary': None,
+        'delivered': [],
+        'in_flight': [],
+        # Message IDs of streamed Telegram messages by target, so a resumed run can finish them
+        'messages': {},
+        'done': False,
+        'started_at': None,
+    }
+
+
+class RunJournal:
+    """Append-only write-ahead log of each entry's progress through a run
+
+    Every event is one JSON line: fetched (with the entry itself), classified,
+    summarized, delivering, message, failed and delivered (per delivery target,
+    e.g. a chat or a file) and done. A restarted run replays the file to resume every entry from
+    its last completed stage; a target left in delivering may or may not have
+    been reached, and finished entries are skipped. compact() rewrites the file
+    with one snapshot per unfinished entry once a run completes.
+    """
+
+    def __init__(self, path: str, sync: bool = False, max_age_days: Optional[float] = 7):
+        if not path:
+            raise ValueError("Journal path is required")
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created journal directory: {directory}")
+
+        self.path = path
+        # fsync every write so the journal also survives power loss, not only a crashed process
+        self.sync = sync
+        self.max_age_days = max_age_days
+        self.lock = threading.Lock()
+        self.states = self._replay()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _replay(self) -> Dict[str, Dict]:
+        states = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A crash can cut the last line short
+                    logger.warning(f"Ignoring unreadable line {number} of {self.path}")
+                    continue
+                self._apply(states, event)
+        return states
+
+    @staticmethod
+    def _apply(states: Dict[str, Dict], event: Dict):
+        stage = event.get('stage')
+        if stage == "snapshot":
+            states[event['key']] = {**_new_state(), **event['state']}
+            return
+        state = states.setdefault(event['key'], _new_state())
+        if state['started_at'] is None:
+            state['started_at'] = event.get('ts')
+        if stage == "fetched":
+            state['entry'] = event.get('entry')
+            state['title'] = event.get('title')
+        elif stage == "classified":
+            state['is_relevant'] = event.get('is_relevant')
+            state['profiles'] = event.get('profiles')
+        elif stage == "summarized":
+            state['summary'] = event.get('summary')
+        elif stage == "delivering":
+            if event['target'] not in state['in_flight']:
+                state['in_flight'].append(event['target'])
+        elif stage == "message":
+            state['messages'][event['target']] = event['message_id']
+        elif stage == "failed":
+            if event['target'] in state['in_flight']:
+                state['in_flight'].remove(event['target'])
+        elif stage == "delivered":
+            if event['target'] in state['in_flight']:
+                state['in_flight'].remove(event['target'])
+            if event['target'] not in state['delivered']:
+                state['delivered'].append(event['target'])
+        elif stage == "done":
+            state['done'] = True
+
+    def _append(self, events: List[Dict]):
+        if not events:
+            return
+        now = time.time()
+        with self.lock:
+            for event in events:
+                event.setdefault('ts', now)
+                self._apply(self.states, event)
+            self.file.write("".join(json.dumps(event) + "\n" for event in events))
+            self.file.flush()
+            if self.sync:
+                os.fsync(self.file.fileno())
+
+    def progress(self) -> Dict[str, Dict]:
+        """Progress of every entry journaled since the last completed run, finished ones included, by entry key"""
+        with self.lock:
+            return {key: dict(state) for key, state in self.states.items()}
+
+    def record_fetched(self, entries: Iterable[tuple]):
+        """Journal (key, entry record) pairs not journaled yet, in one write"""
+        with self.lock:
+            new = [(key, record) for key, record in entries if key not in self.states]
+        self._append([{'key': key, 'stage': "fetched", 'title': record.get('title'), 'entry': record} for key, record in new])
+
+    def record_verdict(self, key: str, is_relevant: bool, profiles: Optional[List[str]] = None):
+        self._append([{'key': key, 'stage': "classified", 'is_relevant': is_relevant, 'profiles': profiles}])
+
+    def record_summary(self, key: str, summary: str):
+        self._append([{'key': key, 'stage': "summarized", 'summary': summary}])
+
+    def begin_delivery(self, key: str, target: str):
+        """Log the intent to deliver to target before a send that cannot be deduplicated"""
+        self._append([{'key': key, 'stage': "delivering", 'target': target}])
+
+    def record_message(self, key: str, target: str, message_id: int):
+        """Log the ID of a message sent to target that is still being edited"""
+        self._append([{'key': key, 'stage': "message", 'target': target, 'message_id': message_id}])
+
+    def abort_delivery(self, key: str, target: str):
+        """Clear the intent logged by begin_delivery after a send that definitely failed"""
+        self._append([{'key': key, 'stage': "failed", 'target': target}])
+
+    def mark_delivered(self, key: str, target: str):
+        self._append([{'key': key, 'stage': "delivered", 'target': target}])
+
+    def mark_done(self, key: str):
+        self._append([{'key': key, 'stage': "done"}])
+
+    def compact(self) -> int:
+        """Rewrite the journal with one snapshot per unfinished entry, returns the number kept
+
+        Entries unfinished for longer than max_age_days are dropped.
+        """
+        cutoff = time.time() - self.max_age_days * 24 * 60 * 60 if self.max_age_days else None
+        temp_path = f"{self.path}.tmp"
+        with self.lock:
+            kept = {}
+            for key, state in self.states.items():
+                if state['done']:
+                    continue
+                if cutoff and state['started_at'] and state['started_at'] < cutoff:
+                    logger.warning(f"Dropping journaled entry unfinished for over {self.max_age_days} days: {state['title'] or key}")
+                    continue
+                kept[key] = state
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps({'key': key, 'stage': "snapshot", 'state': state}) + "\n" for key, state in kept.items()))
+                f.flush()
+                os.fsync(f.fileno())
+            self.file.close()
+            os.replace(temp_path, self.path)
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.states = kept
+        logger.info(f"Compacted run journal {self.path}: {len(kept)} unfinished entries kept")
+        return len(kept)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    # Example usage: a run that stopped after summarizing, replayed by the next one
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = RunJournal(os.path.join(tmp, "journal.jsonl"))
+        journal.record_fetched([("arxiv:2504.17728v1", {"title": "Sample Paper", "link": "https://arxiv.org/abs/2504.17728"})])
+        journal.record_verdict("arxiv:2504.17728v1", True)
+        journal.record_summary("arxiv:2504.17728v1", "A short summary.")
+        journal.close()
+
+        journal = RunJournal(os.path.join(tmp, "journal.jsonl"))
+        print(journal.progress())
+        journal.mark_done("arxiv:2504.17728v1")
+        print(journal.compact())
+        journal.close()
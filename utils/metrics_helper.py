@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, Optional
+from .logger import MyLogger
+
+logger = MyLogger("Metrics")
+
+PREFIX = "rss_reader"
+TOKEN_KINDS = ("input", "cached", "output", "reasoning")
+
+
+def _labels(**labels) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _field(obj, name: str):
+    """Read name from an SDK object or from its raw JSON dict (e.g. a Batch API output line)"""
+    if obj is None:
+        return None
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def _write(path: str, text: str, append: bool = False):
+    """Append to path, or replace it atomically so scrapers never read a partial file"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    if append:
+        with open(path, "a") as f:
+            f.write(text)
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class Metrics:
+    """Thread-safe stage timings, model token usage and cost for one process
+
+    Counters are cumulative since the process started, so in daemon mode every
+    export covers all cycles so far. pricing maps a model name to USD per
+    million input, cached_input and output tokens (reasoning tokens are billed
+    as output).
+    """
+
+    enabled = True
+
+    def __init__(self, pricing: Optional[Dict[str, Dict[str, float]]] = None, http_stats: Optional[Callable[[], Dict[str, Dict]]] = None):
+        self.pricing = pricing or {}
+        # Per-host request/connection/retry counters, e.g. HTTPHelper.connection_stats
+        self.http_stats = http_stats
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.exports = 0
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.models: Dict[tuple, Dict[str, float]] = {}
+        self.counters: Dict[tuple, int] = {}
+        self.gauges: Dict[tuple, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stage['count'] += 1
+            stage['seconds'] += seconds
+            stage['max_seconds'] = max(stage['max_seconds'], seconds)
+
+    def increment(self, name: str, value: int = 1, **labels):
+        """Add value to the counter name with the given labels (exported as rss_reader_<name>_total)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels):
+        """Set the current value of gauge name with the given labels (exported as rss_reader_<name>)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def record_usage(self, role: str, model: str, usage, price_factor: float = 1.0):
+        """Add a Responses API usage object (input/output tokens and their details) to the role's totals
+
+        price_factor scales the cost, e.g. 0.5 for Batch API requests.
+        """
+        if usage is None:
+            return
+        input_tokens = _field(usage, "input_tokens") or 0
+        output_tokens = _field(usage, "output_tokens") or 0
+        cached = _field(_field(usage, "input_tokens_details"), "cached_tokens") or 0
+        reasoning = _field(_field(usage, "output_tokens_details"), "reasoning_tokens") or 0
+        price = self.pricing.get(model) or {}
+        cost = price_factor * (
+            (input_tokens - cached) * price.get("input", 0)
+            + cached * price.get("cached_input", price.get("input", 0))
+            + output_tokens * price.get("output", 0)
+        ) / 1000000
+        with self.lock:
+            totals = self.models.setdefault((role, model), {'requests': 0, 'input': 0, 'cached': 0, 'output': 0, 'reasoning': 0, 'cost_usd': 0.0})
+            totals['requests'] += 1
+            totals['input'] += input_tokens
+            totals['cached'] += cached
+            totals['output'] += output_tokens
+            totals['reasoning'] += reasoning
+            totals['cost_usd'] += cost
+
+    def token_totals(self) -> Dict[str, Dict[str, int]]:
+        """Input and cached input tokens per role, summed over models"""
+        totals = {}
+        with self.lock:
+            for (role, _), model in self.models.items():
+                role_totals = totals.setdefault(role, {'input': 0, 'cached': 0})
+                role_totals['input'] += model['input']
+                role_totals['cached'] += model['cached']
+        return totals
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            snapshot = {
+                'timestamp': time.time(),
+                'uptime_seconds': time.time() - self.started_at,
+                'stages': {name: dict(stage) for name, stage in sorted(self.stages.items())},
+                'models': [{'role': role, 'model': model, **totals} for (role, model), totals in sorted(self.models.items())],
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(self.counters.items())],
+                'gauges': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(self.gauges.items())],
+            }
+        snapshot['http'] = self.http_stats() if self.http_stats else {}
+        return snapshot
+
+    def to_prometheus(self, snapshot: Optional[Dict] = None) -> str:
+        """Render a snapshot in the Prometheus text exposition format"""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(f"{PREFIX}_{name}{labels} {value}" for labels, value in samples)
+
+        stages = snapshot['stages']
+        metric("stage_calls_total", "counter", "Calls per pipeline stage.",
+               [(_labels(stage=name), stage['count']) for name, stage in stages.items()])
+        metric("stage_seconds_total", "counter", "Wall time spent per pipeline stage.",
+               [(_labels(stage=name), round(stage['seconds'], 6)) for name, stage in stages.items()])
+        metric("stage_seconds_max", "gauge", "Slowest single call per pipeline stage.",
+               [(_labels(stage=name), round(stage['max_seconds'], 6)) for name, stage in stages.items()])
+
+        models = snapshot['models']
+        metric("model_requests_total", "counter", "Model responses received per role.",
+               [(_labels(role=m['role'], model=m['model']), m['requests']) for m in models])
+        metric("model_tokens_total", "counter", "Tokens per role and kind (cached is part of input, reasoning part of output).",
+               [(_labels(role=m['role'], model=m['model'], kind=kind), m[kind]) for m in models for kind in TOKEN_KINDS])
+        metric("model_cost_usd_total", "counter", "Estimated model cost in USD from the configured pricing.",
+               [(_labels(role=m['role'], model=m['model']), round(m['cost_usd'], 6)) for m in models])
+
+        hosts = snapshot['http']
+        metric("http_requests_total", "counter", "HTTP attempts per host, retries included.",
+               [(_labels(host=host), stats['requests']) for host, stats in hosts.items()])
+        metric("http_connections_total", "counter", "HTTP connections opened per host.",
+               [(_labels(host=host), stats['connections']) for host, stats in hosts.items()])
+        metric("http_retries_total", "counter", "HTTP retries per host.",
+               [(_labels(host=host), stats.get('retries', 0)) for host, stats in hosts.items()])
+
+        for name in sorted({counter['name'] for counter in snapshot['counters']}):
+            metric(f"{name}_total", "counter", f"Count of {name.replace('_', ' ')}.",
+                   [(_labels(**counter['labels']), counter['value']) for counter in snapshot['counters'] if counter['name'] == name])
+        for name in sorted({gauge['name'] for gauge in snapshot['gauges']}):
+            metric(name, "gauge", f"Current {name.replace('_', ' ')}.",
+                   [(_labels(**gauge['labels']), gauge['value']) for gauge in snapshot['gauges'] if gauge['name'] == name])
+        return "\n".join(lines) + "\n"
+
+    def export(self, jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        """Append a JSON line and/or rewrite a Prometheus textfile (for node_exporter's textfile collector)"""
+        snapshot = self.snapshot()
+        self.exports += 1
+        snapshot['export'] = self.exports
+        try:
+            if jsonl_path:
+                _write(jsonl_path, json.dumps(snapshot) + "\n", append=True)
+            if prometheus_path:
+                _write(prometheus_path, self.to_prometheus(snapshot))
+        except OSError as e:
+            logger.error(f"Failed to export metrics: {e}")
+
+    def log_summary(self):
+        snapshot = self.snapshot()
+        for name, stage in snapshot['stages'].items():
+            logger.info(f"Stage {name}: {stage['count']} calls, {stage['seconds']:.2f}s total, {stage['max_seconds']:.2f}s max")
+        for counter in snapshot['counters']:
+            labels = ", ".join(f"{name}={value}" for name, value in counter['labels'].items())
+            logger.info(f"{counter['name'].replace('_', ' ').capitalize()} ({labels}): {counter['value']}")
+        for m in snapshot['models']:
+            logger.info(
+                f"Model {m['role']} ({m['model']}): {m['requests']} responses, {m['input']} input tokens ({m['cached']} cached), "
+                f"{m['output']} output tokens ({m['reasoning']} reasoning), ~${m['cost_usd']:.4f}"
+            )
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve /metrics in the Prometheus format from a background thread (for daemon mode)"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = metrics.to_prometheus().encode("utf-8") if self.path == "/metrics" else b"Not found\n"
+                self.send_response(200 if self.path == "/metrics" else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+
+class NullMetrics:
+    """Drop-in for Metrics when metrics are disabled; every call is a no-op"""
+
+    enabled = False
+    _stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._stage
+
+    def observe(self, name: str, seconds: float):
+        pass
+
+    def increment(self, name: str, value: int = 1, **labels):
+        pass
+
+    def gauge(self, name: str, value: float, **labels):
+        pass
+
+    def record_usage(self, role: str, model: str, usage, price_factor: float = 1.0):
+        pass
+
+    def token_totals(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+    def export(self, jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        pass
+
+    def log_summary(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
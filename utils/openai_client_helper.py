@@ -0,0 +1,88 @@
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from .logger import MyLogger
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import OpenAI
+
+logger = MyLogger("OpenAIClientRegistry")
+
+
+class OpenAIClientRegistry:
+    """Hands out long-lived OpenAI clients keyed on (base URL, API key, model role)
+
+    Clients for the same endpoint and key share one keep-alive connection pool,
+    so the selector and summarizer roles reuse each other's connections.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30,
+        timeout: float = 600,
+        max_retries: int = 2,
+        http2: bool = False,
+        metrics=None
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.http2 = http2
+        # Counts responses the SDK will retry (408/409/429/5xx) as model_retries
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.http_clients: Dict[Tuple, "httpx.Client"] = {}
+        self.clients: Dict[Tuple, "OpenAI"] = {}
+
+    def _limits(self) -> "httpx.Limits":
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _record_retry(self, response):
+        # Statuses the SDK retries; the final attempt of an exhausted request is counted too
+        if response.status_code in (408, 409, 429) or response.status_code >= 500:
+            self.metrics.increment("model_retries", host=response.request.url.host, status=response.status_code)
+
+    def _http_client(self) -> "httpx.Client":
+        import httpx
+        kwargs = {"event_hooks": {"response": [self._record_retry]}} if self.metrics is not None else {}
+        if self.http2:
+            try:
+                return httpx.Client(limits=self._limits(), timeout=self.timeout, http2=True, **kwargs)
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1.")
+                self.http2 = False
+        return httpx.Client(limits=self._limits(), timeout=self.timeout, **kwargs)
+
+    def get_client(self, api_key: str, base_url: Optional[str] = None, role: str = "default") -> "OpenAI":
+        """Return the shared synchronous client for this endpoint, key and role"""
+        from openai import OpenAI
+        with self.lock:
+            key = (base_url, api_key, role)
+            if key not in self.clients:
+                pool_key = (base_url, api_key)
+                if pool_key not in self.http_clients:
+                    self.http_clients[pool_key] = self._http_client()
+                kwargs = {"base_url": base_url} if base_url else {}
+                self.clients[key] = OpenAI(
+                    api_key=api_key, http_client=self.http_clients[pool_key],
+                    timeout=self.timeout, max_retries=self.max_retries, **kwargs
+                )
+                logger.debug(f"Created OpenAI client for role {role} at {base_url or 'default endpoint'}")
+            return self.clients[key]
+
+    def close(self):
+        """Close every pooled connection"""
+        with self.lock:
+            for http_client in self.http_clients.values():
+                http_client.close()
+            self.http_clients.clear()
+            self.clients.clear()
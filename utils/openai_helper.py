@@ -1,270 +1,582 @@
 import os
-from typing import List, Dict, Optional
-from openai import OpenAI
+import json
+import hashlib
+import time
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional
 from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
 import textwrap
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = MyLogger("OpenAIHelper")
 
+# Rough size of the classifier instructions wrapped around each abstract
+CLASSIFIER_PROMPT_TOKENS = 150
+BATCH_CLASSIFIER_PROMPT_TOKENS = 200
+BATCH_ITEM_OVERHEAD_TOKENS = 15
+PROFILE_PROMPT_TOKENS = 150
+PROFILE_ITEM_TOKENS = 30
+
+BATCH_CLASSIFIER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "relevant": {"type": "boolean"}
+                },
+                "required": ["id", "relevant"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for rate limiting and batching"""
+    return len(text or "") // 4 + 1
+
+
+def _as_list(value) -> List[str]:
+    """Normalize inputs so None/strings won't crash join()"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    try:
+        return list(value)
+    except TypeError:
+        return [str(value)]
+
+
+def normalize_abstract(abstract: str) -> str:
+    """Drop the arXiv announcement header and collapse whitespace so re-announcements hash alike"""
+    abstract = abstract or ""
+    if 'Abstract:' in abstract:
+        abstract = abstract.split('Abstract:', 1)[1]
+    return " ".join(abstract.split())
+
+
+def verdict_cache_key(abstract: str, targets: List[str], exclusions: List[str], model: str, reasoning: Optional[str]) -> str:
+    """Content hash identifying a classifier verdict; changes whenever any input to the verdict changes"""
+    payload = json.dumps([normalize_abstract(abstract), sorted(targets), sorted(exclusions), model, reasoning or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def profile_match_cache_key(abstract: str, profiles: List[Dict], model: str, reasoning: Optional[str]) -> str:
+    """Content hash identifying a multi-label verdict; changes whenever any profile's topics change"""
+    topics = sorted([profile['name'], sorted(_as_list(profile.get('interests'))), sorted(_as_list(profile.get('exclusions')))] for profile in profiles)
+    payload = json.dumps(["profiles", normalize_abstract(abstract), topics, model, reasoning or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def profile_match_schema(names: List[str]) -> Dict:
+    """Structured output listing the matching profiles, restricted to the configured names"""
+    return {
+        "type": "object",
+        "properties": {
+            "matches": {
+                "type": "array",
+                "items": {"type": "string", "enum": names}
+            }
+        },
+        "required": ["matches"],
+        "additionalProperties": False
+    }
+
+
+def prompt_cache_key(role: str, kind: str, prefix: str) -> str:
+    """Stable prompt_cache_key for requests sharing a static prefix, so the provider routes them to the same prompt cache"""
+    return f"{role}-{kind}-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16]}"
+
+
+# The builders below return the static part of each prompt. It depends only on
+# the configured topics, so it is byte-identical for every entry of a run and
+# always comes before the entry's abstract or paper, which keeps it cacheable.
+
+def classifier_prefix(targets: List[str], exclusions: List[str]) -> str:
+    return textwrap.dedent("""
+        You are a binary classifier. Follow these rules strictly and output only yes or no in lowercase.
+
+        Targets: {targets}
+        Exclusions: {exclusions}
+
+        Rules:
+        - If the abstract mainly talks about any Exclusions -> no.
+        - Else if it relates to any Targets -> yes.
+        - If both appear -> no.
+        - If unclear/insufficient info/off-topic -> no.
+        - No explanation, no quotes, only yes or no.
+
+        Abstract:
+    """).format(
+        targets=", ".join(targets) if targets else "(none)",
+        exclusions=", ".join(exclusions) if exclusions else "(none)",
+    ).strip() + "\n"
+
+
+def batch_classifier_prefix(targets: List[str], exclusions: List[str]) -> str:
+    return textwrap.dedent("""
+        You are a binary classifier. Classify every abstract below independently and follow these rules strictly.
+
+        Targets: {targets}
+        Exclusions: {exclusions}
+
+        Rules:
+        - If the abstract mainly talks about any Exclusions -> false.
+        - Else if it relates to any Targets -> true.
+        - If both appear -> false.
+        - If unclear/insufficient info/off-topic -> false.
+        - Return exactly one result per abstract ID, using the ID shown in brackets.
+
+        Abstracts:
+    """).format(
+        targets=", ".join(targets) if targets else "(none)",
+        exclusions=", ".join(exclusions) if exclusions else "(none)",
+    ).strip() + "\n\n"
+
+
+def profile_match_prefix(profiles: List[Dict]) -> str:
+    return textwrap.dedent("""
+        You are a multi-label classifier. Decide for every profile below, independently, whether the abstract matches it.
+
+        Profiles:
+        {profiles}
+
+        Rules, applied to each profile separately:
+        - If the abstract mainly talks about any of the profile's Exclusions -> no match.
+        - Else if it relates to any of the profile's Targets -> match.
+        - If both appear -> no match.
+        - If unclear/insufficient info/off-topic -> no match.
+        - Return the names of all matching profiles, or an empty list if none match.
+
+        Abstract:
+    """).format(
+        profiles="\n".join(
+            f"- {profile['name']}: Targets: {', '.join(_as_list(profile.get('interests'))) or '(none)'}; "
+            f"Exclusions: {', '.join(_as_list(profile.get('exclusions'))) or '(none)'}"
+            for profile in profiles
+        )
+    ).strip() + "\n"
+
+
+SUMMARY_PROMPTS = {
+    "message": textwrap.dedent("""\
+        You are an academic assistant. Summarize the user's uploaded paper using the fewest words possible. 
+        Output only the following template (exclude anything in brackets). Use 2-3 sentences per part, preserve key numbers, 
+        and avoid speculation, filler, or questions. No extra text before or after the template.
+        ❓ Problems: 
+          [1-2 sentences]
+
+        🛠️ Core Method: 
+          [2-3 sentences]
+
+        📈 Main Results/Impact: 
+          [1-2 sentences]
+
+        ⚠️ Limitation: 
+          [1-2 sentences]
+
+        DON'T ASK ANYTHING MORE. JUST RESPOND.
+        """).strip(),
+    "markdown": textwrap.dedent("""\
+        You are an academic assistant. Summarize the user's uploaded paper using the fewest words possible.
+        Output using the following template (exclude anything in brackets) in Markdown format (4 H2 titles).
+        Use 2-3 sentences per part, preserve key numbers, and avoid speculation or questions.
+        No extra text before or after the template.
+
+        ## ❓ Problems:
+        [1-2 sentences]
+
+        ## 🛠️ Core Method:
+        [2-3 sentences]
+
+        ## 📈 Main Results/Impact:
+        [1-2 sentences]
+
+        ## ⚠️ Limitations:
+        [1-2 sentences]
+    """).strip('\n'),
+}
+SUMMARY_USER_PROMPT = "Please summarize the following paper:"
+
+SUMMARY_TEMPLATES = ("message", "markdown")
+SUMMARY_SECTION_MARKERS = ("❓", "🛠️", "📈", "⚠️")
+
+
+def convert_summary(summary: str, template: str) -> str:
+    """Re-render a summary produced with the other template into 'message' or 'markdown' layout"""
+    lines = []
+    for line in summary.splitlines():
+        stripped = line.strip()
+        heading = stripped.lstrip("#").strip()
+        if heading.startswith(SUMMARY_SECTION_MARKERS):
+            lines.append(f"## {heading}" if template == "markdown" else heading)
+        elif template == "markdown" or not stripped:
+            lines.append(stripped)
+        else:
+            lines.append(f"  {stripped}")
+    return "\n".join(lines)
+
+
+def pack_abstract_batches(abstracts: Dict[str, str], token_budget: int = 8000, max_batch_size: int = 20) -> List[Dict[str, str]]:
+    """Greedily group abstracts into batches that fit the token budget, keeping input order"""
+    batches = []
+    current = {}
+    used = BATCH_CLASSIFIER_PROMPT_TOKENS
+    for abstract_id, abstract in abstracts.items():
+        cost = estimate_tokens(abstract) + BATCH_ITEM_OVERHEAD_TOKENS
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = {}
+            used = BATCH_CLASSIFIER_PROMPT_TOKENS
+        current[abstract_id] = abstract
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
 class OpenAIHelper:
-    def __init__(self, api_key: Optional[str] = None, api_base_url: Optional[str] = None, model: str = "gpt-5-nano", reasoning: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, api_base_url: Optional[str] = None, model: str = "gpt-5-nano", reasoning: Optional[str] = None, verdict_cache=None, client: Optional["OpenAI"] = None, role: str = "default", metrics=None, prompt_cache_keys: bool = True):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass api_key parameter")
         
-        if api_base_url:
-            self.client = OpenAI(api_key=self.api_key, base_url=api_base_url)
+        if client is not None:
+            # Long-lived client handed out by OpenAIClientRegistry
+            self.client = client
         else:
-            self.client = OpenAI(api_key=self.api_key)
+            # The SDK is slow to import, so it is only loaded when a client is actually built
+            from openai import OpenAI
+            if api_base_url:
+                self.client = OpenAI(api_key=self.api_key, base_url=api_base_url)
+            else:
+                self.client = OpenAI(api_key=self.api_key)
         self.reasoning = reasoning
         self.model = model
+        self.verdict_cache = verdict_cache
+        # Role name ("selector", "summarizer") under which stage timings and token usage are recorded
+        self.role = role
+        self.metrics = metrics or NULL_METRICS
+        # Some API-compatible endpoints reject the prompt_cache_key parameter
+        self.prompt_cache_keys = prompt_cache_keys
+
+    def _cache_routing(self, kind: str, prefix: str) -> Dict:
+        return {"prompt_cache_key": prompt_cache_key(self.role, kind, prefix)} if self.prompt_cache_keys else {}
+
+    def _create(self, stage: str, **kwargs):
+        """Call the Responses API, timing the call as stage and recording its token usage"""
+        with self.metrics.stage(stage):
+            response = self.client.responses.create(**kwargs)
+        self.metrics.record_usage(self.role, self.model, getattr(response, "usage", None))
+        return response
+
+    def _stream(self, stage: str, on_text: Callable[[str], None], **kwargs) -> str:
+        """Stream a Responses API call, passing the text so far to on_text after every delta; returns the full text
+
+        The time to the first text delta is recorded as <stage>_first_token.
+        """
+        text = ""
+        response = None
+        started = time.perf_counter()
+        with self.metrics.stage(stage):
+            stream = self.client.responses.create(stream=True, **kwargs)
+            try:
+                for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if not text:
+                            self.metrics.observe(f"{stage}_first_token", time.perf_counter() - started)
+                        text += event.delta
+                        on_text(text)
+                    elif event.type in ("response.completed", "response.incomplete"):
+                        response = event.response
+                    elif event.type == "response.failed":
+                        raise Exception(f"Response failed: {getattr(event.response, 'error', None)}")
+                    elif event.type == "error":
+                        raise Exception(f"Stream error: {event.message}")
+            finally:
+                stream.close()
+        self.metrics.record_usage(self.role, self.model, getattr(response, "usage", None))
+        return text or (response.output_text if response is not None else "")
+
+    def _verdict_key(self, abstract: str, target_subject: List[str], exclude_subject: List[str]) -> str:
+        return verdict_cache_key(abstract, _as_list(target_subject), _as_list(exclude_subject), self.model, self.reasoning)
 
     def analyze_subject_from_abstract(self, abstract: str, target_subject: List[str], exclude_subject: List[str]) -> bool:
         """Summarize given abstract and determine if it relates to the target subject"""
+        if self.verdict_cache is not None:
+            key = self._verdict_key(abstract, target_subject, exclude_subject)
+            cached = self.verdict_cache.get(key)
+            if cached is not None:
+                return cached
+            verdict = self._analyze_subject_from_abstract(abstract, target_subject, exclude_subject)
+            self.verdict_cache.set(key, verdict)
+            return verdict
+        return self._analyze_subject_from_abstract(abstract, target_subject, exclude_subject)
 
-        # Normalize inputs so None/strings won't crash join()
-        def _as_list(value):
-            if value is None:
-                return []
-            if isinstance(value, str):
-                return [value]
-            try:
-                return list(value)
-            except TypeError:
-                return [str(value)]
-
-        targets = _as_list(target_subject)
-        exclusions = _as_list(exclude_subject)
-
-        head = textwrap.dedent("""
-            You are a binary classifier. Follow these rules strictly and output only yes or no in lowercase.
-
-            Targets: {targets}
-            Exclusions: {exclusions}
-
-            Rules:
-            - If the abstract mainly talks about any Exclusions -> no.
-            - Else if it relates to any Targets -> yes.
-            - If both appear -> no.
-            - If unclear/insufficient info/off-topic -> no.
-            - No explanation, no quotes, only yes or no.
-
-            Abstract:
-        """).format(
-            targets=", ".join(targets) if targets else "(none)",
-            exclusions=", ".join(exclusions) if exclusions else "(none)",
-        ).strip()
-        prompt = f"{head}\n{abstract}\n\nAnswer:\n"
+    def classifier_request(self, abstract: str, target_subject: List[str], exclude_subject: List[str]) -> Dict:
+        """Responses API parameters that classify one abstract, shared by live calls and Batch API files"""
+        prefix = classifier_prefix(_as_list(target_subject), _as_list(exclude_subject))
+        prompt = f"{prefix}{abstract}\n\nAnswer:\n"
+        request = {
+            "model": self.model,
+            "input": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 1,
+            **self._cache_routing("classify", prefix),
+        }
+        if self.reasoning:
+            request["reasoning"] = {"effort": self.reasoning}
+        return request
+
+    @staticmethod
+    def parse_classifier_output(text: str) -> bool:
+        return (text or "").strip().lower() == 'yes'
+
+    def _analyze_subject_from_abstract(self, abstract: str, target_subject: List[str], exclude_subject: List[str]) -> bool:
         try:
-            if self.reasoning:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=1,
-                    reasoning={"effort": self.reasoning},
-                )
-                logger.debug(f"OpenAI response: {response}")
-                return response.output_text.lower() == 'yes'
-            else:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=1,
-                )
-                logger.debug(f"OpenAI response: {response}")
-                return response.output_text.lower() == 'yes'
+            response = self._create("classify", **self.classifier_request(abstract, target_subject, exclude_subject))
+            logger.debug(f"OpenAI response: {response}")
+            return self.parse_classifier_output(response.output_text)
         except Exception as e:
             logger.error(f"Error analyzing subject from abstract: {e}")
             raise Exception(f"Failed to analyze subject from abstract: {e}")
 
-    def summarize_paper_message(self, file) -> str:
-        """Summarize the paper uploaded"""
-        role_prompt = textwrap.dedent("""\
-                                      You are an academic assistant. Summarize the user's uploaded paper using the fewest words possible. 
-                                      Output only the following template (exclude anything in brackets). Use 2-3 sentences per part, preserve key numbers, 
-                                      and avoid speculation, filler, or questions. No extra text before or after the template.
-                                      ❓ Problems: 
-                                        [1-2 sentences]
+    def analyze_subjects_from_abstracts(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str], token_budget: int = 8000, max_batch_size: int = 20) -> Dict[str, bool]:
+        """Classify many abstracts with as few requests as the token budget allows, returns a verdict per ID"""
+        verdicts = {}
+        for batch in pack_abstract_batches(abstracts, token_budget, max_batch_size):
+            verdicts.update(self.classify_abstract_batch(batch, target_subject, exclude_subject))
+        return verdicts
 
-                                      🛠️ Core Method: 
-                                        [2-3 sentences]
+    def classify_abstract_batch(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str]) -> Dict[str, bool]:
+        """Classify a batch of abstracts in one request using structured output
 
-                                      📈 Main Results/Impact: 
-                                        [1-2 sentences]
+        IDs the model drops or mangles are retried with single-entry calls;
+        IDs that still fail are left out of the returned dict.
+        """
+        verdicts = {}
+        if self.verdict_cache is not None:
+            keys = {abstract_id: self._verdict_key(abstract, target_subject, exclude_subject) for abstract_id, abstract in abstracts.items()}
+            for abstract_id, key in keys.items():
+                cached = self.verdict_cache.get(key)
+                if cached is not None:
+                    verdicts[abstract_id] = cached
+            abstracts = {abstract_id: abstract for abstract_id, abstract in abstracts.items() if abstract_id not in verdicts}
+        if len(abstracts) <= 1:
+            verdicts.update(self._classify_individually(abstracts, target_subject, exclude_subject))
+            return verdicts
 
-                                      ⚠️ Limitation: 
-                                        [1-2 sentences]
+        # The model only sees short positional tags, which are much harder to mangle than caller IDs
+        tags = {str(i): abstract_id for i, abstract_id in enumerate(abstracts, 1)}
+        prefix = batch_classifier_prefix(_as_list(target_subject), _as_list(exclude_subject))
+        body = "\n\n".join(f"[ID {tag}]\n{abstracts[abstract_id]}" for tag, abstract_id in tags.items())
+        prompt = f"{prefix}{body}\n"
 
-                                      DON'T ASK ANYTHING MORE. JUST RESPOND.
-                                      """).strip()
-        user_prompt = f"Please summarize the following paper:"
         try:
-            if self.reasoning:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
-                        {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": role_prompt
-                                }
-                            ]
-                        },
+            kwargs = {"reasoning": {"effort": self.reasoning}} if self.reasoning else {}
+            response = self._create(
+                "classify_batch",
+                model=self.model,
+                input=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=1,
+                **self._cache_routing("classify_batch", prefix),
+                text={
+                    "format": {
+                        "type": "json_schema",
+                        "name": "abstract_classification",
+                        "schema": BATCH_CLASSIFIER_SCHEMA,
+                        "strict": True
+                    }
+                },
+                **kwargs,
+            )
+            logger.debug(f"OpenAI response: {response}")
+        except Exception as e:
+            logger.error(f"Error analyzing subjects from abstracts: {e}")
+            raise Exception(f"Failed to analyze subjects from abstracts: {e}")
+
+        batch_verdicts = {}
+        try:
+            results = json.loads(response.output_text).get("results", [])
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Could not parse batch classification output: {e}")
+            results = []
+        for result in results:
+            if not isinstance(result, dict):
+                continue
+            abstract_id = tags.get(str(result.get("id", "")).strip())
+            if abstract_id is not None and isinstance(result.get("relevant"), bool):
+                batch_verdicts[abstract_id] = result["relevant"]
+        if self.verdict_cache is not None:
+            for abstract_id, verdict in batch_verdicts.items():
+                self.verdict_cache.set(keys[abstract_id], verdict)
+        verdicts.update(batch_verdicts)
+
+        missing = {abstract_id: abstract for abstract_id, abstract in abstracts.items() if abstract_id not in batch_verdicts}
+        if missing:
+            logger.warning(f"Batch classification returned no usable verdict for {len(missing)} of {len(abstracts)} abstracts, retrying them individually.")
+            verdicts.update(self._classify_individually(missing, target_subject, exclude_subject))
+        return verdicts
+
+    def _classify_individually(self, abstracts: Dict[str, str], target_subject: List[str], exclude_subject: List[str]) -> Dict[str, bool]:
+        verdicts = {}
+        for abstract_id, abstract in abstracts.items():
+            try:
+                verdicts[abstract_id] = self.analyze_subject_from_abstract(abstract, target_subject, exclude_subject)
+            except Exception as e:
+                logger.error(f"Error classifying abstract {abstract_id}: {e}")
+        return verdicts
+
+    def match_profiles(self, abstract: str, profiles: List[Dict]) -> List[str]:
+        """Decide in one request which subscriber profiles an abstract is relevant to
+
+        profiles are dicts with a name, interests and exclusions; returns the
+        names of the matching ones (an empty list if none match).
+        """
+        if self.verdict_cache is not None:
+            key = profile_match_cache_key(abstract, profiles, self.model, self.reasoning)
+            cached = self.verdict_cache.get(key)
+            if cached is not None:
+                return cached
+            matches = self._match_profiles(abstract, profiles)
+            self.verdict_cache.set(key, matches)
+            return matches
+        return self._match_profiles(abstract, profiles)
+
+    def _match_profiles(self, abstract: str, profiles: List[Dict]) -> List[str]:
+        names = [profile['name'] for profile in profiles]
+        prefix = profile_match_prefix(profiles)
+        prompt = f"{prefix}{abstract}\n"
+
+        try:
+            kwargs = {"reasoning": {"effort": self.reasoning}} if self.reasoning else {}
+            response = self._create(
+                "classify_profiles",
+                model=self.model,
+                input=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=1,
+                **self._cache_routing("classify_profiles", prefix),
+                text={
+                    "format": {
+                        "type": "json_schema",
+                        "name": "profile_match",
+                        "schema": profile_match_schema(names),
+                        "strict": True
+                    }
+                },
+                **kwargs,
+            )
+            logger.debug(f"OpenAI response: {response}")
+            matches = json.loads(response.output_text).get("matches", [])
+        except Exception as e:
+            logger.error(f"Error matching abstract against profiles: {e}")
+            raise Exception(f"Failed to match abstract against profiles: {e}")
+        return [name for name in names if name in matches]
+
+    @staticmethod
+    def _paper_input(file: Optional[str], file_id: Optional[str], text: Optional[str] = None) -> Dict:
+        if text is not None:
+            return {"type": "input_text", "text": f"<paper>\n{text}\n</paper>"}
+        if file_id:
+            return {"type": "input_file", "file_id": file_id}
+        return {"type": "input_file", "file_url": file}
+
+    def upload_file(self, path: str, purpose: str = "user_data") -> str:
+        """Upload a local file through the Files API, returns the file ID"""
+        try:
+            with open(path, "rb") as f, self.metrics.stage("upload"):
+                uploaded = self.client.files.create(file=f, purpose=purpose)
+            logger.debug(f"Uploaded {path} as {uploaded.id}")
+            return uploaded.id
+        except Exception as e:
+            logger.error(f"Error uploading file: {e}")
+            raise Exception(f"Failed to upload file: {e}")
+
+    def summary_request(self, template: str, paper_input: Dict, reasoning: Optional[str] = None) -> Dict:
+        """Responses API parameters for a summary; the system prompt and instruction come before the paper"""
+        role_prompt = SUMMARY_PROMPTS[template]
+        request = {
+            "model": self.model,
+            "input": [
+                {
+                    "role": "system",
+                    "content": [
                         {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": user_prompt
-                                },
-                                {
-                                    "type": "input_file",
-                                    "file_url": file
-                                }
-                            ]
+                            "type": "input_text",
+                            "text": role_prompt
                         }
-                    ],
-                    temperature=1,
-                    reasoning={"effort": self.reasoning},
-                )
-                logger.debug(f"OpenAI response: {response}")
-                
-                return response.output_text
-            else:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
+                    ]
+                },
+                {
+                    "role": "user",
+                    "content": [
                         {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": role_prompt
-                                }
-                            ]
+                            "type": "input_text",
+                            "text": SUMMARY_USER_PROMPT
                         },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": user_prompt
-                                },
-                                {
-                                    "type": "input_file",
-                                    "file_url": file
-                                }
-                            ]
-                        }
-                    ],
-                    temperature=1,
-                )
-                logger.debug(f"OpenAI response: {response}")
+                        paper_input
+                    ]
+                }
+            ],
+            "temperature": 1,
+            **self._cache_routing(f"summarize_{template}", f"{role_prompt}\n{SUMMARY_USER_PROMPT}"),
+        }
+        if reasoning:
+            request["reasoning"] = {"effort": reasoning}
+        return request
+
+    def summarize_paper_message(self, file: Optional[str] = None, file_id: Optional[str] = None, text: Optional[str] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Summarize the paper uploaded, given by URL, by an uploaded file ID or as extracted text
 
-                return response.output_text
+        With on_text the response is streamed and on_text receives the summary so far after every delta.
+        """
+        try:
+            request = self.summary_request("message", self._paper_input(file, file_id, text), self.reasoning)
+            if on_text is not None:
+                return self._stream("summarize", on_text, **request)
+            response = self._create("summarize", **request)
+            logger.debug(f"OpenAI response: {response}")
+            return response.output_text
         except Exception as e:
             logger.error(f"Error summarizing paper: {e}")
             raise Exception(f"Failed to summarize paper: {e}")
-        
-    def summarize_paper_markdown(self, file) -> str:
-        """Summarize the paper uploaded in Markdown format"""
-        role_prompt = textwrap.dedent("""\
-            You are an academic assistant. Summarize the user's uploaded paper using the fewest words possible.
-            Output using the following template (exclude anything in brackets) in Markdown format (4 H2 titles).
-            Use 2-3 sentences per part, preserve key numbers, and avoid speculation or questions.
-            No extra text before or after the template.
-
-            ## ❓ Problems:
-            [1-2 sentences]
-
-            ## 🛠️ Core Method:
-            [2-3 sentences]
-
-            ## 📈 Main Results/Impact:
-            [1-2 sentences]
-
-            ## ⚠️ Limitations:
-            [1-2 sentences]
-        """).strip('\n')
-        user_prompt = f"Please summarize the following paper:"
-        try:
-            if self.reasoning:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
-                        {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": role_prompt
-                                }
-                            ]
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": user_prompt
-                                },
-                                {
-                                    "type": "input_file",
-                                    "file_url": file
-                                }
-                            ]
-                        }
-                    ],
-                    temperature=1,
-                    reasoning={"effort": "low"},
-                )
-                logger.debug(f"OpenAI response: {response}")
 
-                return response.output_text
-            else:
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[
-                        {
-                            "role": "system",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": role_prompt
-                                }
-                            ]
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "input_text",
-                                    "text": user_prompt
-                                },
-                                {
-                                    "type": "input_file",
-                                    "file_url": file
-                                }
-                            ]
-                        }
-                    ],
-                    temperature=1,
-                )
-                logger.debug(f"OpenAI response: {response}")
+    def summarize_paper_markdown(self, file: Optional[str] = None, file_id: Optional[str] = None, text: Optional[str] = None, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Summarize the paper uploaded in Markdown format, given by URL, by an uploaded file ID or as extracted text
 
-                return response.output_text
+        on_text streams the response as in summarize_paper_message.
+        """
+        try:
+            request = self.summary_request("markdown", self._paper_input(file, file_id, text), "low" if self.reasoning else None)
+            if on_text is not None:
+                return self._stream("summarize", on_text, **request)
+            response = self._create("summarize", **request)
+            logger.debug(f"OpenAI response: {response}")
+            return response.output_text
         except Exception as e:
             logger.error(f"Error summarizing paper: {e}")
             raise Exception(f"Failed to summarize paper: {e}")
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+import requests
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+from .openai_helper import estimate_tokens
+
+logger = MyLogger("PDFHelper")
+
+# Headings after which a paper is references, acknowledgements or appendices
+BACK_MATTER_PATTERN = re.compile(
+    r"^\s*(?:[0-9]+\.?|[A-Z]\.?)?\s*(references|bibliography|acknowledg(?:e)?ments?|appendix|appendices|supplementary material)\b[^\n]{0,40}$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+class DownloadedFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+class ExtractedText(NamedTuple):
+    text: str
+    full_tokens: int
+    sent_tokens: int
+    pages: int
+
+
+def extract_pdf_pages(path: str) -> List[str]:
+    """Extract the text of every page; runs in a worker process"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise Exception("Local PDF text extraction requires the 'pypdf' package (pip install pypdf)")
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def strip_back_matter(text: str, min_position: float = 0.3) -> str:
+    """Cut the text at the first references/appendix heading found after min_position of the document"""
+    start = int(len(text) * min_position)
+    match = BACK_MATTER_PATTERN.search(text, start)
+    return text[:match.start()].rstrip() if match else text
+
+
+def trim_to_token_budget(text: str, token_budget: int) -> str:
+    """Keep the beginning of the text within token_budget, cutting at a paragraph or line boundary"""
+    max_chars = token_budget * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip()
+
+
+class PDFHelper:
+    """Streams paper PDFs to temporary files without buffering them in memory"""
+
+    def __init__(self, http=None, chunk_size: int = 1024 * 1024, max_bytes: Optional[int] = None, temp_dir: Optional[str] = None, upload_cache=None, workers: int = 2, metrics=None):
+        # Shared transport (HTTPHelper); falls back to one-off requests calls
+        self.http = http or requests
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.temp_dir = temp_dir
+        # Maps URLs and content hashes to uploaded file IDs (e.g. TieredCache)
+        self.upload_cache = upload_cache
+        # Text extraction is CPU bound, so it runs in worker processes instead of threads
+        self.workers = workers
+        self.executor = None
+        self.metrics = metrics or NULL_METRICS
+        self.lock = threading.Lock()
+        self.extracted = {'papers': 0, 'full_tokens': 0, 'sent_tokens': 0}
+
+    def download(self, url: str, timeout: float = 60) -> DownloadedFile:
+        """Stream url to a temporary file in chunk_size pieces, hashing it on the way
+
+        The caller owns the returned file and should remove it with cleanup().
+        """
+        handle, path = tempfile.mkstemp(suffix=".pdf", dir=self.temp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(handle, "wb") as output, self.metrics.stage("pdf_download"):
+                response = self.http.get(url, stream=True, timeout=timeout)
+                try:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if not chunk:
+                            continue
+                        size += len(chunk)
+                        if self.max_bytes and size > self.max_bytes:
+                            raise Exception(f"PDF exceeds the {self.max_bytes / (1000 * 1000):.0f} M download limit")
+                        digest.update(chunk)
+                        output.write(chunk)
+                finally:
+                    response.close()
+        except Exception as e:
+            self.cleanup(path)
+            logger.error(f"Failed to download PDF from {url}: {e}")
+            raise Exception(f"Failed to download PDF: {e}")
+
+        logger.debug(f"Downloaded {size} bytes from {url} to {path}")
+        return DownloadedFile(path=path, sha256=digest.hexdigest(), size=size)
+
+    @staticmethod
+    def cleanup(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def upload(self, url: str, uploader) -> str:
+        """Download url and hand the file to uploader (path -> file ID), never uploading the same content twice
+
+        With an upload cache, a known URL skips the download entirely and
+        identical content under a new URL reuses the earlier file ID.
+        """
+        cache = self.upload_cache
+        if cache is not None:
+            file_id = cache.get(f"url:{url}")
+            if file_id:
+                logger.info(f"Reusing uploaded file {file_id} for {url}")
+                return file_id
+
+        downloaded = self.download(url)
+        try:
+            file_id = cache.get(f"sha256:{downloaded.sha256}") if cache is not None else None
+            if file_id:
+                logger.info(f"Reusing uploaded file {file_id} with identical content for {url}")
+            else:
+                logger.info(f"Uploading {downloaded.size / (1000 * 1000):.2f} M PDF from {url}")
+                file_id = uploader(downloaded.path)
+                if cache is not None:
+                    cache.set(f"sha256:{downloaded.sha256}", file_id)
+            if cache is not None:
+                cache.set(f"url:{url}", file_id)
+            return file_id
+        finally:
+            self.cleanup(downloaded.path)
+
+    def extract_text(self, path: str) -> List[str]:
+        """Extract page texts in the worker process pool"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        with self.metrics.stage("pdf_extract"):
+            return self.executor.submit(extract_pdf_pages, path).result()
+
+    def prepare_text(self, url: str, token_budget: int, drop_back_matter: bool = True) -> ExtractedText:
+        """Download a PDF and return its text without back matter, trimmed to token_budget"""
+        downloaded = self.download(url)
+        try:
+            pages = self.extract_text(downloaded.path)
+        finally:
+            self.cleanup(downloaded.path)
+
+        full_text = "\n\n".join(page.strip() for page in pages)
+        text = strip_back_matter(full_text) if drop_back_matter else full_text
+        text = trim_to_token_budget(text, token_budget)
+        extracted = ExtractedText(text=text, full_tokens=estimate_tokens(full_text), sent_tokens=estimate_tokens(text), pages=len(pages))
+        with self.lock:
+            self.extracted['papers'] += 1
+            self.extracted['full_tokens'] += extracted.full_tokens
+            self.extracted['sent_tokens'] += extracted.sent_tokens
+        return extracted
+
+    def text_stats(self) -> Dict[str, int]:
+        """Papers extracted so far with their full and sent token estimates"""
+        with self.lock:
+            return dict(self.extracted)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.upload_cache is not None:
+            self.upload_cache.close()
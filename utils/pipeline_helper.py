@@ -0,0 +1,167 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+
+logger = MyLogger("Pipeline")
+
+# Marks an item a stage dropped, so ordered pipelines can still release the items after it
+_DROPPED = object()
+_STOP = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    # Returns the item for the next stage, or None to drop it
+    func: Callable[[Any], Any]
+    workers: int = 1
+    # Capacity of the queue feeding this stage; a full queue blocks the stage before it
+    queue_size: int = 16
+
+
+class Pipeline:
+    """Runs items through stages, each on its own threads, connected by bounded queues
+
+    A slow stage only fills its own input queue, so earlier stages keep working
+    until that queue is full and then wait (backpressure). With ordered=True
+    the last stage receives items in input order: items finished early wait in
+    a reorder buffer and the last stage runs on a single thread.
+
+    Stage functions handle their own per-item errors; an exception escaping one
+    stops every stage and is raised from run().
+    """
+
+    def __init__(self, stages: List[Stage], ordered: bool = False, metrics=None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        if ordered and stages[-1].workers != 1:
+            stages = stages[:-1] + [stages[-1]._replace(workers=1)]
+        self.stages = stages
+        self.ordered = ordered
+        self.metrics = metrics or NULL_METRICS
+
+    def run(self, items: Iterable[Any]) -> List[Dict]:
+        """Feed items through every stage and wait until all are done, returns per-stage stats"""
+        stages = self.stages
+        queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in stages]
+        stats = [{'stage': stage.name, 'workers': stage.workers, 'queue_size': stage.queue_size, 'items': 0, 'dropped': 0, 'busy_seconds': 0.0, 'max_queue_depth': 0} for stage in stages]
+        live_workers = [stage.workers for stage in stages]
+        stop = threading.Event()
+        errors = []
+        lock = threading.Lock()
+        order_lock = threading.Lock()
+        reorder_buffer = {}
+        next_sequence = [0]
+
+        def put(index, envelope):
+            while not stop.is_set():
+                try:
+                    queues[index].put(envelope, timeout=0.1)
+                except queue.Full:
+                    continue
+                depth = queues[index].qsize()
+                with lock:
+                    stats[index]['max_queue_depth'] = max(stats[index]['max_queue_depth'], depth)
+                self.metrics.gauge("pipeline_queue_depth", depth, stage=stages[index].name)
+                return
+
+        def emit(index, sequence, value):
+            """Hand an item (or _DROPPED) to stage index; past the last stage it is done"""
+            if index == len(stages):
+                return
+            if self.ordered and index == len(stages) - 1:
+                with order_lock:
+                    reorder_buffer[sequence] = value
+                    while next_sequence[0] in reorder_buffer:
+                        ready = reorder_buffer.pop(next_sequence[0])
+                        if ready is not _DROPPED:
+                            put(index, (next_sequence[0], ready))
+                        next_sequence[0] += 1
+                return
+            if value is _DROPPED:
+                if self.ordered:
+                    emit(len(stages) - 1, sequence, _DROPPED)
+                return
+            put(index, (sequence, value))
+
+        def work(index):
+            stage = stages[index]
+            while True:
+                try:
+                    envelope = queues[index].get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if envelope is _STOP:
+                    break
+                self.metrics.gauge("pipeline_queue_depth", queues[index].qsize(), stage=stage.name)
+                sequence, value = envelope
+                started = time.perf_counter()
+                try:
+                    result = stage.func(value)
+                except BaseException as e:
+                    with lock:
+                        errors.append(e)
+                    stop.set()
+                    break
+                with lock:
+                    stats[index]['items'] += 1
+                    stats[index]['busy_seconds'] += time.perf_counter() - started
+                    if result is None:
+                        stats[index]['dropped'] += 1
+                emit(index + 1, sequence, _DROPPED if result is None else result)
+            with lock:
+                live_workers[index] -= 1
+                last = live_workers[index] == 0
+            # The last worker out tells the next stage that no more items are coming
+            if last and index + 1 < len(stages):
+                for _ in range(stages[index + 1].workers):
+                    put(index + 1, _STOP)
+
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(stages) for n in range(stage.workers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for sequence, item in enumerate(items):
+                if stop.is_set():
+                    break
+                emit(0, sequence, item)
+            for _ in range(stages[0].workers):
+                put(0, _STOP)
+            for thread in threads:
+                # Short joins keep the main thread responsive to signals
+                while thread.is_alive():
+                    thread.join(0.1)
+        except BaseException:
+            stop.set()
+            raise
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - started
+        for stage_stats in stats:
+            stage_stats['utilization'] = stage_stats['busy_seconds'] / (stage_stats['workers'] * elapsed) if elapsed else 0.0
+            self.metrics.increment("pipeline_items", stage_stats['items'], stage=stage_stats['stage'])
+            self.metrics.gauge("pipeline_utilization", round(stage_stats['utilization'], 4), stage=stage_stats['stage'])
+            self.metrics.gauge("pipeline_queue_depth_max", stage_stats['max_queue_depth'], stage=stage_stats['stage'])
+        return stats
+
+
+if __name__ == "__main__":
+    import random
+
+    # Example usage: a fast stage feeding a slow one, delivered in input order
+    pipeline = Pipeline([
+        Stage("double", lambda x: x * 2, workers=2),
+        Stage("slow", lambda x: time.sleep(random.random() / 100) or x if x % 3 else None, workers=4, queue_size=4),
+        Stage("print", print),
+    ], ordered=True)
+    for stage in pipeline.run(range(20)):
+        print(stage)
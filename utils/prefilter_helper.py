@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from .logger import MyLogger
+
+logger = MyLogger("PrefilterHelper")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "we", "with", "our", "these", "which"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with plural 's' stripped"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class PrefilterHelper:
+    """In-process BM25 pre-filter that drops entries obviously unrelated to the interests"""
+
+    def __init__(
+        self,
+        interests: List[str],
+        exclusions: Optional[List[str]] = None,
+        threshold: Optional[float] = None,
+        top_k: Optional[int] = None,
+        exclusion_weight: float = 1.0,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.interests = [tokenize(interest) for interest in interests or []]
+        self.exclusions = [tokenize(exclusion) for exclusion in exclusions or []]
+        self.threshold = threshold
+        self.top_k = top_k
+        self.exclusion_weight = exclusion_weight
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def _entry_text(entry: Dict) -> str:
+        return " ".join([entry.get('title', ''), entry.get('content', ''), " ".join(entry.get('tags', []))])
+
+    def _build_index(self, entries: List[Dict]):
+        """Build the inverted index (term -> {entry index: term frequency}) for this run"""
+        postings = {}
+        lengths = []
+        for index, entry in enumerate(entries):
+            tokens = tokenize(self._entry_text(entry))
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, {})[index] = frequency
+        average_length = sum(lengths) / len(lengths) if lengths else 0
+        return postings, lengths, average_length
+
+    def _bm25(self, query: List[str], postings, lengths, average_length) -> Dict[int, float]:
+        scores = {}
+        count = len(lengths)
+        for term in set(query):
+            matches = postings.get(term)
+            if not matches:
+                continue
+            idf = math.log(1 + (count - len(matches) + 0.5) / (len(matches) + 0.5))
+            for index, frequency in matches.items():
+                norm = 1 - self.b + self.b * lengths[index] / average_length if average_length else 1
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+        return scores
+
+    def score_entries(self, entries: List[Dict]) -> List[float]:
+        """Score entries by their best-matching interest minus their best-matching exclusion"""
+        postings, lengths, average_length = self._build_index(entries)
+        interest_scores = [0.0] * len(entries)
+        exclusion_scores = [0.0] * len(entries)
+        for query in self.interests:
+            for index, score in self._bm25(query, postings, lengths, average_length).items():
+                interest_scores[index] = max(interest_scores[index], score)
+        for query in self.exclusions:
+            for index, score in self._bm25(query, postings, lengths, average_length).items():
+                exclusion_scores[index] = max(exclusion_scores[index], score)
+        return [interest - self.exclusion_weight * exclusion for interest, exclusion in zip(interest_scores, exclusion_scores)]
+
+    def select(self, scores: List[float]) -> List[bool]:
+        """Return a keep mask: entries at or above the threshold, limited to the top-K scores"""
+        keep = [self.threshold is None or score >= self.threshold for score in scores]
+        if self.top_k is not None:
+            ranked = sorted((index for index, kept in enumerate(keep) if kept), key=lambda index: -scores[index])
+            allowed = set(ranked[:self.top_k])
+            keep = [index in allowed for index in range(len(scores))]
+        return keep
+
+    def recall_report(self, entries: List[Dict], scores: List[float], keep: List[bool], verdicts: List[Optional[bool]]) -> str:
+        """Describe what the pre-filter would have dropped, given the classifier verdicts for every entry"""
+        dropped = [index for index, kept in enumerate(keep) if not kept]
+        relevant = [index for index, verdict in enumerate(verdicts) if verdict]
+        missed = [index for index in dropped if verdicts[index]]
+
+        lines = [f"Pre-filter would drop {len(dropped)} of {len(entries)} entries (threshold={self.threshold}, top_k={self.top_k})."]
+        if relevant:
+            recall = 1 - len(missed) / len(relevant)
+            lines.append(f"Recall against the classifier: {recall:.1%} ({len(relevant) - len(missed)} of {len(relevant)} relevant entries kept).")
+            lines.append(f"Lowest score among relevant entries: {min(scores[index] for index in relevant):.3f}")
+        for index in sorted(dropped, key=lambda index: -scores[index]):
+            marker = "MISSED" if verdicts[index] else "dropped"
+            lines.append(f"  [{marker}] {scores[index]:7.3f}  {entries[index].get('title', '')}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Example usage
+    sample_entries = [
+        {'title': 'Speculative decoding for faster LLM inference', 'content': 'We reduce latency of large language model inference.', 'tags': ['cs.CL']},
+        {'title': 'Robot grasping with LLM planners', 'content': 'Robots use language models to plan grasps.', 'tags': ['cs.RO']},
+        {'title': 'Image segmentation benchmark', 'content': 'A new dataset for semantic segmentation.', 'tags': ['cs.CV']},
+    ]
+    prefilter = PrefilterHelper(["LLM Inference"], ["Robots"], threshold=0.1)
+    scores = prefilter.score_entries(sample_entries)
+    keep = prefilter.select(scores)
+    print(prefilter.recall_report(sample_entries, scores, keep, [True, False, False]))
@@ -1,26 +1,185 @@
-import feedparser
-import requests
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Union
 from datetime import datetime
-import html2text
+from concurrent.futures import ThreadPoolExecutor
+import re
+import threading
+import time
+from .metrics_helper import NULL_METRICS
+
+# feedparser, html2text and requests are imported on first use to keep CLI start-up fast
+if TYPE_CHECKING:
+    import feedparser
+    import html2text
+
+# New-style (2504.17728v1) and old-style (math.GT/0309136v2) arXiv identifiers
+ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5}|[a-z][a-z\-]*(?:\.[A-Z]{2})?/\d{7})(v\d+)?')
+
+
+def normalize_arxiv_id(text: str) -> Optional[str]:
+    """Extract a normalized arXiv ID (with version if present) from an ID or URL"""
+    if not text or 'arxiv' not in text.lower():
+        return None
+    match = ARXIV_ID_PATTERN.search(text)
+    if not match:
+        return None
+    return match.group(1) + (match.group(2) or '')
+
+
+def entry_key(entry: Dict) -> str:
+    """Stable key identifying an entry across runs, preferring the versioned arXiv ID"""
+    for field in ('id', 'link'):
+        arxiv_id = normalize_arxiv_id(entry.get(field, ''))
+        if arxiv_id:
+            return f"arxiv:{arxiv_id}"
+    return entry.get('id') or entry.get('link') or entry.get('title', '')
+
+
+def canonical_entry_id(entry: Dict) -> str:
+    """Identity used to de-duplicate the same paper across feeds (arXiv ID without version, else the link)"""
+    for field in ('id', 'link'):
+        arxiv_id = normalize_arxiv_id(entry.get(field, ''))
+        if arxiv_id:
+            return "arxiv:" + re.sub(r'v\d+$', '', arxiv_id)
+    link = entry.get('link', '')
+    if link:
+        return re.sub(r'^https?://(www\.)?', '', link.split('#')[0]).rstrip('/')
+    return entry.get('id') or entry.get('title', '')
+
+
+class FeedEntry:
+    """Compact feed entry whose content is converted from HTML only when first read
+
+    Supports the dict-style access (entry['title'], entry.get(...)) used by
+    the rest of the pipeline.
+    """
+
+    FIELDS = ('id', 'title', 'link', 'description', 'published', 'author', 'tags', 'announce_type', 'feeds', 'content')
+    __slots__ = ('id', 'title', 'link', 'description', 'published', 'author', 'tags', 'announce_type', 'feeds',
+                 '_raw_content', '_content', '_converter')
+
+    def __init__(self, id: str = '', title: str = 'No Title', link: str = '', description: str = '', published: str = '',
+                 author: str = '', tags: Optional[List[str]] = None, announce_type: str = '', feeds: Optional[List[str]] = None,
+                 raw_content: str = '', content: Optional[str] = None, converter: Optional[Callable[[str], str]] = None):
+        self.id = id
+        self.title = title
+        self.link = link
+        self.description = description
+        self.published = published
+        self.author = author
+        self.tags = tags or []
+        self.announce_type = announce_type
+        self.feeds = feeds
+        self._raw_content = raw_content
+        self._content = content
+        self._converter = converter
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = self._converter(self._raw_content).strip() if self._converter else self._raw_content
+            self._raw_content = None
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        self._content = value
+        self._raw_content = None
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default=None):
+        if key not in self.FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self.FIELDS if key != 'feeds' or self.feeds is not None}
+
+    def to_record(self) -> Dict:
+        """Serializable form that keeps unconverted content raw, for persisting parsed entries"""
+        record = {key: getattr(self, key) for key in self.FIELDS if key not in ('content', 'feeds')}
+        if self._content is None:
+            record['raw_content'] = self._raw_content
+        else:
+            record['content'] = self._content
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict, converter: Optional[Callable[[str], str]] = None) -> 'FeedEntry':
+        return cls(converter=converter, **{key: value for key, value in record.items() if key != 'feeds'})
+
+    def __repr__(self):
+        return f"FeedEntry(id={self.id!r}, title={self.title!r})"
 
 
 class RSSFeedHelper:
-    def __init__(self):
-        self.h = html2text.HTML2Text()
-        self.h.ignore_links = False
-        self.h.ignore_images = True
+    def __init__(self, cache=None, http=None, metrics=None):
+        # HTML2Text keeps parsing state on the instance, so each fetching thread gets its own
+        self._local = threading.local()
+        # Optional persistent cache (e.g. SQLiteCache) holding validators and the last parsed entries per URL
+        self.cache = cache
+        # Shared transport (HTTPHelper); falls back to one-off requests calls
+        if http is None:
+            import requests
+            http = requests
+        self.http = http
+        # Records the fetch and parse stages (Metrics); a no-op when disabled
+        self.metrics = metrics or NULL_METRICS
+
+
+    @property
+    def h(self) -> "html2text.HTML2Text":
+        if not hasattr(self._local, 'h'):
+            import html2text
+            self._local.h = html2text.HTML2Text()
+            self._local.h.ignore_links = False
+            self._local.h.ignore_images = True
+        return self._local.h
         
-    def fetch_feed(self, url: str) -> feedparser.FeedParserDict:
-        """Fetch and parse RSS feed from URL"""
+    def fetch_feed(self, url: str, etag: Optional[str] = None, modified: Optional[str] = None, timeout: float = 10) -> "feedparser.FeedParserDict":
+        """Fetch and parse RSS feed from URL
+
+        With etag/modified a conditional GET is made; like feedparser's own
+        fetcher, an unchanged feed comes back with status 304 and no entries.
+        """
+        import feedparser
+        import requests
+        headers = {"Accept-Encoding": "gzip, deflate"}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
         try:
-            response = requests.get(url, timeout=10)
+            with self.metrics.stage("fetch"):
+                response = self.http.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304:
+                return feedparser.FeedParserDict(status=304, etag=etag, modified=modified, feed=feedparser.FeedParserDict(), entries=[], bozo=False)
             response.raise_for_status()
-            return feedparser.parse(response.content)
         except requests.RequestException as e:
             raise Exception(f"Failed to fetch RSS feed: {e}")
+        with self.metrics.stage("parse"):
+            feed = feedparser.parse(response.content)
+        feed['status'] = response.status_code
+        feed['etag'] = response.headers.get("ETag")
+        feed['modified'] = response.headers.get("Last-Modified")
+        return feed
     
-    def parse_feed(self, feed: feedparser.FeedParserDict) -> Dict:
+    def parse_feed(self, feed: "feedparser.FeedParserDict") -> Dict:
         """Parse feed data and extract metadata"""
         return {
             'title': getattr(feed.feed, 'title', 'Unknown'),
@@ -30,52 +189,138 @@ class RSSFeedHelper:
             'entries_count': len(feed.entries)
         }
     
-    def get_entries(self, feed: feedparser.FeedParserDict, limit: Optional[int] = None) -> List[Dict]:
+    def get_entries(self, feed: "feedparser.FeedParserDict", limit: Optional[int] = None) -> List[Dict]:
         """Extract entries from RSS feed"""
-        entries = []
-        feed_entries = feed.entries[:limit] if limit else feed.entries
-        
-        for entry in feed_entries:
-            entry_data = {
-                'title': getattr(entry, 'title', 'No Title'),
-                'link': getattr(entry, 'link', ''),
-                'description': getattr(entry, 'description', ''),
-                'published': getattr(entry, 'published', ''),
-                'author': getattr(entry, 'author', ''),
-                'tags': [tag.term for tag in getattr(entry, 'tags', [])],
-                'content': self._extract_content(entry)
-            }
-            entries.append(entry_data)
-        
-        return entries
-    
-    def _extract_content(self, entry) -> str:
-        """Extract and clean content from entry"""
-        content = ''
-        
+        return [entry.to_dict() for entry in self.iter_entries(feed, limit)]
+
+    def iter_entries(self, feed: "feedparser.FeedParserDict", limit: Optional[int] = None) -> Iterator[FeedEntry]:
+        """Lazily yield compact entries; HTML content is converted only when an entry's content is read"""
+        for index, entry in enumerate(feed.entries):
+            if limit and index >= limit:
+                return
+            yield FeedEntry(
+                id=getattr(entry, 'id', ''),
+                title=getattr(entry, 'title', 'No Title'),
+                link=getattr(entry, 'link', ''),
+                description=getattr(entry, 'description', ''),
+                published=getattr(entry, 'published', ''),
+                author=getattr(entry, 'author', ''),
+                tags=[tag.term for tag in getattr(entry, 'tags', [])],
+                announce_type=getattr(entry, 'arxiv_announce_type', ''),
+                raw_content=self._raw_content(entry),
+                converter=self.convert_html
+            )
+
+    def _raw_content(self, entry) -> str:
+        """Pick the richest HTML content field of an entry"""
         if hasattr(entry, 'content') and entry.content:
-            content = entry.content[0].value
+            return entry.content[0].value
         elif hasattr(entry, 'summary') and entry.summary:
-            content = entry.summary
+            return entry.summary
         elif hasattr(entry, 'description') and entry.description:
-            content = entry.description
-        
-        return self.h.handle(content).strip()
+            return entry.description
+        return ''
+
+    def convert_html(self, content: str) -> str:
+        """Convert an entry's HTML content to Markdown, the converter FeedEntry.from_record expects"""
+        return self.h.handle(content)
+
+    def _extract_content(self, entry) -> str:
+        """Extract and clean content from entry"""
+        return self.convert_html(self._raw_content(entry)).strip()
     
-    def process_feed(self, url: str, limit: Optional[int] = None) -> Dict:
-        """Complete RSS processing pipeline"""
-        feed = self.fetch_feed(url)
+    def process_feed(self, url: str, limit: Optional[int] = None, timeout: float = 10) -> Dict:
+        """Complete RSS processing pipeline
+
+        When a cache is configured and the server reports the feed unchanged,
+        the persisted entries are returned with 'not_modified' set.
+        """
+        cached = self.cache.get(url) if self.cache is not None else None
+        cached = cached['value'] if cached else None
+        if cached:
+            feed = self.fetch_feed(url, etag=cached.get('etag'), modified=cached.get('modified'), timeout=timeout)
+        else:
+            feed = self.fetch_feed(url, timeout=timeout)
+
+        if feed.get('status') == 304 and cached:
+            return {
+                'feed_info': cached['feed_info'],
+                'entries': [FeedEntry.from_record(record, self.convert_html) for record in cached['entries']],
+                'fetched_at': datetime.now().isoformat(),
+                'not_modified': True
+            }
         
         if feed.bozo and feed.bozo_exception:
             raise Exception(f"Invalid RSS feed: {feed.bozo_exception}")
         
         feed_info = self.parse_feed(feed)
-        entries = self.get_entries(feed, limit)
+        entries = list(self.iter_entries(feed, limit))
+
+        if self.cache is not None and (feed.get('etag') or feed.get('modified')):
+            self.cache.set(url, {
+                'etag': feed.get('etag'),
+                'modified': feed.get('modified'),
+                'feed_info': feed_info,
+                'entries': [entry.to_record() for entry in entries]
+            })
         
         return {
             'feed_info': feed_info,
             'entries': entries,
-            'fetched_at': datetime.now().isoformat()
+            'fetched_at': datetime.now().isoformat(),
+            'not_modified': False
+        }
+
+    def process_feeds(self, feeds: List[Union[str, Dict]], limit: Optional[int] = None, max_workers: int = 4) -> Dict:
+        """Fetch several feeds concurrently and merge their entries into one de-duplicated stream
+
+        Each feed is a URL or a dict with 'feed_url' and optional 'name' and 'timeout'.
+        A failing feed is reported in its stats without affecting the others, and
+        unchanged (304) feeds contribute the entries persisted at their last change,
+        so entries that failed last time can be retried.
+        """
+        feeds = [{'feed_url': feed} if isinstance(feed, str) else feed for feed in feeds]
+
+        def fetch(feed):
+            started = time.monotonic()
+            try:
+                result = self.process_feed(feed['feed_url'], limit, timeout=feed.get('timeout', 10))
+                return result, None, time.monotonic() - started
+            except Exception as e:
+                return None, e, time.monotonic() - started
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feeds)))) as executor:
+            outcomes = list(executor.map(fetch, feeds))
+
+        merged = []
+        seen = {}
+        stats = []
+        for feed, (result, error, elapsed) in zip(feeds, outcomes):
+            name = feed.get('name') or feed['feed_url']
+            stat = {'name': name, 'url': feed['feed_url'], 'elapsed': elapsed, 'error': str(error) if error else None,
+                    'not_modified': bool(result and result['not_modified']), 'entries': 0, 'new': 0, 'duplicates': 0}
+            stats.append(stat)
+            if result is None:
+                continue
+            stat['title'] = result['feed_info'].get('title', '')
+            stat['entries'] = len(result['entries'])
+            for entry in result['entries']:
+                canonical_id = canonical_entry_id(entry)
+                if canonical_id in seen:
+                    stat['duplicates'] += 1
+                    seen[canonical_id]['feeds'].append(name)
+                    continue
+                entry['feeds'] = [name]
+                seen[canonical_id] = entry
+                merged.append(entry)
+                stat['new'] += 1
+
+        reachable = [stat for stat in stats if not stat['error']]
+        return {
+            'feeds': stats,
+            'entries': merged,
+            'fetched_at': datetime.now().isoformat(),
+            'not_modified': bool(reachable) and all(stat['not_modified'] for stat in reachable)
         }
 
 
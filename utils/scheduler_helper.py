@@ -0,0 +1,87 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional
+from .logger import MyLogger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = MyLogger("Scheduler")
+
+
+class RunLock:
+    """Exclusive lock file that keeps two runs (cron or daemon) from overlapping"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.handle = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; returns False if another process holds it"""
+        self.handle = open(self.path, "a+")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.handle.close()
+            self.handle = None
+            return False
+        self.handle.seek(0)
+        self.handle.truncate()
+        self.handle.write(str(os.getpid()))
+        self.handle.flush()
+        return True
+
+    def release(self):
+        if self.handle is not None:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+class FeedScheduler:
+    """Tracks when each feed is due, polling it every interval plus random jitter
+
+    Feeds may set their own interval_minutes; the others use default_interval.
+    A cycle that overruns an interval does not cause a burst of catch-up polls:
+    the next poll is scheduled from the moment the feed was last polled.
+    """
+
+    def __init__(self, feeds: List[Dict], default_interval: float = 1800, jitter: float = 60):
+        self.feeds = feeds
+        self.default_interval = default_interval
+        self.jitter = jitter
+        # Every feed is due right away on start-up
+        now = time.monotonic()
+        self.next_poll = {self._name(feed): now for feed in feeds}
+
+    @staticmethod
+    def _name(feed: Dict) -> str:
+        return feed.get('name') or feed['feed_url']
+
+    def interval(self, feed: Dict) -> float:
+        minutes = feed.get('interval_minutes')
+        return minutes * 60 if minutes else self.default_interval
+
+    def due(self, now: Optional[float] = None) -> List[Dict]:
+        now = time.monotonic() if now is None else now
+        return [feed for feed in self.feeds if self.next_poll[self._name(feed)] <= now]
+
+    def mark_polled(self, feeds: List[Dict], now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for feed in feeds:
+            delay = self.interval(feed) + random.uniform(0, self.jitter)
+            self.next_poll[self._name(feed)] = now + delay
+            logger.debug(f"Next poll of {self._name(feed)} in {delay:.0f}s")
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self.next_poll.values()) - now) if self.next_poll else self.default_interval
@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from .logger import MyLogger
+
+logger = MyLogger("EntryStoreHelper")
+
+
+class EntryStoreHelper:
+    """Persistent record of entries already classified, summarized or delivered"""
+
+    # SQLite limits the number of host parameters per statement
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, path: str, retention_days: Optional[float] = 30):
+        if not path:
+            raise ValueError("Store path is required")
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created store directory: {directory}")
+
+        self.path = path
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    entry_key TEXT PRIMARY KEY,
+                    title TEXT,
+                    is_relevant INTEGER,
+                    summary TEXT,
+                    delivered INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_updated_at ON entries(updated_at)")
+            # Matching profiles and the profiles delivered so far (JSON lists), added after the first release
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+            for column in ("profiles", "delivered_profiles"):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch the stored records for the given entry keys in bulk"""
+        keys = list(dict.fromkeys(key for key in keys if key))
+        records = {}
+        with self.lock:
+            for i in range(0, len(keys), self.LOOKUP_CHUNK_SIZE):
+                chunk = keys[i:i + self.LOOKUP_CHUNK_SIZE]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = self.conn.execute(
+                    f"SELECT * FROM entries WHERE entry_key IN ({placeholders})", chunk
+                ).fetchall()
+                for row in rows:
+                    records[row["entry_key"]] = {
+                        'title': row["title"],
+                        'is_relevant': None if row["is_relevant"] is None else bool(row["is_relevant"]),
+                        'summary': row["summary"],
+                        'delivered': bool(row["delivered"]),
+                        'profiles': json.loads(row["profiles"]) if row["profiles"] else None,
+                        'delivered_profiles': json.loads(row["delivered_profiles"]) if row["delivered_profiles"] else [],
+                        'updated_at': row["updated_at"],
+                    }
+        return records
+
+    def record_verdict(self, key: str, title: str, is_relevant: bool, profiles: Optional[List[str]] = None):
+        """Store the classification verdict for an entry, with the names of the profiles it matches"""
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO entries (entry_key, title, is_relevant, profiles, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(entry_key) DO UPDATE SET
+                    title = excluded.title,
+                    is_relevant = excluded.is_relevant,
+                    profiles = excluded.profiles,
+                    updated_at = excluded.updated_at
+            """, (key, title, int(is_relevant), json.dumps(profiles) if profiles is not None else None, time.time()))
+
+    def record_summary(self, key: str, summary: str):
+        """Store the generated summary for an entry"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE entries SET summary = ?, updated_at = ? WHERE entry_key = ?",
+                (summary, time.time(), key)
+            )
+
+    def mark_delivered(self, key: str, profile: Optional[str] = None):
+        """Mark an entry as delivered, or as delivered to one profile
+
+        The entry counts as delivered once every profile it matches has it.
+        """
+        with self.lock, self.conn:
+            if profile is None:
+                self.conn.execute(
+                    "UPDATE entries SET delivered = 1, updated_at = ? WHERE entry_key = ?",
+                    (time.time(), key)
+                )
+                return
+            row = self.conn.execute("SELECT profiles, delivered_profiles FROM entries WHERE entry_key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            delivered = json.loads(row[1]) if row[1] else []
+            if profile not in delivered:
+                delivered.append(profile)
+            if not row[0]:
+                # Recorded without profile names (e.g. before PROFILES), so the one it went to is all it matches
+                matching = [profile]
+            else:
+                matching = json.loads(row[0])
+                if not matching:
+                    # An entry matching no profile is never complete, even though an empty set is a subset of any
+                    logger.warning(f"Entry {key} matches no profile but was delivered to {profile}.")
+            self.conn.execute(
+                "UPDATE entries SET delivered = ?, delivered_profiles = ?, updated_at = ? WHERE entry_key = ?",
+                (int(bool(matching) and set(matching) <= set(delivered)), json.dumps(delivered), time.time(), key)
+            )
+
+    def prune(self, max_age_days: Optional[float] = None) -> int:
+        """Delete records not updated within max_age_days, returns the number of rows removed"""
+        max_age_days = self.retention_days if max_age_days is None else max_age_days
+        if not max_age_days:
+            return 0
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self.lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM entries WHERE updated_at < ?", (cutoff,))
+        if cursor.rowcount:
+            logger.info(f"Pruned {cursor.rowcount} entries older than {max_age_days} days from the store.")
+        return cursor.rowcount
+
+    def count(self) -> int:
+        """Number of entries currently stored"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    # Example usage
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntryStoreHelper(os.path.join(tmp, "store.db"))
+        store.record_verdict("arxiv:2504.17728v1", "Sample Paper", True)
+        store.record_summary("arxiv:2504.17728v1", "A short summary.")
+        store.mark_delivered("arxiv:2504.17728v1")
+        print(store.lookup(["arxiv:2504.17728v1", "arxiv:0000.00000v1"]))
+        store.close()
@@ -0,0 +1,313 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+from .logger import MyLogger
+from .metrics_helper import NULL_METRICS
+from .telegram_bot_helper import TelegramBadRequestError, TelegramRateLimitError
+
+logger = MyLogger("SummaryStream")
+
+# Telegram allows about one message per second in a chat; edits count too
+MIN_EDIT_GAP = 1.0
+
+
+class FirstContentClock:
+    """Observes the time from an entry's start to the first content a reader can see, once per entry"""
+
+    def __init__(self, metrics=None, name: str = "first_content"):
+        self.metrics = metrics or NULL_METRICS
+        self.name = name
+        self.started = time.perf_counter()
+        self.seen = False
+
+    def mark(self):
+        if not self.seen:
+            self.seen = True
+            self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+
+class TelegramMessageStream:
+    """One Telegram message edited in place while its summary is generated
+
+    open() posts a placeholder and update() edits it with the summary so far,
+    at most once every edit_interval seconds and never before a retry_after
+    Telegram asked for, so a stream stays within the chat's edit limits.
+    finish() writes the final text, sending a new message if none was opened.
+    """
+
+    def __init__(
+        self,
+        telegram_helper,
+        chat_id: Union[str, int],
+        render: Optional[Callable[[str], str]] = None,
+        edit_interval: float = 3.0,
+        rate_limiter=None,
+        message_id: Optional[int] = None
+    ):
+        self.telegram_helper = telegram_helper
+        self.chat_id = chat_id
+        # Turns the summary so far into the message text
+        self.render = render or (lambda text: text)
+        self.edit_interval = edit_interval
+        # Optional TelegramRateLimiter shared with the outbox, taken for new messages and final edits
+        self.rate_limiter = rate_limiter
+        self.message_id = message_id
+        self.text = None
+        self.edited_at = 0.0
+        self.retry_at = 0.0
+
+    def _send(self, text: str) -> int:
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.chat_id)
+        response = self.telegram_helper.send_message(self.chat_id, text, parse_mode="html", disable_web_page_preview=True)
+        self.message_id = response["result"]["message_id"]
+        self.text = text
+        self.edited_at = time.monotonic()
+        return self.message_id
+
+    def _edit(self, text: str):
+        try:
+            self.telegram_helper.edit_message_text(self.chat_id, self.message_id, text, parse_mode="html", disable_web_page_preview=True)
+        except TelegramRateLimitError as e:
+            self.retry_at = time.monotonic() + e.retry_after
+            raise
+        finally:
+            self.edited_at = time.monotonic()
+        self.text = text
+
+    def open(self, placeholder: str) -> int:
+        """Post the placeholder message, returns its message ID"""
+        return self._send(placeholder)
+
+    def update(self, summary: str) -> bool:
+        """Show the summary so far if an edit is due, returns whether the message was edited"""
+        now = time.monotonic()
+        if self.message_id is None or now < self.retry_at or now - self.edited_at < self.edit_interval:
+            return False
+        text = self.render(summary)
+        if text == self.text:
+            return False
+        try:
+            self._edit(text)
+            return True
+        except Exception as e:
+            # Only the final text has to arrive
+            logger.debug(f"Skipped an update of message {self.message_id} in chat {self.chat_id}: {e}")
+            return False
+
+    def finish(self, text: str, attempts: int = 3) -> bool:
+        """Replace the message with its final text (or send it), waiting out rate limits; returns whether it arrived
+
+        A message Telegram refuses to edit, e.g. because it was deleted, is
+        replaced by a new one. Raises TelegramBadRequestError if Telegram also
+        rejects that.
+        """
+        for attempt in range(attempts):
+            if text == self.text:
+                return True
+            now = time.monotonic()
+            # Without a rate limiter, keep to Telegram's one message per second in the chat
+            time.sleep(max(0.0, self.retry_at - now, 0.0 if self.rate_limiter else self.edited_at + MIN_EDIT_GAP - now))
+            try:
+                if self.message_id is None:
+                    self._send(text)
+                else:
+                    if self.rate_limiter:
+                        self.rate_limiter.acquire(self.chat_id)
+                    self._edit(text)
+                return True
+            except TelegramRateLimitError:
+                continue
+            except TelegramBadRequestError as e:
+                if "message is not modified" in str(e):
+                    self.text = text
+                    return True
+                if self.message_id is None:
+                    raise
+                logger.warning(f"Could not edit message {self.message_id} in chat {self.chat_id}, sending a new one: {e}")
+                self.message_id = None
+            except Exception as e:
+                logger.warning(f"Could not finish message {self.message_id} in chat {self.chat_id} (attempt {attempt + 1}/{attempts}): {e}")
+                self.retry_at = time.monotonic() + 2 ** attempt
+        return False
+
+
+class FileSectionStream:
+    """Appends a Markdown summary to an output file one completed section at a time
+
+    A section is complete once the next "## " heading starts. The file's lock
+    is taken on the first write and held until finish() or abort(), so
+    entries streamed concurrently never interleave; while another entry holds
+    it, this entry is not streamed and finish() writes it whole.
+    """
+
+    def __init__(self, path: str, lock: threading.Lock, header: str):
+        self.path = path
+        self.lock = lock
+        self.header = header
+        self.written = ""
+        self.locked = False
+        self.skipped = False
+
+    def _write(self, text: str):
+        with open(self.path, "a") as f:
+            f.write(text)
+        self.written += text
+
+    @property
+    def started(self) -> bool:
+        return self.locked
+
+    def update(self, summary: str) -> bool:
+        """Write the sections of the summary so far that are complete, returns whether anything was written"""
+        if self.skipped:
+            return False
+        boundary = summary.rfind("\n## ")
+        if boundary <= 0 or boundary <= len(self.written) - len(self.header):
+            return False
+        if not self.locked:
+            if not self.lock.acquire(blocking=False):
+                self.skipped = True
+                return False
+            self.locked = True
+        self._write((self.header + summary[:boundary])[len(self.written):])
+        return True
+
+    def finish(self, text: str):
+        """Write the rest of the entry's final text, which starts with what was streamed"""
+        if not self.locked:
+            self.lock.acquire()
+            self.locked = True
+        try:
+            self._write(text[len(self.written):] if text.startswith(self.written) else "\n\n" + text)
+        finally:
+            self.locked = False
+            self.lock.release()
+
+    def abort(self):
+        """Close off a partly written entry, e.g. after the summary request failed"""
+        if not self.locked:
+            return
+        try:
+            self._write("\n\n_(summary interrupted)_\n\n")
+        finally:
+            self.locked = False
+            self.lock.release()
+
+
+class SummaryStream:
+    """Streams one entry's summary to its Telegram chats and output files while it is generated
+
+    Targets are named like the run journal's ("telegram:<chat_id>",
+    "file:<path>"). Each is journaled as delivering before its first send,
+    with the placeholder's message ID, so a resumed run edits that message
+    instead of sending another; finish() returns whether each target has the
+    final text.
+    """
+
+    def __init__(self, key: str, journal=None, clock: Optional[FirstContentClock] = None):
+        self.key = key
+        self.journal = journal
+        self.clock = clock
+        self.placeholder = None
+        self.telegram: Dict[str, TelegramMessageStream] = {}
+        self.files: Dict[str, FileSectionStream] = {}
+
+    def add_telegram(self, target: str, stream: TelegramMessageStream, placeholder: str):
+        self.telegram[target] = stream
+        self.placeholder = placeholder
+
+    def add_file(self, target: str, stream: FileSectionStream):
+        self.files[target] = stream
+
+    def open(self):
+        """Post every chat's placeholder, called when the summary request starts"""
+        for target, stream in self.telegram.items():
+            if self.journal:
+                self.journal.begin_delivery(self.key, target)
+            try:
+                message_id = stream.open(self.placeholder)
+            except Exception as e:
+                logger.warning(f"Could not post placeholder to {target}, the summary will be sent when complete: {e}")
+                if self.journal:
+                    self.journal.abort_delivery(self.key, target)
+                continue
+            if self.journal:
+                self.journal.record_message(self.key, target, message_id)
+
+    def update(self, summary: str):
+        """Pass the summary so far to every target"""
+        shown = False
+        for stream in self.telegram.values():
+            shown = stream.update(summary) or shown
+        for target, stream in self.files.items():
+            started = stream.started
+            if stream.update(summary):
+                shown = True
+                if not started and self.journal:
+                    self.journal.begin_delivery(self.key, target)
+        if shown and self.clock:
+            self.clock.mark()
+
+    def finish(self, texts: Dict[str, str]) -> Dict[str, bool]:
+        """Write each target's final text, returns whether each one has it"""
+        results = {}
+        for target, stream in self.telegram.items():
+            opened = stream.message_id is not None
+            if not opened and self.journal:
+                self.journal.begin_delivery(self.key, target)
+            try:
+                results[target] = stream.finish(texts[target])
+            except Exception as e:
+                logger.error(f"Failed to finish the message to {target}: {e}")
+                results[target] = False
+            if not results[target] and not opened and self.journal:
+                self.journal.abort_delivery(self.key, target)
+        for target, stream in self.files.items():
+            if not stream.started and self.journal:
+                self.journal.begin_delivery(self.key, target)
+            stream.finish(texts[target])
+            results[target] = True
+        for target, delivered in results.items():
+            if delivered and self.journal:
+                self.journal.mark_delivered(self.key, target)
+        if any(results.values()) and self.clock:
+            self.clock.mark()
+        return results
+
+    def abort(self, texts: Dict[str, str]):
+        """Give up after the summary failed
+
+        Opened messages are edited to their text in texts (e.g. the abstract)
+        but stay in flight, so the next run replaces them with the summary.
+        """
+        for target, stream in self.telegram.items():
+            if stream.message_id is not None:
+                try:
+                    stream.finish(texts[target])
+                except Exception as e:
+                    logger.warning(f"Could not update the placeholder in {target}: {e}")
+        for target, stream in self.files.items():
+            if stream.started:
+                stream.abort()
+                if self.journal:
+                    self.journal.abort_delivery(self.key, target)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    # Example usage: a Markdown summary arriving word by word, written to a file one section at a time
+    summary = "## ❓ Problems:\nSlow decoding.\n\n## 🛠️ Core Method:\nSpeculation.\n\n## 📈 Main Results/Impact:\n2x faster."
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "output.md")
+        stream = SummaryStream("arxiv:2504.17728v1", clock=FirstContentClock())
+        stream.add_file(f"file:{path}", FileSectionStream(path, threading.Lock(), "# Sample Paper\n\n"))
+        words = summary.split(" ")
+        for i in range(1, len(words) + 1):
+            stream.update(" ".join(words[:i]))
+            if os.path.exists(path):
+                with open(path) as f:
+                    print(repr(f.read()))
+        print(stream.finish({f"file:{path}": f"# Sample Paper\n\n{summary}\n\n[Read more](https://arxiv.org/abs/2504.17728)\n\n"}))
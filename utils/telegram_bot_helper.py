@@ -5,13 +5,30 @@ import time
 from .logger import MyLogger
 
 
+class TelegramRateLimitError(Exception):
+    """Raised when Telegram answers 429; retry_after is the wait it asked for in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TelegramBadRequestError(Exception):
+    """Raised when Telegram rejects a request as malformed; retrying will not help"""
+
+
 class TelegramBotHelper:
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, http=None, rate_limiter=None, api_url: str = "https://api.telegram.org"):
         if not bot_token:
             raise ValueError("Bot token is required")
         
         self.bot_token = bot_token
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        # Shared transport (HTTPHelper); falls back to one-off requests calls
+        self.http = http or requests
+        # Optional TelegramRateLimiter replacing the fixed sleeps between bulk sends
+        self.rate_limiter = rate_limiter
+        # A self-hosted Bot API server (or a local stand-in) can replace the public endpoint
+        self.base_url = f"{api_url.rstrip('/')}/bot{bot_token}"
         self.logger = MyLogger("TelegramBotHelper")
 
     def send_message(
@@ -40,15 +57,63 @@ class TelegramBotHelper:
             payload["reply_to_message_id"] = reply_to_message_id
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.http.post(url, json=payload, timeout=10)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                self.logger.warning(f"Rate limited by Telegram, retry after {retry_after}s")
+                raise TelegramRateLimitError(f"Too Many Requests: retry after {retry_after}s", retry_after)
             if response.status_code == 400:
-                raise Exception(f"Bad Request: {response.text}")
+                raise TelegramBadRequestError(f"Bad Request: {response.text}")
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             self.logger.error(f"Failed to send message: {e}")
             raise Exception(f"Failed to send message: {e}")
     
+    def edit_message_text(
+        self,
+        chat_id: Union[str, int],
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        disable_web_page_preview: bool = False
+    ) -> Dict:
+        """Replace the text of a message the bot sent earlier"""
+        url = f"{self.base_url}/editMessageText"
+
+        payload = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text,
+            "disable_web_page_preview": disable_web_page_preview
+        }
+
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        try:
+            response = self.http.post(url, json=payload, timeout=10)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                self.logger.warning(f"Rate limited by Telegram, retry after {retry_after}s")
+                raise TelegramRateLimitError(f"Too Many Requests: retry after {retry_after}s", retry_after)
+            if response.status_code == 400:
+                # Also returned when the new text equals the current one ("message is not modified")
+                raise TelegramBadRequestError(f"Bad Request: {response.text}")
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            self.logger.error(f"Failed to edit message: {e}")
+            raise Exception(f"Failed to edit message: {e}")
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Read retry_after from a 429 body, falling back to the Retry-After header"""
+        try:
+            return float(response.json().get("parameters", {}).get("retry_after"))
+        except (ValueError, TypeError, AttributeError):
+            return float(response.headers.get("Retry-After", 1))
+
     def send_photo(
         self, 
         chat_id: Union[str, int], 
@@ -71,7 +136,7 @@ class TelegramBotHelper:
             payload["parse_mode"] = parse_mode
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.http.post(url, json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -100,7 +165,7 @@ class TelegramBotHelper:
             payload["parse_mode"] = parse_mode
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.http.post(url, json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -112,7 +177,7 @@ class TelegramBotHelper:
         url = f"{self.base_url}/getMe"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.http.get(url, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -137,7 +202,7 @@ class TelegramBotHelper:
             params["offset"] = offset
         
         try:
-            response = requests.get(url, params=params, timeout=timeout + 10)
+            response = self.http.get(url, params=params, timeout=timeout + 10)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -160,11 +225,18 @@ class TelegramBotHelper:
         results = []
         for i in range(0, len(text), chunk_size):
             chunk = text[i:i + chunk_size]
+            self._throttle(chat_id, 0.1)
             results.append(self.send_message(chat_id, chunk))
-            time.sleep(0.1)  # Small delay to avoid rate limits
         
         return results
     
+    def _throttle(self, chat_id: Union[str, int], fallback_delay: float):
+        """Wait for the rate limiter if one is set, otherwise sleep a fixed delay"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire(chat_id)
+        else:
+            time.sleep(fallback_delay)  # Delay to avoid rate limits
+
     def format_rss_entry(self, entry: Dict) -> str:
         """Format RSS entry for Telegram message"""
         title = entry.get('title', 'No Title')
@@ -198,9 +270,9 @@ class TelegramBotHelper:
         for entry in entries:
             try:
                 formatted_message = self.format_rss_entry(entry)
+                self._throttle(chat_id, 0.5)
                 result = self.send_markdown_message(chat_id, formatted_message)
                 results.append(result)
-                time.sleep(0.5)  # Delay to avoid rate limits
             except Exception as e:
                 self.logger.error(f"Failed to send RSS entry: {e}")
                 continue
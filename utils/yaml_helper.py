@@ -6,7 +6,8 @@ class YAMLHelper:
         self.logger = MyLogger("YAMLHelper")
         self.filename = filename
         self.load_yaml()
-        self.check_necessary_keys(["API_KEY", "RSS", "INTERESTS"])
+        # Subscriber PROFILES carry their own interests
+        self.check_necessary_keys(["API_KEY", "RSS"] + ([] if "PROFILES" in self.data else ["INTERESTS"]))
 
     def load_yaml(self):
         with open(self.filename, 'r') as file: